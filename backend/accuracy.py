@@ -0,0 +1,200 @@
+"""
+Suivi de la précision des prévisions.
+
+Chaque prévision émise (historique des prédictions, magasin de prévisions) est
+conservée sous forme de colonnes (modèle, version, date, train, ville, horizon,
+prédiction). Les prévisions d'une même version de modèle sont identiques : seuls
+les jours pas encore suivis sont ajoutés. À chaque ingestion, les lignes encore
+sans valeur réelle sont jointes aux passagers observés par une recherche sur
+l'index (date, train, ville), sans parcourir les enregistrements de prévision.
+Sur une fenêtre glissante des ACCURACY_WINDOW_DAYS derniers jours observés,
+`AccuracyTracker.summary` calcule MAPE et biais par modèle, par ligne
+(train, ville) et par horizon, et signale une dérive au-delà des seuils.
+"""
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from metrics import FORECAST_BIAS, FORECAST_DRIFT, FORECAST_MAPE, FORECAST_ROWS_EVALUATED, stage_timer
+
+logger = logging.getLogger("oncf")
+
+ACCURACY_WINDOW_DAYS = int(os.getenv('ACCURACY_WINDOW_DAYS', 28))
+# Dérive : MAPE ou biais relatif (en valeur absolue) au-delà du seuil, sur au moins ACCURACY_MIN_SAMPLES lignes
+DRIFT_MAPE_THRESHOLD = float(os.getenv('DRIFT_MAPE_THRESHOLD', 0.25))
+DRIFT_BIAS_THRESHOLD = float(os.getenv('DRIFT_BIAS_THRESHOLD', 0.15))
+ACCURACY_MIN_SAMPLES = int(os.getenv('ACCURACY_MIN_SAMPLES', 30))
+
+KEY_COLUMNS = ['date', 'train_id', 'ville_arrivee']
+FORECAST_DTYPES = {
+    'model_type': object, 'model_version': object, 'date': 'datetime64[ns]', 'train_id': object,
+    'ville_arrivee': object, 'horizon_days': np.int64, 'predicted': float, 'actual': float,
+}
+
+
+def horizon_buckets(horizons):
+    """Tranches d'horizon (en jours) bornées par les horizons standard : 1-7, 8-14, 15-30, >30"""
+    bounds = [0, *sorted(horizons)]
+    labels = [f'{low + 1}-{high}' for low, high in zip(bounds, bounds[1:])] + [f'>{bounds[-1]}']
+    return bounds + [np.inf], labels
+
+
+def error_stats(frame):
+    """
+    MAPE (lignes dont la valeur réelle est non nulle), biais moyen en passagers
+    (prévision - réel, positif = surestimation) et biais relatif (somme des écarts / somme du réel)
+    """
+    error = frame['predicted'] - frame['actual']
+    nonzero = frame['actual'] > 0
+    ape = (error.abs() / frame['actual']).where(nonzero)
+    keys = [frame[c] for c in frame.columns if c not in ('predicted', 'actual')]
+    grouped = pd.DataFrame({'error': error, 'ape': ape, 'actual': frame['actual'], 'samples': 1}).groupby(
+        keys, observed=True, sort=True)
+    stats = grouped.agg(samples=('samples', 'sum'), mape=('ape', 'mean'), bias=('error', 'mean'),
+                        error_sum=('error', 'sum'), actual_sum=('actual', 'sum'))
+    stats['bias_pct'] = (stats['error_sum'] / stats['actual_sum'].where(stats['actual_sum'] > 0))
+    return stats.drop(columns=['error_sum', 'actual_sum'])
+
+
+def drift_reasons(row):
+    if row['samples'] < ACCURACY_MIN_SAMPLES:
+        return []
+    reasons = []
+    if pd.notna(row['mape']) and row['mape'] > DRIFT_MAPE_THRESHOLD:
+        reasons.append('mape')
+    if pd.notna(row['bias_pct']) and abs(row['bias_pct']) > DRIFT_BIAS_THRESHOLD:
+        reasons.append('bias')
+    return reasons
+
+
+class AccuracyTracker:
+    """Prévisions émises, jointes aux valeurs observées au fil des ingestions"""
+
+    def __init__(self, horizons=(7, 14, 30), window_days=ACCURACY_WINDOW_DAYS):
+        self.bins, self.labels = horizon_buckets(horizons)
+        self.window_days = window_days
+        self.forecasts = pd.DataFrame({c: pd.Series(dtype=dtype) for c, dtype in FORECAST_DTYPES.items()})
+        self._pending = []
+        # Dernier jour suivi par (modèle, version) : une version de modèle donne toujours la même prévision
+        self._tracked_until = {}
+        self._lock = threading.Lock()
+        self.version = 0
+        self.last_evaluation = None
+
+    def reset(self):
+        with self._lock:
+            self.forecasts = self.forecasts.iloc[:0]
+            self._pending = []
+            self._tracked_until = {}
+            self.version += 1
+            self.last_evaluation = None
+
+    def add_forecast(self, model_type, model_version, last_date, predictions):
+        """Enregistre une prévision (lignes date / train_id / ville_arrivee / predicted_passengers)"""
+        if not predictions:
+            return 0
+        frame = pd.DataFrame(predictions, columns=[*KEY_COLUMNS, 'predicted_passengers'])
+        frame['date'] = pd.to_datetime(frame['date'])
+        key = (model_type, model_version)
+        with self._lock:
+            tracked_until = self._tracked_until.get(key)
+            if tracked_until is not None:
+                frame = frame[frame['date'] > tracked_until]
+            if frame.empty:
+                return 0
+            self._tracked_until[key] = frame['date'].max()
+            self._pending.append(pd.DataFrame({
+                'model_type': model_type,
+                'model_version': model_version,
+                'date': frame['date'].to_numpy(),
+                'train_id': frame['train_id'].astype(str).to_numpy(),
+                'ville_arrivee': frame['ville_arrivee'].astype(str).to_numpy(),
+                'horizon_days': (frame['date'] - pd.Timestamp(last_date).normalize()).dt.days.to_numpy(),
+                'predicted': pd.to_numeric(frame['predicted_passengers'], errors='coerce').to_numpy(dtype=float),
+                'actual': np.nan,
+            }))
+            self.version += 1
+        return len(frame)
+
+    def evaluate(self, actuals):
+        """
+        Joint les lignes de prévision sans valeur réelle aux passagers observés (colonnes
+        Date, Train_ID, Ville_Arrivee, Nombre_Passagers). Renvoie le nombre de lignes jointes.
+        """
+        with self._lock, stage_timer('accuracy_join'):
+            if self._pending:
+                frames = [frame for frame in (self.forecasts, *self._pending) if len(frame)]
+                self.forecasts = pd.concat(frames, ignore_index=True).astype(FORECAST_DTYPES)
+                self._pending = []
+            pending = self.forecasts['actual'].isna().to_numpy()
+            if actuals is None or actuals.empty or not pending.any():
+                return 0
+
+            # Valeurs observées indexées par (date, train, ville); doublons éventuels sommés
+            observed = actuals.groupby([
+                pd.to_datetime(actuals['Date']).dt.normalize().rename('date'),
+                actuals['Train_ID'].astype(str).rename('train_id'),
+                actuals['Ville_Arrivee'].astype(str).rename('ville_arrivee'),
+            ])['Nombre_Passagers'].sum()
+            rows = self.forecasts.loc[pending, KEY_COLUMNS]
+            matched = observed.reindex(pd.MultiIndex.from_frame(rows)).to_numpy(dtype=float)
+            found = ~np.isnan(matched)
+            if found.any():
+                positions = np.flatnonzero(pending)[found]
+                self.forecasts.iloc[positions, self.forecasts.columns.get_loc('actual')] = matched[found]
+                self.version += 1
+                self.last_evaluation = pd.Timestamp.now().isoformat()
+                FORECAST_ROWS_EVALUATED.inc(int(found.sum()))
+
+            # Fenêtre glissante : les lignes plus anciennes que la fenêtre ne servent plus, jointes ou non
+            # (une ligne jamais circulée de la grille train × ville n'a pas de valeur réelle)
+            evaluated = self.forecasts['actual'].notna()
+            observed_until = self.forecasts.loc[evaluated, 'date'].max() if evaluated.any() \
+                else observed.index.get_level_values('date').max()
+            keep = (self.forecasts['date'] > observed_until - pd.Timedelta(days=self.window_days)).to_numpy()
+            if not keep.all():
+                self.forecasts = self.forecasts[keep].reset_index(drop=True)
+                self.version += 1
+            return int(found.sum())
+
+    def summary(self, model_type=None):
+        """MAPE et biais glissants par modèle et par (modèle, train, ville, horizon), avec la dérive"""
+        with self._lock:
+            frame = self.forecasts[self.forecasts['actual'].notna()]
+        if model_type is not None:
+            frame = frame[frame['model_type'] == model_type]
+        if frame.empty:
+            return {'window_days': self.window_days, 'models': [], 'routes': []}
+
+        cutoff = frame['date'].max() - pd.Timedelta(days=self.window_days)
+        frame = frame[frame['date'] > cutoff]
+        horizon = pd.cut(frame['horizon_days'], self.bins, labels=self.labels, right=True)
+
+        models = error_stats(frame[['model_type', 'predicted', 'actual']]).reset_index()
+        routes = error_stats(frame[['model_type', 'train_id', 'ville_arrivee', 'predicted', 'actual']]
+                             .assign(horizon=horizon)[['model_type', 'train_id', 'ville_arrivee', 'horizon',
+                                                       'predicted', 'actual']]).reset_index()
+        for stats in (models, routes):
+            stats['drift_reasons'] = [drift_reasons(row) for row in stats.to_dict('records')]
+            stats['drift'] = stats['drift_reasons'].map(bool)
+
+        for row in models.to_dict('records'):
+            if pd.notna(row['mape']):
+                FORECAST_MAPE.set(row['mape'], model_type=row['model_type'])
+            if pd.notna(row['bias_pct']):
+                FORECAST_BIAS.set(row['bias_pct'], model_type=row['model_type'])
+            FORECAST_DRIFT.set(int(row['drift']), model_type=row['model_type'])
+
+        return {
+            'window_days': self.window_days,
+            'window_start': (cutoff + pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+            'window_end': frame['date'].max().strftime('%Y-%m-%d'),
+            'models': models.to_dict('records'),
+            'routes': routes.astype({'horizon': str}).to_dict('records'),
+        }
+
+    def drifting_models(self):
+        return [row['model_type'] for row in self.summary()['models'] if row['drift']]
@@ -0,0 +1,112 @@
+"""
+Lecture et écriture par blocs pour le scoring de fichiers volumineux.
+
+`iter_input_chunks` lit un CSV ou un Parquet bloc par bloc (mémoire constante
+quelle que soit la taille du fichier) et `CsvChunkWriter` / `ArrowChunkWriter`
+encodent les blocs de résultats pour une réponse en streaming.
+"""
+import codecs
+import io
+
+import pandas as pd
+
+CHUNK_ROWS = 50_000
+PARQUET_MAGIC = b'PAR1'
+# Octets inspectés pour choisir l'encodage d'un CSV (utf-8, sinon latin-1)
+ENCODING_SNIFF_BYTES = 1 << 16
+
+REQUIRED_COLUMNS = ['Date', 'Train_ID', 'Ville_Arrivee']
+OVERRIDE_COLUMNS = ['Evenement_Present', 'Vacance']
+# Variantes de noms acceptées en entrée
+COLUMN_ALIASES = {
+    'Ville_Arrivée': 'Ville_Arrivee',
+    'Événement_Présent': 'Evenement_Present',
+    'Evénement_Présent': 'Evenement_Present',
+}
+
+
+def is_parquet(fileobj, filename=None):
+    if filename and filename.lower().endswith(('.parquet', '.pq')):
+        return True
+    position = fileobj.tell()
+    magic = fileobj.read(len(PARQUET_MAGIC))
+    fileobj.seek(position)
+    return magic == PARQUET_MAGIC
+
+
+def detect_encoding(fileobj):
+    """utf-8 si le début du fichier se décode en utf-8, sinon latin-1"""
+    position = fileobj.tell()
+    head = fileobj.read(ENCODING_SNIFF_BYTES)
+    fileobj.seek(position)
+    try:
+        # Décodeur incrémental : un caractère coupé en fin d'échantillon n'est pas une erreur
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def normalize_chunk_columns(chunk):
+    chunk = chunk.rename(columns=lambda c: COLUMN_ALIASES.get(str(c).strip(), str(c).strip()))
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+    return chunk[REQUIRED_COLUMNS + [c for c in OVERRIDE_COLUMNS if c in chunk.columns]]
+
+
+def iter_input_chunks(fileobj, filename=None, chunk_rows=CHUNK_ROWS):
+    """Itère sur les blocs (DataFrame) d'un fichier CSV ou Parquet, colonnes normalisées"""
+    if is_parquet(fileobj, filename):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(fileobj).iter_batches(batch_size=chunk_rows):
+            yield normalize_chunk_columns(batch.to_pandas())
+        return
+    reader = pd.read_csv(fileobj, chunksize=chunk_rows, encoding=detect_encoding(fileobj),
+                         dtype={'Train_ID': str, 'Ville_Arrivee': str, 'Ville_Arrivée': str})
+    for chunk in reader:
+        yield normalize_chunk_columns(chunk)
+
+
+class CsvChunkWriter:
+    media_type = 'text/csv'
+
+    def __init__(self):
+        self.header = True
+
+    def write(self, frame):
+        data = frame.to_csv(index=False, header=self.header).encode('utf-8')
+        self.header = False
+        return data
+
+    def close(self):
+        return b''
+
+
+class ArrowChunkWriter:
+    """Flux Arrow IPC : un record batch par bloc, schéma fixé par le premier bloc"""
+
+    media_type = 'application/vnd.apache.arrow.stream'
+
+    def __init__(self):
+        self.sink = io.BytesIO()
+        self.writer = None
+
+    def write(self, frame):
+        import pyarrow as pa
+        batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = pa.ipc.new_stream(self.sink, batch.schema)
+        self.writer.write_batch(batch)
+        return self._drain()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        return self._drain()
+
+    def _drain(self):
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
@@ -0,0 +1,95 @@
+"""
+Benchmark du temps d'import de main.py.
+
+Chaque mesure lance un interpréteur neuf (`python -X importtime -c "import main"`)
+pour ne pas profiter des modules déjà chargés. Le script vérifie aussi que
+scikit-learn et xgboost ne sont pas importés tant qu'aucun entraînement n'a eu lieu.
+
+Usage:
+    python benchmarks/import_time.py --runs 5 --top 15 --output import_time.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['sklearn', 'xgboost']
+
+CHECK_SNIPPET = (
+    "import sys, json; import main; "
+    "print(json.dumps({m: m in sys.modules for m in %r}))" % HEAVY_MODULES
+)
+
+
+def measure_once():
+    """Lance un import à froid et renvoie (durée en secondes, sortie -X importtime)"""
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return time.perf_counter() - start, completed.stderr
+
+
+def parse_importtime(stderr, top):
+    """Extrait les imports directs de main.py les plus coûteux (temps cumulé en ms)"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        # Chaque niveau d'imbrication ajoute deux espaces : profondeur 1 = imports de main
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth != 1:
+            continue
+        modules.append({'module': name.strip(), 'cumulative_ms': int(cumulative_us) / 1000})
+    modules.sort(key=lambda m: m['cumulative_ms'], reverse=True)
+    return modules[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le temps d'import du backend")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args()
+
+    durations = []
+    stderr = ''
+    for _ in range(args.runs):
+        duration, stderr = measure_once()
+        durations.append(duration)
+
+    heavy = json.loads(subprocess.run(
+        [sys.executable, '-c', CHECK_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1])
+
+    result = {
+        'runs': args.runs,
+        'median_s': statistics.median(durations),
+        'min_s': min(durations),
+        'max_s': max(durations),
+        'heavy_modules_loaded': heavy,
+        'top_imports': parse_importtime(stderr, args.top),
+    }
+
+    print(f"⏱️ Import de main.py: médiane {result['median_s']:.3f}s (min {result['min_s']:.3f}s, max {result['max_s']:.3f}s)")
+    for name, loaded in heavy.items():
+        print(f"   {'❌' if loaded else '✅'} {name} {'importé' if loaded else 'non importé'} au chargement")
+    for entry in result['top_imports']:
+        print(f"   {entry['cumulative_ms']:9.1f} ms  {entry['module']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    return 1 if any(heavy.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+Test de charge HTTP local du backend.
+
+Démarre l'application (sous-processus uvicorn par défaut, ou dans ce processus
+avec --in-process, ou cible un serveur existant avec --url), puis rejoue un
+mélange pondéré de requêtes à la concurrence demandée. Rapporte par endpoint :
+latences p50/p95/p99, débit, erreurs et pic de mémoire résidente du serveur
+observé pendant que l'endpoint avait des requêtes en vol.
+
+Usage:
+    python benchmarks/load_test.py --concurrency 16 --duration 30
+    python benchmarks/load_test.py --in-process --mix data-preview=10,train-and-predict=1
+    python benchmarks/load_test.py --url http://localhost:8000 --requests 500 --output load.json
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DATA_DIR = os.path.join(BACKEND_DIR, '..', 'sample_data')
+
+# Poids par défaut : des tableaux de bord qui interrogent souvent, quelques planificateurs qui entraînent
+DEFAULT_MIX = 'data-preview=40,future-events=20,current-date-info=25,train-and-predict=5,upload-csv=2'
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(REQUEST_BUILDERS)
+    if unknown:
+        raise SystemExit(f"Endpoints inconnus dans --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _multipart(files):
+    """Encode un formulaire multipart/form-data (stdlib uniquement)"""
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for field, (filename, content) in files.items():
+        body += f'--{boundary}\r\n'.encode()
+        body += f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode()
+        body += b'Content-Type: text/csv\r\n\r\n' + content + b'\r\n'
+    body += f'--{boundary}--\r\n'.encode()
+    return bytes(body), f'multipart/form-data; boundary={boundary}'
+
+
+def _upload_payload():
+    files = {}
+    for field, name in (('passengers_file', 'passengers'), ('evenements_file', 'evenements'), ('vacances_file', 'vacances')):
+        with open(os.path.join(SAMPLE_DATA_DIR, f'{name}.csv'), 'rb') as f:
+            files[field] = (f'{name}.csv', f.read())
+    return _multipart(files)
+
+
+def _point_query(args):
+    """Paramètres de /forecast pour le premier (train, ville) des données d'exemple"""
+    with open(os.path.join(SAMPLE_DATA_DIR, 'passengers.csv'), encoding='utf-8') as f:
+        row = next(csv.DictReader(f))
+    return urllib.parse.urlencode({
+        'model_type': args.model_type, 'date': row['Date'][:10],
+        'train_id': row['Train_ID'], 'ville_arrivee': row.get('Ville_Arrivée') or row.get('Ville_Arrivee'),
+    })
+
+
+def build_request_builders(args):
+    upload_body, upload_type = _upload_payload()
+    train_body = json.dumps({'model_type': args.model_type, 'days_to_predict': args.days}).encode()
+    point_query = _point_query(args)
+    return {
+        'data-preview': lambda base: urllib.request.Request(f'{base}/data-preview'),
+        'future-events': lambda base: urllib.request.Request(f'{base}/future-events'),
+        'current-date-info': lambda base: urllib.request.Request(f'{base}/current-date-info'),
+        'forecast': lambda base: urllib.request.Request(f'{base}/forecast?{point_query}'),
+        'train-and-predict': lambda base: urllib.request.Request(
+            f'{base}/train-and-predict', data=train_body, method='POST',
+            headers={'Content-Type': 'application/json'}),
+        'upload-csv': lambda base: urllib.request.Request(
+            f'{base}/upload-csv', data=upload_body, method='POST', headers={'Content-Type': upload_type}),
+    }
+
+
+REQUEST_BUILDERS = dict.fromkeys(['data-preview', 'future-events', 'current-date-info', 'forecast', 'train-and-predict',
+                                  'upload-csv'])
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _rss_of_pid(pid):
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _rss_from_metrics(base):
+    try:
+        with urllib.request.urlopen(f'{base}/metrics', timeout=5) as response:
+            for line in response.read().decode().splitlines():
+                if line.startswith('oncf_process_resident_memory_bytes '):
+                    return int(float(line.split()[1]))
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+class ServerHandle:
+    """Serveur cible : sous-processus, thread uvicorn dans ce processus, ou URL existante"""
+
+    def __init__(self, args):
+        self.process = None
+        self.server = None
+        if args.url:
+            self.base = args.url.rstrip('/')
+            self.rss = lambda: _rss_from_metrics(self.base)
+            return
+        port = _free_port()
+        self.base = f'http://127.0.0.1:{port}'
+        if args.in_process:
+            import uvicorn
+            sys.path.insert(0, BACKEND_DIR)
+            config = uvicorn.Config('main:app', host='127.0.0.1', port=port, log_level='warning')
+            self.server = uvicorn.Server(config)
+            threading.Thread(target=self.server.run, daemon=True).start()
+            self.rss = lambda: _rss_of_pid(os.getpid()) or _rss_from_metrics(self.base)
+        else:
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+                 '--log-level', 'warning', '--workers', str(args.workers)],
+                cwd=BACKEND_DIR
+            )
+            # Avec plusieurs workers, /proc/<pid> ne couvre que le superviseur : passer par /metrics
+            self.rss = (lambda: _rss_of_pid(self.process.pid)) if args.workers == 1 else (lambda: _rss_from_metrics(self.base))
+
+    def wait_ready(self, timeout=60):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                with urllib.request.urlopen(f'{self.base}/ready', timeout=2) as response:
+                    if response.status == 200:
+                        return
+            except (OSError, urllib.error.HTTPError):
+                pass
+            time.sleep(0.1)
+        raise SystemExit(f"Le serveur {self.base} n'est pas prêt après {timeout}s")
+
+    def stop(self):
+        if self.server is not None:
+            self.server.should_exit = True
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+
+class LoadRecorder:
+    """Latences, erreurs et pics mémoire par endpoint"""
+
+    def __init__(self, endpoints):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.in_flight = dict.fromkeys(endpoints, 0)
+        self.peak_rss = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def start(self, endpoint):
+        with self.lock:
+            self.in_flight[endpoint] += 1
+
+    def finish(self, endpoint, latency, ok):
+        with self.lock:
+            self.in_flight[endpoint] -= 1
+            self.latencies[endpoint].append(latency)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def sample_rss(self, rss):
+        with self.lock:
+            for endpoint, count in self.in_flight.items():
+                if count:
+                    self.peak_rss[endpoint] = max(self.peak_rss[endpoint], rss)
+            self.peak_rss['_overall'] = max(self.peak_rss['_overall'], rss)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_load(args, server, builders, mix):
+    recorder = LoadRecorder(mix)
+    endpoints = list(mix)
+    weights = [mix[e] for e in endpoints]
+    stop_at = time.time() + args.duration if args.duration else None
+    remaining = [args.requests] if args.requests else None
+    counter_lock = threading.Lock()
+    done = threading.Event()
+
+    def take_ticket():
+        if stop_at is not None and time.time() >= stop_at:
+            return False
+        if remaining is not None:
+            with counter_lock:
+                if remaining[0] <= 0:
+                    return False
+                remaining[0] -= 1
+        return True
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while take_ticket():
+            endpoint = rng.choices(endpoints, weights)[0]
+            request = builders[endpoint](server.base)
+            recorder.start(endpoint)
+            start = time.perf_counter()
+            ok = True
+            try:
+                with urllib.request.urlopen(request, timeout=args.timeout) as response:
+                    response.read()
+            except urllib.error.HTTPError as error:
+                error.read()
+                ok = False
+            except OSError:
+                ok = False
+            recorder.finish(endpoint, time.perf_counter() - start, ok)
+
+    def sampler():
+        while not done.is_set():
+            rss = server.rss()
+            if rss:
+                recorder.sample_rss(rss)
+            done.wait(args.rss_interval)
+
+    sampler_thread = threading.Thread(target=sampler, daemon=True)
+    sampler_thread.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    sampler_thread.join()
+    return recorder, elapsed
+
+
+def summarize(recorder, elapsed):
+    report = {'elapsed_s': elapsed, 'endpoints': {}}
+    total = 0
+    for endpoint, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        total += len(values)
+        report['endpoints'][endpoint] = {
+            'requests': len(values),
+            'errors': recorder.errors[endpoint],
+            'throughput_rps': len(values) / elapsed if elapsed else None,
+            'mean_ms': statistics.mean(values) * 1000,
+            'p50_ms': _percentile(values, 50) * 1000,
+            'p95_ms': _percentile(values, 95) * 1000,
+            'p99_ms': _percentile(values, 99) * 1000,
+            'max_ms': values[-1] * 1000,
+            'peak_rss_mb': recorder.peak_rss.get(endpoint, 0) / 1024 / 1024 or None,
+        }
+    report['total_requests'] = total
+    report['throughput_rps'] = total / elapsed if elapsed else None
+    report['peak_rss_mb'] = recorder.peak_rss.get('_overall', 0) / 1024 / 1024 or None
+    return report
+
+
+def print_report(report, args):
+    print(f"\n🚦 {report['total_requests']} requêtes en {report['elapsed_s']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s, concurrence {args.concurrency})")
+    print(f"   {'endpoint':<20}{'req':>7}{'err':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS Mo':>9}")
+    for endpoint, stats in report['endpoints'].items():
+        print(f"   {endpoint:<20}{stats['requests']:>7}{stats['errors']:>6}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}"
+              f"{(stats['peak_rss_mb'] or 0):>9.0f}")
+    if report['peak_rss_mb']:
+        print(f"   Pic de mémoire résidente du serveur : {report['peak_rss_mb']:.0f} Mo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge HTTP du backend")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', help='Cibler un serveur déjà démarré')
+    target.add_argument('--in-process', action='store_true', help='Démarrer uvicorn dans ce processus')
+    parser.add_argument('--workers', type=int, default=1, help='Workers uvicorn du sous-processus')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, help='Durée en secondes (défaut : 20s si --requests absent)')
+    parser.add_argument('--requests', type=int, default=0, help='Nombre total de requêtes')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument('--model-type', default='Linear Regression')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--rss-interval', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    args = parser.parse_args()
+    if args.duration is None and not args.requests:
+        args.duration = 20
+
+    builders = build_request_builders(args)
+    server = ServerHandle(args)
+    try:
+        server.wait_ready()
+        recorder, elapsed = run_load(args, server, builders, args.mix)
+    finally:
+        server.stop()
+
+    report = summarize(recorder, elapsed)
+    report['config'] = {
+        'concurrency': args.concurrency, 'duration': args.duration, 'requests': args.requests,
+        'mix': args.mix, 'model_type': args.model_type, 'days': args.days, 'workers': args.workers,
+        'target': args.url or ('in-process' if args.in_process else 'subprocess'),
+    }
+    print_report(report, args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Résultats écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
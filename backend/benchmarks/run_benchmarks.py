@@ -0,0 +1,245 @@
+"""
+Benchmarks en processus des étapes chaudes du backend sur des réseaux synthétiques.
+
+Étapes mesurées pour chaque taille (nombre de lignes passagers) :
+    parse_dates     ingestion.parse_dates sur la colonne Date
+    ingest          pipeline d'ingestion complet depuis les CSV (durées par étape en sortie)
+    merge           merge_available_data (passagers + événements + vacances)
+    train           fit_model pour chaque modèle demandé
+    forecast        generate_forecast sur l'horizon demandé
+    predict_single  prédictions d'une ligne : modèle d'origine puis modèle compilé
+    serialize_json  conversion de merged_data en JSON (comme /data-preview)
+    serialize_arrow conversion de merged_data en flux Arrow IPC
+
+Les résultats sont écrits en JSON; `--baseline` compare à une exécution
+précédente et renvoie un code de sortie non nul en cas de régression.
+
+Usage:
+    python benchmarks/run_benchmarks.py --sizes 1e3,1e4,1e5 --output bench.json
+    python benchmarks/run_benchmarks.py --sizes 1e3,1e4 --baseline bench.json
+    python benchmarks/run_benchmarks.py --sizes 1e6,1e7 --only merge,serialize_arrow
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import pandas as pd  # noqa: E402
+import numpy as np  # noqa: E402
+
+import main  # noqa: E402
+from ingestion import IngestionPipeline, parse_dates  # noqa: E402
+from compiled_models import compile_model  # noqa: E402
+from synthetic_data import generate_network, network_shape_for_rows  # noqa: E402
+
+BENCHMARKS = ['parse_dates', 'ingest', 'merge', 'train', 'forecast', 'predict_single', 'serialize_json', 'serialize_arrow']
+
+# Nombre de prédictions unitaires chronométrées par le benchmark predict_single
+SINGLE_PREDICTIONS = 200
+
+# Tailles au-delà desquelles une étape est ignorée par défaut (trop longue pour un run courant)
+DEFAULT_LIMITS = {
+    'ingest': 1_000_000,
+    'train': 1_000_000,
+    'forecast': 1_000_000,
+}
+
+
+def parse_sizes(text):
+    return [int(float(part)) for part in text.split(',') if part.strip()]
+
+
+def timed(fn, repeat):
+    """Exécute fn `repeat` fois et renvoie (durées, dernier résultat)"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - start)
+    return durations, result
+
+
+def prepare_dataset(n_rows, seed):
+    """Génère le réseau et renvoie les trois DataFrames avec des dates déjà parsées"""
+    n_trains, n_cities, years = network_shape_for_rows(n_rows)
+    passengers_df, evenements_df, vacances_df = generate_network(n_trains, n_cities, years, seed=seed)
+    passengers_df = passengers_df.head(n_rows)
+    raw_files = [frame.to_csv(index=False).encode('utf-8') for frame in (passengers_df, evenements_df, vacances_df)]
+    raw_dates = passengers_df['Date']
+    for frame in (passengers_df, evenements_df, vacances_df):
+        frame['Date'] = pd.to_datetime(frame['Date'])
+    return raw_dates, raw_files, passengers_df, evenements_df, vacances_df, (n_trains, n_cities, years)
+
+
+def single_feature_row(entry):
+    """Une ligne de features (premier train, première ville, lendemain de la dernière date)"""
+    date = entry['last_date'] + pd.Timedelta(days=1)
+    return pd.DataFrame([{
+        'Train_ID_encoded': 0, 'Ville_Arrivée_encoded': 0, 'day_of_year': date.dayofyear,
+        'month': date.month, 'day_of_week': date.dayofweek, 'Evenement_Present': 0, 'Vacance': 0,
+    }])[main.FEATURE_COLUMNS]
+
+
+def run_size(n_rows, args, selected):
+    results = []
+    raw_dates, raw_files, passengers_df, evenements_df, vacances_df, shape = prepare_dataset(n_rows, args.seed)
+
+    def record(name, durations, items=None, **extra):
+        # Débit exprimé en lignes d'entrée, ou en éléments produits (prédictions) si fourni
+        items = n_rows if items is None else items
+        entry = {
+            'benchmark': name,
+            'rows': n_rows,
+            'seconds_min': min(durations),
+            'seconds_median': statistics.median(durations),
+            'rows_per_s': items / min(durations) if min(durations) > 0 else None,
+            **extra,
+        }
+        results.append(entry)
+        print(f"   {name:<28} {entry['seconds_min']:10.4f}s  ({entry['rows_per_s'] or 0:,.0f} lignes/s)")
+
+    def allowed(name):
+        limit = None if args.no_limits else DEFAULT_LIMITS.get(name)
+        if limit is not None and n_rows > limit:
+            print(f"   {name:<28} ignoré (> {limit:,} lignes, utiliser --no-limits)")
+            return False
+        return name in selected
+
+    print(f"📏 {n_rows:,} lignes (trains={shape[0]}, villes={shape[1]}, années={shape[2]:.2f})")
+
+    if allowed('parse_dates'):
+        durations, _ = timed(lambda: parse_dates(raw_dates), args.repeat)
+        record('parse_dates', durations)
+
+    if allowed('ingest'):
+        durations, result = timed(lambda: IngestionPipeline().run(*raw_files), args.repeat)
+        record('ingest', durations, timings_ms=result['timings_ms'])
+
+    main.passengers_df = passengers_df
+    main.evenements_df = evenements_df
+    main.vacances_df = vacances_df
+    durations, merged = timed(main.merge_available_data, args.repeat)
+    if 'merge' in selected:
+        record('merge', durations, output_rows=len(merged))
+
+    if allowed('train') or allowed('forecast') or allowed('predict_single'):
+        for model_type in args.models:
+            label = f'{model_type}|{args.partition_by}' if args.partition_by else model_type
+            durations, entry = timed(lambda: main.fit_model(merged, model_type, args.partition_by), args.repeat)
+            if 'train' in selected:
+                record(f'train[{label}]', durations)
+            if allowed('forecast'):
+                durations, predictions = timed(
+                    lambda: main.generate_forecast(entry, args.days, evenements_df, vacances_df), args.repeat
+                )
+                record(f'forecast[{label}]', durations, items=len(predictions), predictions=len(predictions))
+            compiled = None if args.partition_by else compile_model(entry['model'], model_type)
+            if allowed('predict_single') and compiled is not None:
+                row = single_feature_row(entry)
+                durations, _ = timed(lambda: [entry['model'].predict(row) for _ in range(SINGLE_PREDICTIONS)], args.repeat)
+                record(f'predict_single[{label}|model]', durations, items=SINGLE_PREDICTIONS)
+                values = row.to_numpy()[0]
+                durations, _ = timed(lambda: [compiled.predict(values) for _ in range(SINGLE_PREDICTIONS)], args.repeat)
+                record(f'predict_single[{label}|compiled]', durations, items=SINGLE_PREDICTIONS)
+
+    if 'serialize_json' in selected:
+        durations, _ = timed(
+            lambda: json.dumps(merged.replace([np.inf, -np.inf, np.nan], None).to_dict('records')), args.repeat
+        )
+        record('serialize_json', durations)
+
+    if 'serialize_arrow' in selected:
+        durations, _ = timed(lambda: main.arrow_response(merged).body, args.repeat)
+        record('serialize_arrow', durations)
+
+    return results
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def compare_to_baseline(results, baseline_path, threshold):
+    """Affiche les ratios par rapport à la référence; renvoie la liste des régressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    reference = {(r['benchmark'], r['rows']): r for r in baseline.get('results', [])}
+    regressions = []
+    print(f"\n📊 Comparaison avec {baseline_path} (seuil x{threshold})")
+    for result in results:
+        ref = reference.get((result['benchmark'], result['rows']))
+        if ref is None or not ref['seconds_min']:
+            continue
+        ratio = result['seconds_min'] / ref['seconds_min']
+        result['baseline_ratio'] = ratio
+        flag = '❌' if ratio > threshold else '✅'
+        print(f"   {flag} {result['benchmark']:<28} {result['rows']:>10,}  x{ratio:.2f}")
+        if ratio > threshold:
+            regressions.append(result)
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmarks des étapes chaudes du backend")
+    parser.add_argument('--sizes', type=parse_sizes, default=parse_sizes('1e3,1e4,1e5'))
+    parser.add_argument('--only', help=f"Étapes à exécuter parmi {','.join(BENCHMARKS)}")
+    parser.add_argument('--models', default='Linear Regression,Random Forest',
+                        help='Modèles pour train/forecast, séparés par des virgules')
+    parser.add_argument('--days', type=int, default=7, help='Horizon du benchmark forecast')
+    parser.add_argument('--partition-by', choices=['city', 'route'], help='Entraîner un modèle par partition')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-limits', action='store_true', help='Ne pas ignorer les étapes lentes aux grandes tailles')
+    parser.add_argument('--output', help='Fichier JSON de résultats')
+    parser.add_argument('--baseline', help='Fichier JSON de référence à comparer')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Ratio au-delà duquel une étape est en régression')
+    args = parser.parse_args()
+    args.models = [m.strip() for m in args.models.split(',') if m.strip()]
+    selected = set(args.only.split(',')) if args.only else set(BENCHMARKS)
+
+    # Charger scikit-learn / xgboost avant de mesurer pour ne pas compter l'import dans le premier fit
+    for model_type in args.models:
+        main.make_model(model_type)
+
+    results = []
+    for n_rows in args.sizes:
+        results.extend(run_size(n_rows, args, selected))
+
+    report = {'environment': environment_info(), 'config': {
+        'sizes': args.sizes, 'models': args.models, 'days': args.days, 'repeat': args.repeat, 'seed': args.seed,
+        'partition_by': args.partition_by,
+    }, 'results': results}
+
+    regressions = compare_to_baseline(results, args.baseline, args.threshold) if args.baseline else []
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Résultats écrits dans {args.output}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli())
@@ -0,0 +1,105 @@
+"""
+Planification de capacité à partir des prévisions.
+
+La table de capacité associe chaque train à son nombre de places et de
+voitures. `capacity_plan` somme la demande de chaque train par jour (toutes
+villes d'arrivée confondues) et calcule en une passe vectorisée le taux de
+remplissage, les alertes de dépassement et le nombre de voitures à ajouter
+pour revenir sous le taux cible; `aggregate_plan` en dérive les vues par jour
+et par ligne (ville d'arrivée).
+"""
+import numpy as np
+import pandas as pd
+
+CAPACITY_COLUMNS = ['Train_ID', 'Places', 'Voitures']
+CAPACITY_ALIASES = {
+    'Seats': 'Places', 'Capacite': 'Places', 'Capacité': 'Places', 'Nombre_Places': 'Places',
+    'Consists': 'Voitures', 'Cars': 'Voitures', 'Nb_Voitures': 'Voitures', 'Rames': 'Voitures',
+}
+
+
+def normalize_capacity_table(df):
+    """Valide et normalise la table de capacité (Train_ID, Places, Voitures)"""
+    df = df.rename(columns=lambda c: CAPACITY_ALIASES.get(str(c).strip(), str(c).strip()))
+    missing = [c for c in CAPACITY_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+    df = df[CAPACITY_COLUMNS].copy()
+    df['Train_ID'] = df['Train_ID'].astype(str).str.strip()
+    df['Places'] = pd.to_numeric(df['Places'], errors='coerce')
+    df['Voitures'] = pd.to_numeric(df['Voitures'], errors='coerce')
+    invalid = df['Places'].isna() | (df['Places'] <= 0) | df['Voitures'].isna() | (df['Voitures'] < 1)
+    if invalid.any():
+        raise ValueError(f"{int(invalid.sum())} ligne(s) avec Places ou Voitures invalides "
+                         f"(ex. Train_ID {df.loc[invalid, 'Train_ID'].iloc[0]})")
+    # Un train listé plusieurs fois : la dernière ligne l'emporte
+    df = df.drop_duplicates('Train_ID', keep='last')
+    return df.astype({'Places': np.int64, 'Voitures': np.int64}).reset_index(drop=True)
+
+
+def capacity_plan(predictions, capacity, target_load_factor=0.9, demand_column='predicted_passengers'):
+    """
+    Une ligne par train et par jour : la demande de toutes les villes d'arrivée du
+    train est sommée avant d'être comparée à ses places. Ajoute places, voitures, taux
+    de remplissage, dépassement de capacité et voitures supplémentaires pour rester
+    sous le taux cible. Les trains absents de la table de capacité ont capacity_missing à True.
+    """
+    trains = predictions.groupby(['date', 'train_id'], sort=True).agg(
+        demand=(demand_column, 'sum'),
+        lines=('ville_arrivee', 'nunique'),
+    ).reset_index()
+    plan = trains.merge(
+        capacity.rename(columns={'Train_ID': 'train_id', 'Places': 'places', 'Voitures': 'voitures'}),
+        on='train_id', how='left', validate='many_to_one',
+    )
+    demand = plan['demand'].to_numpy(dtype=float)
+    places = plan['places'].to_numpy(dtype=float)
+    voitures = plan['voitures'].to_numpy(dtype=float)
+    missing = np.isnan(places)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        load_factor = demand / places
+        seats_per_car = places / voitures
+        # Places nécessaires pour rester sous le taux cible, converties en voitures entières
+        shortfall = np.maximum(0.0, np.ceil(demand / target_load_factor) - places)
+        extra_cars = np.ceil(shortfall / seats_per_car)
+
+    # Demande des seuls trains dont la capacité est connue (base des taux agrégés)
+    plan['covered_demand'] = np.where(missing, 0.0, demand)
+    plan['load_factor'] = np.round(load_factor, 4)
+    plan['over_capacity'] = ~missing & (demand > places)
+    plan['above_target'] = ~missing & (load_factor > target_load_factor)
+    plan['extra_cars'] = np.where(missing, 0, extra_cars).astype(np.int64)
+    plan['capacity_missing'] = missing
+    return plan
+
+
+def _aggregate(plan, key):
+    """Cumuls sur les lignes train-jour de `plan` : les places d'un train comptent une fois par jour"""
+    grouped = plan.groupby(key, sort=True).agg(
+        demand=('demand', 'sum'),
+        covered_demand=('covered_demand', 'sum'),
+        places=('places', 'sum'),
+        trains=('train_id', 'size'),
+        over_capacity=('over_capacity', 'sum'),
+        above_target=('above_target', 'sum'),
+        extra_cars=('extra_cars', 'sum'),
+        capacity_missing=('capacity_missing', 'sum'),
+    ).reset_index()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grouped['load_factor'] = np.round(grouped['covered_demand'] / grouped['places'].replace(0, np.nan), 4)
+    return grouped
+
+
+def aggregate_plan(plan, predictions, demand_column='predicted_passengers'):
+    """
+    Vues agrégées par jour et par ligne (ville d'arrivée). Une ligne cumule les
+    trains-jours qui la desservent (demande totale, places, alertes de ces trains);
+    line_demand est la demande vers la seule ville d'arrivée.
+    """
+    served = predictions[['date', 'train_id', 'ville_arrivee']].drop_duplicates().merge(
+        plan, on=['date', 'train_id'], how='inner', validate='many_to_one')
+    by_line = _aggregate(served, 'ville_arrivee')
+    line_demand = predictions.groupby('ville_arrivee', sort=True)[demand_column].sum()
+    by_line.insert(1, 'line_demand', by_line['ville_arrivee'].map(line_demand).to_numpy(dtype=float))
+    return _aggregate(plan, 'date'), by_line
@@ -0,0 +1,195 @@
+"""
+Inférence compilée à faible latence pour les modèles entraînés.
+
+Les arbres d'un Random Forest (scikit-learn) ou d'un XGBoost sont aplatis en
+tableaux NumPy contigus (un tableau par attribut de nœud : feature, seuil,
+enfants gauche/droit, valeur) et évalués pour toutes les paires (arbre, ligne)
+à la fois, sans DataFrame ni validation sklearn. Les prédictions sont
+identiques à celles du modèle d'origine. Une régression linéaire est réduite à
+ses coefficients. Les tableaux se sauvegardent en .npz et se rechargent sans
+pickle (voir model_registry.py).
+"""
+import json
+
+import numpy as np
+
+
+class CompiledForest:
+    """
+    Forêt aplatie en struct-of-arrays. Les feuilles pointent sur elles-mêmes
+    (seuil +inf), ce qui permet de descendre tous les arbres `depth` fois sans branchement.
+    """
+
+    kind = 'forest'
+
+    def __init__(self, feature, threshold, left, right, value, default_left, roots, depth,
+                 aggregate, base_score=0.0, strict=False):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.default_left = default_left
+        self.roots = roots
+        self.depth = int(depth)
+        self.aggregate = aggregate      # 'mean' (Random Forest) ou 'sum' (XGBoost)
+        self.base_score = float(base_score)
+        self.strict = bool(strict)      # XGBoost : x < seuil, scikit-learn : x <= seuil
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def predict(self, X):
+        """Prédit une ligne (1D) ou un lot (2D) de features dans l'ordre d'entraînement"""
+        # Mêmes précisions que les modèles d'origine : features float32, seuils float64 (sklearn) ou float32 (XGBoost)
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(len(X))[None, :]
+        node = np.repeat(self.roots[:, None], len(X), axis=1)
+        for _ in range(self.depth):
+            x = X[rows, self.feature[node]]
+            go_left = x < self.threshold[node] if self.strict else x <= self.threshold[node]
+            go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            node = np.where(go_left, self.left[node], self.right[node])
+        values = self.value[node]
+        if self.aggregate == 'mean':
+            # Somme séquentielle arbre par arbre puis division, comme RandomForestRegressor
+            # (np.add.reduce passe en sommation par paires sur une seule ligne : résultat différent)
+            total = np.zeros(values.shape[1], dtype=values.dtype)
+            for tree_values in values:
+                total += tree_values
+            return total / self.n_trees
+        total = np.full(values.shape[1], self.base_score, dtype=np.float32)
+        for tree_values in values:
+            total += tree_values
+        return total
+
+    def to_arrays(self):
+        return {
+            'feature': self.feature, 'threshold': self.threshold, 'left': self.left,
+            'right': self.right, 'value': self.value, 'default_left': self.default_left,
+            'roots': self.roots,
+            'params': np.array(json.dumps({
+                'depth': self.depth, 'aggregate': self.aggregate,
+                'base_score': self.base_score, 'strict': self.strict,
+            })),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        params = json.loads(str(arrays['params']))
+        return cls(arrays['feature'], arrays['threshold'], arrays['left'], arrays['right'],
+                   arrays['value'], arrays['default_left'], arrays['roots'], **params)
+
+
+class CompiledLinear:
+    """Régression linéaire réduite à ses coefficients"""
+
+    kind = 'linear'
+
+    def __init__(self, coef, intercept):
+        self.coef = np.asarray(coef, dtype=float)
+        self.intercept = float(intercept)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[None, :]
+        return X @ self.coef + self.intercept
+
+    def to_arrays(self):
+        return {'coef': self.coef, 'intercept': np.array(self.intercept)}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['coef'], float(arrays['intercept']))
+
+
+COMPILED_KINDS = {cls.kind: cls for cls in (CompiledForest, CompiledLinear)}
+
+
+def _assemble(trees, aggregate, base_score=0.0, strict=False, threshold_dtype=np.float64, value_dtype=np.float64):
+    """Concatène des arbres (feature, seuil, gauche, droite, valeur, défaut gauche) en tableaux globaux"""
+    features, thresholds, lefts, rights, values, defaults, roots, depths = [], [], [], [], [], [], [], []
+    offset = 0
+    for feature, threshold, left, right, value, default_left in trees:
+        n = len(feature)
+        is_leaf = left < 0
+        own = np.arange(n)
+        features.append(np.where(is_leaf, 0, feature))
+        thresholds.append(np.where(is_leaf, np.inf, threshold))
+        lefts.append(np.where(is_leaf, own, left) + offset)
+        rights.append(np.where(is_leaf, own, right) + offset)
+        values.append(value)
+        defaults.append(np.where(is_leaf, True, default_left))
+        roots.append(offset)
+        depths.append(_tree_depth(left, right))
+        offset += n
+    return CompiledForest(
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=np.concatenate(thresholds).astype(threshold_dtype),
+        left=np.concatenate(lefts).astype(np.int32),
+        right=np.concatenate(rights).astype(np.int32),
+        value=np.concatenate(values).astype(value_dtype),
+        default_left=np.concatenate(defaults).astype(bool),
+        roots=np.array(roots, dtype=np.int32),
+        depth=max(depths, default=0),
+        aggregate=aggregate,
+        base_score=base_score,
+        strict=strict,
+    )
+
+
+def _tree_depth(left, right):
+    """Profondeur maximale d'un arbre décrit par ses tableaux d'enfants (-1 pour une feuille)"""
+    depth, level = 0, np.array([0])
+    while True:
+        children = np.concatenate([left[level], right[level]])
+        level = children[children >= 0]
+        if not len(level):
+            return depth
+        depth += 1
+
+
+def compile_random_forest(model):
+    trees = []
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        trees.append((tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                      tree.value[:, 0, 0], missing_left))
+    return _assemble(trees, 'mean')
+
+
+def compile_xgboost(model):
+    booster = model.get_booster()
+    learner = json.loads(booster.save_raw(raw_format='json'))['learner']
+    if learner['gradient_booster']['name'] != 'gbtree' or learner['objective']['name'] != 'reg:squarederror':
+        raise ValueError("seuls les XGBoost gbtree à objectif reg:squarederror sont compilables")
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    trees = []
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.array(tree['left_children'])
+        conditions = np.array(tree['split_conditions'], dtype=np.float32)
+        # Pour une feuille, split_conditions contient la valeur de la feuille
+        trees.append((np.array(tree['split_indices']), conditions, left, np.array(tree['right_children']),
+                      np.where(left < 0, conditions, 0), np.array(tree['default_left'], dtype=bool)))
+    return _assemble(trees, 'sum', base_score=base_score, strict=True,
+                     threshold_dtype=np.float32, value_dtype=np.float32)
+
+
+def compile_model(model, model_type):
+    """Version compilée d'un modèle entraîné, ou None si le type n'est pas pris en charge"""
+    if model_type == "Random Forest":
+        return compile_random_forest(model)
+    if model_type == "XGBoost":
+        return compile_xgboost(model)
+    if model_type == "Linear Regression":
+        return CompiledLinear(model.coef_, model.intercept_)
+    return None
@@ -0,0 +1,335 @@
+"""
+Contrôle qualité des données à l'ingestion.
+
+`PassengerValidator` vérifie en une passe vectorisée par bloc les types, les
+plages de valeurs, les doublons (Date, Train_ID, Ville_Arrivee), les valeurs
+aberrantes et la cohérence des villes. Trois modes :
+- reject : l'upload est refusé dès qu'une ligne est en erreur (DataQualityError)
+- quarantine : les lignes en erreur sont écartées et conservées pour inspection
+- fix : les lignes réparables sont corrigées, les autres mises en quarantaine
+Le rapport final donne, par contrôle, le nombre de lignes concernées et quelques
+lignes d'exemple. Les doublons sont détectés d'un bloc à l'autre via les
+empreintes des clés : la première occurrence est conservée.
+"""
+import os
+import time
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+QUALITY_MODES = ('reject', 'quarantine', 'fix')
+DEFAULT_QUALITY_MODE = os.getenv('DATA_QUALITY_MODE', 'quarantine')
+
+# Au-delà, la valeur dépasse la capacité de toute rame du réseau
+PASSENGER_MAX = 10_000
+# Score z robuste (médiane / MAD) au-delà duquel un comptage est aberrant pour sa route
+OUTLIER_Z = 8.0
+OUTLIER_MIN_GROUP = 10
+SAMPLE_ROWS = 5
+QUARANTINE_MAX_ROWS = 10_000
+# Durée maximale (jours) d'une période de vacances
+HOLIDAY_MAX_DAYS = 366
+
+CITY_COLUMNS = ('Ville_Arrivee', 'Ville_Arrivée')
+
+# (nom, sévérité) dans l'ordre du rapport; seules les erreurs écartent des lignes
+CHECKS = [
+    ('invalid_date', 'error'),
+    ('missing_key', 'error'),
+    ('invalid_passengers', 'error'),
+    ('negative_passengers', 'error'),
+    ('absurd_passengers', 'error'),
+    ('duplicate', 'error'),
+    ('non_integer_passengers', 'warning'),
+    ('outlier', 'warning'),
+    ('city_variant', 'warning'),
+    ('unknown_city', 'warning'),
+]
+
+
+class DataQualityError(ValueError):
+    """Levée en mode reject; porte le rapport de qualité"""
+
+    def __init__(self, report):
+        errors = {name: check['count'] for name, check in report['checks'].items()
+                  if check['severity'] == 'error' and check['count']}
+        super().__init__("Données rejetées par le contrôle qualité: " +
+                         ', '.join(f"{name}={count}" for name, count in errors.items()))
+        self.report = report
+
+    def __reduce__(self):
+        # Reconstruite à partir du rapport (remontée depuis un worker du pool d'ingestion)
+        return type(self), (self.report,)
+
+
+def check_mode(mode):
+    mode = mode or DEFAULT_QUALITY_MODE
+    if mode not in QUALITY_MODES:
+        raise ValueError(f"quality_mode doit valoir {', '.join(QUALITY_MODES)}")
+    return mode
+
+
+def city_key(name):
+    """Forme canonique d'un nom de ville : sans accents, casse ni séparateurs multiples"""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.replace('-', ' ').replace('_', ' ').casefold().split())
+
+
+def _empty_check(severity):
+    return {'severity': severity, 'count': 0, 'samples': []}
+
+
+def _samples(frame, mask, offset, raw_dates=None, limit=SAMPLE_ROWS):
+    """Premières lignes concernées, avec leur numéro de ligne dans le fichier (0 = première ligne de données)"""
+    positions = np.flatnonzero(mask)[:limit]
+    if not len(positions):
+        return []
+    rows = frame.iloc[positions].copy()
+    if 'Date' in rows.columns and pd.api.types.is_datetime64_any_dtype(rows['Date']):
+        dates = rows['Date'].dt.strftime('%Y-%m-%d').astype(object)
+        if raw_dates is not None:
+            raw = raw_dates.iloc[positions].astype(object).to_numpy()
+            dates = dates.where(rows['Date'].notna(), raw)
+        rows['Date'] = dates
+    rows = rows.astype(object).where(rows.notna(), None)
+    records = rows.to_dict('records')
+    for position, record in zip(positions, records):
+        record['row'] = int(offset + position)
+    return records
+
+
+def _factorize_key(chunk, column):
+    """
+    Codes entiers (-1 si absent) et valeurs uniques d'une colonne clé. Les espaces
+    parasites des valeurs texte sont retirés, dans la colonne comme dans les codes.
+    """
+    codes, values = pd.factorize(chunk[column])
+    values = np.asarray(values, dtype=object)
+    stripped = np.array([v.strip() if isinstance(v, str) else v for v in values], dtype=object)
+    if len(values) and (stripped != values).any():
+        merged_codes, values = pd.factorize(stripped)
+        values = np.asarray(values, dtype=object)
+        codes = np.where(codes >= 0, merged_codes[codes], -1)
+        chunk[column] = np.where(codes >= 0, values[codes], chunk[column])
+    return codes, values
+
+
+def _hash_values(values):
+    """Empreintes uint64 (stables d'un bloc à l'autre) des valeurs uniques d'une clé"""
+    return pd.util.hash_array(np.array([str(v) for v in values], dtype=object))
+
+
+class PassengerValidator:
+    """
+    Valide un fichier passagers bloc par bloc. `validate(bloc)` renvoie le bloc
+    nettoyé; `finish()` renvoie le rapport (et lève DataQualityError en mode reject).
+    `known_cities` sert au contrôle de cohérence référentielle (villes déjà connues).
+    """
+
+    def __init__(self, mode=None, known_cities=None):
+        self.mode = check_mode(mode)
+        self.checks = {name: _empty_check(severity) for name, severity in CHECKS}
+        self.rows_in = 0
+        self.rows_out = 0
+        self.rows_fixed = 0
+        self.rows_quarantined = 0
+        self.elapsed = 0.0
+        self._seen = np.empty(0, dtype=np.uint64)
+        # clé canonique -> orthographe retenue (référence d'abord, puis la plus fréquente du premier bloc)
+        self._canonical = {}
+        self._reference = None
+        if known_cities is not None:
+            self._reference = {city_key(city) for city in known_cities}
+            for city in known_cities:
+                self._canonical.setdefault(city_key(city), city)
+        self._quarantine = []
+        self._quarantined_rows = 0
+
+    def _record(self, name, mask, frame, offset, raw_dates=None):
+        count = int(mask.sum())
+        if not count:
+            return
+        check = self.checks[name]
+        check['count'] += count
+        if len(check['samples']) < SAMPLE_ROWS:
+            check['samples'].extend(_samples(frame, mask, offset, raw_dates, SAMPLE_ROWS - len(check['samples'])))
+
+    def validate(self, chunk, raw_dates=None):
+        start = time.perf_counter()
+        city_column = next((c for c in CITY_COLUMNS if c in chunk.columns), None)
+        missing = [c for c in ('Date', 'Train_ID', 'Nombre_Passagers') if c not in chunk.columns]
+        if city_column is None:
+            missing.append('Ville_Arrivee')
+        if missing:
+            raise ValueError(f"Colonnes manquantes: {', '.join(missing)}")
+
+        offset = self.rows_in
+        n = len(chunk)
+        self.rows_in += n
+        chunk = chunk.reset_index(drop=True)
+        if raw_dates is not None:
+            raw_dates = raw_dates.reset_index(drop=True)
+
+        # Clés factorisées une fois : tous les contrôles travaillent sur des codes entiers
+        train_codes, train_values = _factorize_key(chunk, 'Train_ID')
+        city_codes, city_values = _factorize_key(chunk, city_column)
+        passengers = pd.to_numeric(chunk['Nombre_Passagers'], errors='coerce').to_numpy(dtype=float)
+
+        invalid_date = chunk['Date'].isna().to_numpy()
+        # Code -1 (valeur absente) -> dernier élément (True) du tableau des clés vides
+        blank_train = np.append(np.array([str(v) == '' for v in train_values], dtype=bool), True)
+        blank_city = np.append(np.array([str(v) == '' for v in city_values], dtype=bool), True)
+        missing_key = ~invalid_date & (blank_train[train_codes] | blank_city[city_codes])
+        checked = ~invalid_date & ~missing_key
+        invalid_passengers = checked & np.isnan(passengers)
+        negative = checked & (passengers < 0)
+        absurd = checked & (passengers > PASSENGER_MAX)
+        valid = checked & ~(invalid_passengers | negative | absurd)
+        non_integer = valid & (passengers != np.round(passengers))
+
+        # Cohérence des villes (sur les valeurs uniques) : variantes d'orthographe, villes inconnues
+        counts = np.bincount(city_codes[valid & (city_codes >= 0)], minlength=len(city_values))
+        for position in np.argsort(-counts, kind='stable'):
+            if counts[position]:
+                self._canonical.setdefault(city_key(city_values[position]), city_values[position])
+        canonical_values = np.array([self._canonical.get(city_key(v), v) for v in city_values] + [''], dtype=object)
+        is_variant = np.append(canonical_values[:-1] != np.asarray(city_values, dtype=object), False)
+        city_variant = valid & is_variant[city_codes]
+        unknown_city = np.zeros(n, dtype=bool)
+        if self._reference is not None:
+            is_unknown = np.array([city_key(v) not in self._reference for v in city_values] + [False], dtype=bool)
+            unknown_city = valid & is_unknown[city_codes]
+
+        # Doublons (Date, Train_ID, Ville) : empreinte stable d'un bloc à l'autre, calculée
+        # à partir des empreintes des valeurs uniques de chaque clé
+        key_cities = canonical_values if self.mode == 'fix' else np.append(np.asarray(city_values, dtype=object), '')
+        train_hash = np.append(_hash_values(train_values), np.uint64(0))
+        city_hash = _hash_values(key_cities)
+        with np.errstate(over='ignore'):
+            hashes = (chunk['Date'].to_numpy().astype('datetime64[ns]').view(np.int64).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+                      + train_hash[train_codes] * np.uint64(0xBF58476D1CE4E5B9) + city_hash[city_codes])
+        candidates = np.concatenate([self._seen, hashes[valid]])
+        duplicate = np.zeros(n, dtype=bool)
+        duplicate[valid] = pd.Series(candidates).duplicated().to_numpy()[len(self._seen):]
+
+        # Valeurs aberrantes : score z robuste (médiane / MAD) par route sur les lignes valides du bloc
+        outlier = np.zeros(n, dtype=bool)
+        fence = np.full(n, np.inf)
+        clean_rows = valid & ~duplicate
+        if clean_rows.sum() >= OUTLIER_MIN_GROUP:
+            routes = train_codes[clean_rows] * len(city_values) + city_codes[clean_rows]
+            values = passengers[clean_rows]
+            grouped = pd.Series(values).groupby(routes)
+            median = grouped.transform('median').to_numpy()
+            mad = pd.Series(np.abs(values - median)).groupby(routes).transform('median').to_numpy()
+            size = grouped.transform('size').to_numpy()
+            with np.errstate(invalid='ignore', divide='ignore'):
+                score = 0.6745 * np.abs(values - median) / mad
+            outlier[clean_rows] = (size >= OUTLIER_MIN_GROUP) & (mad > 0) & (score > OUTLIER_Z)
+            fence[clean_rows] = median + np.sign(values - median) * OUTLIER_Z * mad / 0.6745
+
+        masks = {
+            'invalid_date': invalid_date, 'missing_key': missing_key, 'invalid_passengers': invalid_passengers,
+            'negative_passengers': negative, 'absurd_passengers': absurd, 'duplicate': duplicate,
+            'non_integer_passengers': non_integer, 'outlier': outlier,
+            'city_variant': city_variant, 'unknown_city': unknown_city,
+        }
+        for name, mask in masks.items():
+            self._record(name, mask, chunk, offset, raw_dates)
+        self._seen = np.concatenate([self._seen, hashes[valid & ~duplicate]])
+
+        if self.mode == 'reject':
+            self.rows_out += n
+            self.elapsed += time.perf_counter() - start
+            return chunk
+
+        # Lignes écartées : erreurs, sauf les doublons supprimés (sans quarantaine) en mode fix
+        error = ~valid | duplicate
+        quarantined = ~valid if self.mode == 'fix' else error
+        if quarantined.any() and self._quarantined_rows < QUARANTINE_MAX_ROWS:
+            rows = chunk[quarantined].head(QUARANTINE_MAX_ROWS - self._quarantined_rows).copy()
+            reasons = np.full(len(rows), '', dtype=object)
+            kept = np.flatnonzero(quarantined)[:len(rows)]
+            for name, severity in CHECKS:
+                if severity == 'error':
+                    reasons = np.where(masks[name][kept], reasons + name + ';', reasons)
+            rows['row'] = offset + kept
+            rows['reasons'] = [reason.rstrip(';') for reason in reasons]
+            if raw_dates is not None:
+                rows['Date'] = rows['Date'].dt.strftime('%Y-%m-%d').astype(object).where(
+                    rows['Date'].notna(), raw_dates.iloc[kept].astype(object).to_numpy())
+            self._quarantine.append(rows)
+            self._quarantined_rows += len(rows)
+        self.rows_quarantined += int(quarantined.sum())
+
+        if self.mode == 'fix':
+            fixed = non_integer | outlier | city_variant
+            passengers = np.where(non_integer, np.round(passengers), passengers)
+            passengers = np.where(outlier, np.round(np.maximum(fence, 0)), passengers)
+            chunk[city_column] = np.where(city_variant, canonical_values[city_codes], chunk[city_column])
+            self.rows_fixed += int((fixed & ~error).sum())
+
+        # Comptages numériques; entiers quand aucune valeur décimale ne subsiste
+        chunk['Nombre_Passagers'] = passengers
+        chunk = chunk[~error].reset_index(drop=True)
+        if not (non_integer & ~error).any() or self.mode == 'fix':
+            chunk['Nombre_Passagers'] = chunk['Nombre_Passagers'].astype(np.int64)
+        self.rows_out += len(chunk)
+        self.elapsed += time.perf_counter() - start
+        return chunk
+
+    @property
+    def quarantined(self):
+        """Lignes mises en quarantaine (colonnes d'origine + row + reasons)"""
+        if not self._quarantine:
+            return None
+        return pd.concat(self._quarantine, ignore_index=True)
+
+    def finish(self):
+        """Rapport de qualité; lève DataQualityError en mode reject si des lignes sont en erreur"""
+        report = {
+            'mode': self.mode,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_quarantined': self.rows_quarantined,
+            'rows_fixed': self.rows_fixed,
+            'duration_ms': round(self.elapsed * 1000, 2),
+            'checks': self.checks,
+        }
+        if self.mode == 'reject' and any(check['count'] for check in self.checks.values()
+                                         if check['severity'] == 'error'):
+            raise DataQualityError(report)
+        return report
+
+
+def validate_calendar(frame, kind, raw_dates=None, mode=None):
+    """
+    Contrôle d'un fichier d'événements ou de vacances : dates invalides et, pour
+    les vacances, durées (colonne Vacance) hors de 1..HOLIDAY_MAX_DAYS. En mode
+    fix une durée invalide vaut 1 jour. Renvoie (frame nettoyé, rapport).
+    """
+    mode = check_mode(mode)
+    frame = frame.reset_index(drop=True)
+    checks = {'invalid_date': _empty_check('error')}
+    invalid_date = frame['Date'].isna().to_numpy()
+    masks = {'invalid_date': invalid_date}
+    invalid_duration = np.zeros(len(frame), dtype=bool)
+    if kind == 'holidays' and 'Vacance' in frame.columns:
+        duration = pd.to_numeric(frame['Vacance'], errors='coerce').to_numpy(dtype=float)
+        invalid_duration = ~invalid_date & ~((duration >= 1) & (duration <= HOLIDAY_MAX_DAYS)
+                                             & (duration == np.round(duration)))
+        checks['invalid_duration'] = _empty_check('error')
+        masks['invalid_duration'] = invalid_duration
+        if mode == 'fix':
+            frame['Vacance'] = np.where(invalid_duration, 1, np.nan_to_num(duration, nan=1)).astype(np.int64)
+    for name, mask in masks.items():
+        checks[name]['count'] = int(mask.sum())
+        checks[name]['samples'] = _samples(frame, mask, 0, raw_dates)
+
+    dropped = invalid_date | (invalid_duration if mode == 'quarantine' else False)
+    report = {'mode': mode, 'rows_in': len(frame), 'rows_out': int((~dropped).sum()), 'checks': checks}
+    if mode == 'reject' and any(check['count'] for check in checks.values()):
+        raise DataQualityError({**report, 'rows_out': 0})
+    return frame[~dropped].reset_index(drop=True), report
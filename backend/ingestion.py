@@ -0,0 +1,495 @@
+"""
+Pipeline d'ingestion unique des fichiers passagers, événements et vacances.
+
+Toutes les entrées (chargement des données d'exemple, /upload-csv, uploads
+fichier par fichier, load_sample_data.py) passent par les mêmes étapes :
+    decode     détection de l'encodage (utf-8, sinon latin-1; BOM retiré)
+    parse      lecture CSV, entière ou par blocs de `chunk_rows` lignes
+    normalize  noms de colonnes canoniques et parsing vectorisé des dates
+    validate   contrôle qualité (voir data_quality.py)
+    enrich     jointure du calendrier (événements, vacances) sur les passagers
+    store      mise au format de merged_data (dates en texte)
+Chaque étape est chronométrée (métrique oncf_stage_duration_seconds et
+`pipeline.timings`). Les fichiers peuvent être chargés en parallèle en
+passant un `executor` (concurrent.futures) : chacun est alors traité par
+`load_file` dans un worker, la fusion attend les trois.
+"""
+import io
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from data_quality import PassengerValidator, check_mode, validate_calendar
+from metrics import JOIN_DUPLICATES_AVOIDED, JOIN_ROWS_ADDED, STAGE_DURATION, record_cache, stage_timer
+
+logger = logging.getLogger("oncf")
+
+STAGES = ('decode', 'parse', 'normalize', 'validate', 'enrich', 'store')
+
+# Variantes de noms (accents, anglais) -> nom canonique utilisé dans merged_data
+COLUMN_MAPPING = {
+    'Ville_Arrivée': 'Ville_Arrivee',
+    'Événement_Présent': 'Evenement_Present',
+    'Evénement_Présent': 'Evenement_Present',
+    'Event_Present': 'Evenement_Present',
+    'Description_Événement': 'Description_Evenement',
+    'Event_Description': 'Description_Evenement',
+    'Holiday': 'Vacance',
+    'Vacation': 'Vacance',
+}
+
+# Formats essayés dans l'ordre, puis analyse automatique (jour en premier)
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y']
+# Forme (expression régulière) des valeurs acceptées par chaque format
+DATE_SHAPES = {
+    '%Y-%m-%d': r'\d{4}-\d{1,2}-\d{1,2}',
+    '%d/%m/%Y': r'\d{1,2}/\d{1,2}/\d{4}',
+    '%m/%d/%Y': r'\d{1,2}/\d{1,2}/\d{4}',
+    '%Y/%m/%d': r'\d{4}/\d{1,2}/\d{1,2}',
+    '%d-%m-%Y': r'\d{1,2}-\d{1,2}-\d{4}',
+}
+DATE_PATTERN = r'(\d{1,2}[/-]\d{1,2}[/-]\d{4}|\d{4}[/-]\d{1,2}[/-]\d{1,2})'
+FRENCH_WORDS = r'\b(?:au|du|le|la|les|de|des|à|a)\b'
+
+# Colonnes drapeau / durée des tables annexes, combinées par max (OU logique) lors du regroupement par date
+SIDE_TABLE_FLAG_COLUMNS = {'Evenement_Present', 'Vacance'}
+
+
+def _clean_date_text(text):
+    """Retire les mots français ("au", "du"...) et les espaces multiples, puis garde la partie date"""
+    text = text.str.replace(FRENCH_WORDS, '', regex=True, flags=re.IGNORECASE)
+    text = text.str.replace(r'\s+', ' ', regex=True).str.strip()
+    return text.str.extract(DATE_PATTERN, expand=False).fillna(text)
+
+
+def _parse_formats(text, parsed, out_of_bounds):
+    """
+    Essaie DATE_FORMATS dans l'ordre sur `text` et complète `parsed` et
+    `out_of_bounds` (mêmes étiquettes). Chaque format n'est appliqué qu'aux
+    valeurs qui ont sa forme (DATE_SHAPES), testée par expression régulière.
+    """
+    for fmt in DATE_FORMATS:
+        todo = parsed[text.index].isna().to_numpy() & ~out_of_bounds[text.index]
+        if not todo.any():
+            return
+        todo &= text.str.fullmatch(DATE_SHAPES[fmt]).to_numpy(dtype=bool, na_value=False)
+        if not todo.any():
+            continue
+        converted = pd.to_datetime(text[todo], format=fmt, errors='coerce')
+        in_bounds = converted.between(pd.Timestamp.min, pd.Timestamp.max)
+        out_of_bounds[converted.index[(converted.notna() & ~in_bounds).to_numpy()]] = True
+        parsed[converted.index] = converted.where(in_bounds)
+
+
+def parse_dates(date_series):
+    """
+    Parse une colonne de dates aux formats variés ("du 12/03/2024", "2024-03-12 08:00"...).
+    Le parsing porte sur les valeurs distinctes, en une opération vectorisée par
+    format : d'abord sur la partie avant l'heure, puis, pour les seules valeurs
+    restantes, après nettoyage du texte et enfin par analyse automatique. Les
+    valeurs non reconnues donnent NaT.
+    """
+    series = pd.Series(date_series)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.astype('datetime64[ns]')
+    codes, uniques = pd.factorize(series)
+    text = pd.Series(uniques, dtype=object).astype(str).str.strip()
+
+    parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+    # Dates reconnues mais hors de la plage datetime64[ns] (après 2262) : NaT, sans analyse automatique
+    out_of_bounds = np.zeros(len(text), dtype=bool)
+    cleaned = text.iloc[:0]
+    # Une date suivie d'une heure ("12/03/2024 08:00") est telle quelle le résultat du nettoyage
+    for prepare in (lambda t: t.str.replace(r'[\sT].*$', '', regex=True), _clean_date_text):
+        remaining = parsed.isna().to_numpy() & ~out_of_bounds
+        if not remaining.any():
+            break
+        cleaned = prepare(text[remaining])
+        _parse_formats(cleaned, parsed, out_of_bounds)
+    if out_of_bounds.any():
+        logger.warning("%d date(s) out of supported range (e.g. %r), using NaT",
+                       int(out_of_bounds.sum()), text[out_of_bounds].iat[0])
+    for label in cleaned.index[parsed[cleaned.index].isna().to_numpy() & ~out_of_bounds[cleaned.index]]:
+        try:
+            parsed[label] = pd.to_datetime(cleaned[label], dayfirst=True)
+        except (ValueError, TypeError, OverflowError):
+            logger.warning("Could not parse date %r, using NaT", cleaned[label])
+
+    # Code -1 (valeur manquante) -> dernière case, NaT
+    values = np.append(parsed.to_numpy(), np.datetime64('NaT', 'ns'))
+    return pd.Series(values[codes], index=series.index, dtype='datetime64[ns]')
+
+
+def normalize_columns(df):
+    """Noms de colonnes canoniques (espaces et BOM retirés, variantes renommées)"""
+    columns = [COLUMN_MAPPING.get(name, name) for name in (str(c).lstrip('\ufeff').strip() for c in df.columns)]
+    duplicated = sorted({name for name in columns if columns.count(name) > 1})
+    if duplicated:
+        raise ValueError(f"Colonnes en double après normalisation: {', '.join(duplicated)}")
+    return df.set_axis(columns, axis=1)
+
+
+def join_descriptions(values):
+    """Descriptions non vides et distinctes d'une même date, dans l'ordre du fichier"""
+    parts = [str(value).strip() for value in values if not pd.isna(value)]
+    return ' | '.join(dict.fromkeys(part for part in parts if part))
+
+
+def collapse_by_date(side_df):
+    """Une ligne par date : drapeaux et durées combinés par max, textes concaténés"""
+    if not side_df['Date'].duplicated().any():
+        return side_df
+    aggregations = {}
+    for column in side_df.columns:
+        if column == 'Date':
+            continue
+        if column in SIDE_TABLE_FLAG_COLUMNS or pd.api.types.is_numeric_dtype(side_df[column]):
+            side_df = side_df.assign(**{column: pd.to_numeric(side_df[column], errors='coerce')})
+            aggregations[column] = 'max'
+        else:
+            aggregations[column] = join_descriptions
+    return side_df.groupby('Date', sort=False, as_index=False).agg(aggregations)
+
+
+def merge_side_table(left, side_df, join):
+    """
+    Jointure gauche sur Date avec une table annexe (événements, vacances) ramenée au
+    préalable à une ligne par date : le nombre de lignes passagers ne peut pas changer.
+    """
+    collapsed = collapse_by_date(side_df)
+    if len(collapsed) < len(side_df):
+        # Lignes que la jointure aurait ajoutées : (occurrences - 1) × lignes passagers de la date
+        extra = side_df['Date'].value_counts() - 1
+        extra = extra[extra > 0]
+        avoided = int((left['Date'].map(extra).fillna(0)).sum())
+        JOIN_DUPLICATES_AVOIDED.inc(avoided, join=join)
+        logger.warning("⚠️ Table %s : %d lignes regroupées en %d dates uniques (%d lignes dupliquées évitées)",
+                       join, len(side_df), len(collapsed), avoided)
+    merged = left.merge(collapsed, on='Date', how='left', validate='many_to_one')
+    added = len(merged) - len(left)
+    JOIN_ROWS_ADDED.inc(added, join=join)
+    if added:
+        raise ValueError(f"La jointure {join} a modifié le nombre de lignes ({len(left)} -> {len(merged)})")
+    return merged
+
+
+def expand_holidays(holidays_df, with_position=False):
+    """
+    Une ligne par jour de vacances (colonne Vacance = durée en jours, 1 par défaut).
+    Avec with_position, ajoute la durée de la période et le rang du jour dans celle-ci.
+    """
+    if 'Vacance' in holidays_df.columns:
+        durations = pd.to_numeric(holidays_df['Vacance'], errors='coerce').fillna(1).clip(lower=0).astype(np.int64).to_numpy()
+    else:
+        durations = np.ones(len(holidays_df), dtype=np.int64)
+    source = np.repeat(np.arange(len(holidays_df)), durations)
+    day = np.arange(len(source)) - np.repeat(np.cumsum(durations) - durations, durations)
+    start = pd.to_datetime(holidays_df['Date']).to_numpy()[source]
+
+    def column(name, default):
+        if name in holidays_df.columns:
+            return holidays_df[name].to_numpy()[source]
+        return default
+
+    default_description = ('Vacance (jour ' + pd.Series(day + 1).astype(str) + '/'
+                           + pd.Series(durations[source]).astype(str) + ')').to_numpy()
+    expanded = pd.DataFrame({
+        'Date': start + pd.to_timedelta(day, unit='D').to_numpy(),
+        'Vacance': 1,  # Marquer comme jour de vacance
+        'Type_Vacances': column('Type_Vacances', 'Vacance'),
+        'Titre_Vacances': column('Titre_Vacances', 'Vacance'),
+        'Description_Vacances': column('Description_Vacances', default_description),
+    })
+    if with_position:
+        expanded['Duree_Vacances'] = durations[source]
+        expanded['Jour_Vacances'] = day + 1
+    return expanded
+
+
+CALENDAR_DEFAULTS = {'event_present': 0, 'vacance_present': 0, 'event_name': "", 'vacance_name': "",
+                     'vacance_duration': 0, 'vacance_day': 0}
+
+
+def calendar_by_date(events=None, holidays=None):
+    """
+    Calendrier à une ligne par date (index datetime64 à minuit), construit avec les
+    mêmes règles que l'enrichissement de merged_data : événements regroupés par date
+    (drapeau max, descriptions jointes), vacances dépliées jour par jour puis
+    regroupées. Colonnes : celles de CALENDAR_DEFAULTS. Les jours absents n'ont ni
+    événement ni vacance.
+    """
+    frames = []
+    if events is not None and len(events) and 'Date' in events.columns:
+        events = normalize_columns(events)
+        events = events.assign(Date=pd.to_datetime(events['Date'], errors='coerce').dt.normalize())
+        events = collapse_by_date(events[events['Date'].notna()])
+        name_column = next((c for c in ('Description_Evenement', 'Nom_Événement', 'Description')
+                            if c in events.columns), None)
+        present = (pd.to_numeric(events['Evenement_Present'], errors='coerce').fillna(0).to_numpy()
+                   if 'Evenement_Present' in events.columns else np.zeros(len(events)))
+        frames.append(pd.DataFrame({
+            'event_present': present.astype(np.int64),
+            'event_name': (events[name_column].fillna('').astype(str).str.strip().to_numpy(dtype=object)
+                           if name_column else "Événement"),
+        }, index=pd.DatetimeIndex(events['Date'])))
+    if holidays is not None and len(holidays) and 'Date' in holidays.columns:
+        holidays = normalize_columns(holidays)
+        holidays = holidays.assign(Date=pd.to_datetime(holidays['Date'], errors='coerce'))
+        expanded = expand_holidays(holidays[holidays['Date'].notna()].reset_index(drop=True), with_position=True)
+        expanded = collapse_by_date(expanded.assign(Date=expanded['Date'].dt.normalize()))
+        frames.append(pd.DataFrame({
+            'vacance_present': 1,
+            'vacance_name': expanded['Titre_Vacances'].fillna('').astype(str).str.strip().to_numpy(dtype=object),
+            'vacance_duration': expanded['Duree_Vacances'].to_numpy(dtype=np.int64),
+            'vacance_day': expanded['Jour_Vacances'].to_numpy(dtype=np.int64),
+        }, index=pd.DatetimeIndex(expanded['Date'])))
+
+    calendar = pd.DataFrame(index=pd.DatetimeIndex([], dtype='datetime64[ns]'))
+    for frame in frames:
+        calendar = calendar.join(frame, how='outer')
+    for column, default in CALENDAR_DEFAULTS.items():
+        if column not in calendar.columns:
+            calendar[column] = default
+        else:
+            calendar[column] = calendar[column].fillna(default)
+    calendar = calendar[list(CALENDAR_DEFAULTS)].sort_index()
+    return calendar.astype({'event_present': np.int64, 'vacance_present': np.int64,
+                            'vacance_duration': np.int64, 'vacance_day': np.int64,
+                            'event_name': object, 'vacance_name': object})
+
+
+def read_source(source):
+    """Contenu binaire d'une source : bytes, chemin de fichier ou objet fichier"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    return source.read()
+
+
+class IngestionPipeline:
+    """
+    Enchaîne les étapes d'ingestion pour un upload. `chunk_rows` active la lecture
+    et la validation par blocs; `executor` charge les fichiers en parallèle;
+    `cache` (UploadCache) évite de reparser un fichier déjà reçu.
+    """
+
+    def __init__(self, quality_mode=None, known_cities=None, chunk_rows=None, executor=None, cache=None):
+        self.quality_mode = check_mode(quality_mode)
+        self.known_cities = known_cities
+        self.chunk_rows = chunk_rows
+        self.executor = executor
+        self.cache = cache
+        self.cache_status = {}
+        self.timings = {}
+        self.file_timings = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            with stage_timer(name):
+                yield
+        finally:
+            with self._lock:
+                self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    def timings_ms(self):
+        return {name: round(self.timings[name] * 1000, 2) for name in STAGES if name in self.timings}
+
+    def decode(self, source):
+        """Renvoie (contenu binaire, encodage)"""
+        with self.stage('decode'):
+            content = read_source(source)
+            if content.startswith(b'\xef\xbb\xbf'):
+                return content, 'utf-8-sig'
+            if content.isascii():
+                # Cas courant : test ASCII rapide, sans décoder tout le fichier
+                return content, 'utf-8'
+            try:
+                content.decode('utf-8')
+                return content, 'utf-8'
+            except UnicodeDecodeError:
+                return content, 'latin-1'
+
+    def parse(self, content, encoding):
+        """Itère sur les blocs (DataFrame) du CSV, colonnes normalisées et dates parsées"""
+        with self.stage('parse'):
+            try:
+                if self.chunk_rows:
+                    reader = pd.read_csv(io.BytesIO(content), encoding=encoding, chunksize=self.chunk_rows)
+                else:
+                    reader = iter([pd.read_csv(io.BytesIO(content), encoding=encoding)])
+            except pd.errors.EmptyDataError:
+                raise ValueError("Fichier vide : aucune ligne d'en-tête") from None
+        first = True
+        while True:
+            with self.stage('parse'):
+                chunk = next(reader, None)
+                if chunk is None and first:
+                    # Fichier réduit à l'en-tête : un bloc vide, avec les colonnes attendues
+                    chunk = pd.read_csv(io.BytesIO(content), encoding=encoding, nrows=0)
+            if chunk is None:
+                return
+            first = False
+            with self.stage('normalize'):
+                chunk = normalize_columns(chunk)
+                if 'Date' not in chunk.columns:
+                    raise ValueError("Colonne manquante: Date")
+                raw_dates = chunk['Date']
+                chunk = chunk.assign(Date=parse_dates(raw_dates))
+            yield chunk, raw_dates
+
+    def read(self, source, kind, digest=None):
+        """
+        Étapes decode → parse → normalize, servies par le cache d'upload quand
+        l'empreinte du fichier y est déjà (voir upload_cache.py).
+        """
+        if self.cache is None or digest is None:
+            yield from self.parse(*self.decode(source))
+            return
+        with self.stage('parse'):
+            cached = self.cache.get(digest)
+        with self._lock:
+            self.cache_status[kind] = 'miss' if cached is None else 'hit'
+        if cached is not None:
+            frame, raw_dates = cached
+            step = self.chunk_rows or max(len(frame), 1)
+            for start in range(0, max(len(frame), 1), step):
+                yield frame.iloc[start:start + step], raw_dates.iloc[start:start + step]
+            return
+        parsed = []
+        for chunk, raw_dates in self.parse(*self.decode(source)):
+            parsed.append((chunk, raw_dates))
+            yield chunk, raw_dates
+        with self.stage('store'):
+            self.cache.put(digest,
+                           pd.concat([chunk for chunk, _ in parsed], ignore_index=True),
+                           pd.concat([raw for _, raw in parsed], ignore_index=True))
+
+    def load_passengers(self, source, digest=None):
+        """Fichier passagers -> (lignes retenues, rapport qualité, lignes en quarantaine)"""
+        validator = PassengerValidator(self.quality_mode, known_cities=self.known_cities)
+        chunks = []
+        for chunk, raw_dates in self.read(source, 'passengers', digest):
+            with self.stage('validate'):
+                chunks.append(validator.validate(chunk, raw_dates))
+        with self.stage('validate'):
+            report = validator.finish()
+        passengers = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+        return passengers, report, validator.quarantined
+
+    def load_side_table(self, source, kind, digest=None):
+        """Fichier événements ou vacances -> (lignes retenues, rapport qualité)"""
+        parsed = list(self.read(source, kind, digest))
+        frame = pd.concat([chunk for chunk, _ in parsed], ignore_index=True)
+        raw_dates = pd.concat([raw for _, raw in parsed], ignore_index=True)
+        with self.stage('validate'):
+            return validate_calendar(frame, kind, raw_dates, self.quality_mode)
+
+    def merge(self, passengers, events=None, holidays=None):
+        """Étapes enrich et store : passagers + calendrier -> merged_data"""
+        with self.stage('enrich'):
+            merged = normalize_columns(passengers)
+            if events is not None:
+                merged = merge_side_table(merged, normalize_columns(events), 'events')
+            if 'Evenement_Present' not in merged.columns:
+                merged['Evenement_Present'] = 0
+            if 'Description_Evenement' not in merged.columns:
+                merged['Description_Evenement'] = ''
+            merged['Evenement_Present'] = pd.to_numeric(merged['Evenement_Present'], errors='coerce').fillna(0).astype(np.int64)
+            merged['Description_Evenement'] = merged['Description_Evenement'].fillna('')
+
+            if holidays is not None and len(holidays):
+                # Une ligne par jour de vacances; les périodes qui se chevauchent sont regroupées par date
+                merged = merge_side_table(merged, expand_holidays(normalize_columns(holidays)), 'holidays')
+            merged['Vacance'] = pd.to_numeric(merged['Vacance'], errors='coerce').fillna(0).astype(np.int64) \
+                if 'Vacance' in merged.columns else 0
+
+        with self.stage('store'):
+            # Dates en texte pour la sérialisation JSON
+            merged['Date'] = merged['Date'].dt.strftime('%Y-%m-%d')
+        return merged
+
+    def _collect(self, kind, loaded, timings, cache_status, elapsed, pid):
+        """Reprend durées et statut du cache d'un fichier chargé par load_file"""
+        with self._lock:
+            for name, seconds in timings.items():
+                self.timings[name] = self.timings.get(name, 0.0) + seconds
+            self.cache_status.update(cache_status)
+            self.file_timings[kind] = round(elapsed * 1000, 2)
+        if pid != os.getpid():
+            # Chargé dans un processus worker : ses métriques sont reportées ici
+            for name, seconds in timings.items():
+                STAGE_DURATION.observe(seconds, stage=name)
+            for status in cache_status.values():
+                record_cache('upload', status == 'hit')
+        return loaded
+
+    def run(self, passengers, events=None, holidays=None, digests=None):
+        """
+        Ingestion complète. Les fichiers sont chargés (decode → validate) en
+        parallèle sur `executor` s'il est fourni (de préférence un
+        ProcessPoolExecutor : le parsing est limité par le GIL); la fusion
+        démarre quand les trois sont prêts. `digests` associe à chaque fichier ('passengers',
+        'events', 'holidays') son empreinte pour le cache d'upload. Renvoie un
+        dict : merged, passengers, events, holidays, quality (rapport par
+        fichier), quarantined, cache (hit/miss par fichier), timings_ms
+        (cumul par étape) et files_ms (durée de chargement de chaque fichier).
+        """
+        digests = digests or {}
+        jobs = [('passengers', passengers)]
+        jobs += [(kind, source) for kind, source in (('events', events), ('holidays', holidays)) if source is not None]
+        options = {'quality_mode': self.quality_mode, 'known_cities': self.known_cities,
+                   'chunk_rows': self.chunk_rows, 'cache': self.cache}
+
+        if self.executor:
+            futures = [(kind, self.executor.submit(load_file, kind, source, digests.get(kind), **options))
+                       for kind, source in jobs]
+            loaded = {kind: self._collect(kind, *future.result()) for kind, future in futures}
+        else:
+            loaded = {kind: self._collect(kind, *load_file(kind, source, digests.get(kind), **options))
+                      for kind, source in jobs}
+        passengers_df, passengers_quality, quarantined = loaded['passengers']
+        events_df, events_quality = loaded.get('events', (None, None))
+        holidays_df, holidays_quality = loaded.get('holidays', (None, None))
+        merged = self.merge(passengers_df, events_df, holidays_df)
+        quality = {'passengers': passengers_quality}
+        if events_quality is not None:
+            quality['events'] = events_quality
+        if holidays_quality is not None:
+            quality['holidays'] = holidays_quality
+        return {
+            'merged': merged,
+            'passengers': passengers_df,
+            'events': events_df,
+            'holidays': holidays_df,
+            'quality': quality,
+            'quarantined': quarantined,
+            'cache': dict(self.cache_status),
+            'timings_ms': self.timings_ms(),
+            'files_ms': dict(self.file_timings),
+        }
+
+
+def load_file(kind, source, digest=None, **options):
+    """
+    Charge un fichier (decode → validate) dans un pipeline dédié, exécutable dans
+    un worker d'un ProcessPoolExecutor. Renvoie (résultat, durées par étape en
+    secondes, statut du cache, durée totale, pid du processus).
+    """
+    start = time.perf_counter()
+    pipeline = IngestionPipeline(**options)
+    if kind == 'passengers':
+        loaded = pipeline.load_passengers(source, digest)
+    else:
+        loaded = pipeline.load_side_table(source, kind, digest)
+    return loaded, pipeline.timings, pipeline.cache_status, time.perf_counter() - start, os.getpid()
@@ -1,22 +1,112 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Body
+from fastapi import FastAPI, File, UploadFile, HTTPException, Body, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import mean_squared_error, r2_score
-import xgboost as xgb
+# scikit-learn et xgboost sont importés à la demande (voir modeling.make_model) pour
+# que l'import de ce module et le démarrage du serveur restent rapides
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime, timedelta
+import asyncio
+import functools
 import json
 import io
-from typing import List, Dict, Any
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
-import re
 
-app = FastAPI(title="ONCF Passenger Prediction API")
+from profiling import maybe_profile, profile_block, profile_thread, get_profile, list_profiles
+from synthetic_data import generate_merged_dataset
+from modeling import (
+    make_model, fit_partitioned, linear_sufficient_stats, update_model, PARTITION_MODES,
+    residual_quantiles, fit_quantile_model, forest_interval, residual_interval,
+)
+from compiled_models import compile_model
+from batch_scoring import iter_input_chunks, CsvChunkWriter, ArrowChunkWriter
+from capacity import normalize_capacity_table, capacity_plan, aggregate_plan
+from model_registry import save_model, load_model, list_models, registry_path
+from data_quality import DataQualityError
+from ingestion import IngestionPipeline, calendar_by_date, CALENDAR_DEFAULTS
+from upload_cache import UploadCache, read_upload
+from scheduler import JobScheduler
+from accuracy import (
+    AccuracyTracker, ACCURACY_MIN_SAMPLES, DRIFT_MAPE_THRESHOLD, DRIFT_BIAS_THRESHOLD,
+)
+from metrics import (
+    REQUEST_DURATION, DATASET_ROWS, TRAINED_MODELS, DATA_QUALITY_ROWS,
+    stage_timer, record_cache, render_prometheus,
+)
+
+# Logs structurés (clé=valeur); niveau réglable via LOG_LEVEL (DEBUG, INFO, WARNING...).
+# Les arguments sont formatés paresseusement : un logger.debug désactivé ne coûte rien.
+logger = logging.getLogger("oncf")
+if not logger.handlers:
+    _log_handler = logging.StreamHandler()
+    _log_handler.setFormatter(logging.Formatter("%(asctime)s level=%(levelname)s logger=%(name)s %(message)s"))
+    logger.addHandler(_log_handler)
+    logger.propagate = False
+logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+SAMPLE_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sample_data')
+# Endpoints de diagnostic (/debug/...) : désactivés par défaut, à ne pas exposer en production
+DEBUG_ENDPOINTS = os.getenv('DEBUG_ENDPOINTS', '').lower() in ('1', 'true', 'yes', 'on')
+
+# Pool de chargement des fichiers d'un upload (decode → validate, un fichier par tâche).
+# Des processus plutôt que des threads : lecture CSV et parsing des dates gardent le GIL
+# Le pool est créé et arrêté par le lifespan (pas de processus lancés à l'import du module)
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', min(3, os.cpu_count() or 1)))
+ingestion_executor = None
+# Pool d'entraînement des modèles partitionnés (voir modeling.fit_partitioned), créé par le lifespan.
+# Les pools démarrent leurs workers par 'spawn' : un fork depuis un serveur multithread n'est pas sûr
+TRAIN_WORKERS = int(os.getenv('TRAIN_WORKERS', os.cpu_count() or 1))
+training_executor = None
+
+# Réentraînement planifié (heures creuses) et prévisions matérialisées pour les horizons standard
+RETRAIN_CRON = os.getenv('RETRAIN_CRON', '0 2 * * *')
+RETRAIN_MODELS = [m.strip() for m in os.getenv('RETRAIN_MODELS', 'Linear Regression,Random Forest,XGBoost').split(',') if m.strip()]
+FORECAST_HORIZONS = sorted({int(d) for d in os.getenv('FORECAST_HORIZONS', '7,14,30').split(',') if d.strip()})
+job_scheduler = JobScheduler()
+
+# Passe à True une fois la restauration des données de démarrage terminée
+data_ready = False
+_startup_load = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Restaure les données d'exemple en arrière-plan sans bloquer l'ouverture du serveur"""
+    global _startup_load, ingestion_executor, training_executor
+    if INGEST_WORKERS > 1:
+        ingestion_executor = ProcessPoolExecutor(max_workers=INGEST_WORKERS, mp_context=get_context('spawn'))
+    if TRAIN_WORKERS > 1:
+        training_executor = ProcessPoolExecutor(max_workers=TRAIN_WORKERS, mp_context=get_context('spawn'))
+    loop = asyncio.get_running_loop()
+    _startup_load = loop.run_in_executor(None, load_sample_data_on_startup)
+    if RETRAIN_CRON:
+        job_scheduler.add('refresh-forecasts', RETRAIN_CRON, refresh_forecasts)
+        job_scheduler.start()
+    yield
+    await job_scheduler.stop()
+    if not _startup_load.done():
+        _startup_load.cancel()
+    executors = [executor for executor in (ingestion_executor, training_executor) if executor is not None]
+    ingestion_executor = training_executor = None
+    for executor in executors:
+        await loop.run_in_executor(None, functools.partial(executor.shutdown, cancel_futures=True))
+
+async def wait_for_startup_load():
+    """Attend la fin de la restauration de démarrage avant de modifier les données globales"""
+    if _startup_load is not None and not _startup_load.done():
+        await asyncio.shield(_startup_load)
+
+app = FastAPI(title="ONCF Passenger Prediction API", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -27,13 +117,117 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compresser les réponses volumineuses (aperçu, historique, prédictions)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Enregistre la latence de chaque requête par route (gabarit, pas l'URL brute)"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get('route')
+        REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else 'unmatched',
+            status=str(status)
+        )
+
 # Global variables to store data and models
 merged_data = None
 trained_models = {}
+# Sérialise entraînement, remplacement de l'entrée dans trained_models et invalidation du cache de prévisions
+# (requêtes HTTP, flux SSE et tâche planifiée s'exécutent sur des threads différents)
+training_lock = threading.Lock()
 prediction_history = []
 evenements_df = None
 vacances_df = None
 passengers_df = None
+capacity_df = None
+
+# Versions des données et de l'historique, utilisées pour les ETags
+data_version = 0
+data_last_updated = None
+history_version = 0
+# Versions du calendrier (événements/vacances) et des modèles, utilisées par le cache de prévisions
+calendar_version = 0
+model_version = 0
+capacity_version = 0
+_response_body_cache = {}
+# model_type -> ((version modèle, version données, version calendrier), jours calculés, prédictions)
+_forecast_cache = {}
+# (prediction_id, capacity_version, paramètres) -> rapport de capacité
+_capacity_cache = {}
+# Derniers rapports du contrôle qualité par jeu de données et lignes passagers en quarantaine
+data_quality_reports = {}
+quarantined_rows = None
+# Frames parsées des fichiers uploadés, indexées par empreinte de contenu (voir upload_cache.py)
+upload_cache = UploadCache()
+# model_type -> prévision matérialisée par la tâche planifiée (remplacé d'un bloc à chaque publication)
+published_forecasts = {}
+forecast_store_version = 0
+# Prévisions émises jointes aux valeurs observées à chaque ingestion (voir accuracy.py)
+accuracy_tracker = AccuracyTracker(FORECAST_HORIZONS)
+drifting_models = set()
+# Distingue les versions d'un processus à l'autre (les compteurs repartent de zéro au redémarrage)
+_etag_epoch = datetime.now().strftime('%Y%m%d%H%M%S%f')
+
+def bump_data_version():
+    """Signale une modification de merged_data, evenements_df ou vacances_df"""
+    global data_version, data_last_updated
+    data_version += 1
+    data_last_updated = datetime.now().isoformat()
+
+def bump_history_version():
+    """Signale une modification de prediction_history"""
+    global history_version
+    history_version += 1
+
+def bump_calendar_version():
+    """Signale une modification de evenements_df ou vacances_df"""
+    global calendar_version
+    calendar_version += 1
+
+def next_model_version():
+    """Numéro de version attribué à chaque modèle entraîné ou mis à jour"""
+    global model_version
+    model_version += 1
+    return model_version
+
+def make_etag(*parts):
+    """Construit un ETag faible à partir des versions (valable avant et après compression)"""
+    return 'W/"' + '-'.join(str(p) for p in (_etag_epoch,) + parts) + '"'
+
+def not_modified_response(request: Request, etag):
+    """Renvoie une réponse 304 si le client possède déjà la représentation courante"""
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return None
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    if '*' in candidates or etag in candidates or etag[2:] in candidates:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    return None
+
+def cached_response(key, etag, build):
+    """
+    Réutilise le corps déjà sérialisé tant que l'ETag ne change pas.
+    `build` renvoie une Response et n'est appelé qu'après une modification.
+    """
+    cached = _response_body_cache.get(key)
+    record_cache('response', cached is not None and cached[0] == etag)
+    if cached is None or cached[0] != etag:
+        response = build()
+        cached = (etag, response.body, response.media_type, dict(response.headers))
+        _response_body_cache[key] = cached
+    _, body, media_type, headers = cached
+    headers = {k: v for k, v in headers.items() if k.lower() not in ('content-length', 'content-type')}
+    headers.update({"ETag": etag, "Cache-Control": "no-cache"})
+    return Response(content=body, media_type=media_type, headers=headers)
 
 # Helper function to sanitize data for JSON
 def sanitize_for_json(data):
@@ -49,246 +243,520 @@ def sanitize_for_json(data):
     else:
         return data
 
-def clean_and_parse_dates(date_series):
-    """Clean and parse dates with various formats"""
-    cleaned_dates = []
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+# /train-and-predict/stream : jours prédits par appel au modèle, intervalle des keep-alive
+STREAM_FORECAST_DAYS = 7
+SSE_KEEPALIVE_SECONDS = 15
 
-    for date_str in date_series:
-        if pd.isna(date_str):
-            cleaned_dates.append(pd.NaT)
-            continue
-
-        # Convert to string if not already
-        date_str = str(date_str).strip()
-
-        # Remove French text like "au", "du", etc.
-        date_str = re.sub(r'\b(au|du|le|la|les|de|des|à|a)\b', '', date_str, flags=re.IGNORECASE)
+def wants_arrow(request: Request) -> bool:
+    """Indique si le client demande une réponse Arrow IPC (en-tête Accept ou ?format=arrow)"""
+    if request.query_params.get('format') == 'arrow':
+        return True
+    return ARROW_STREAM_MEDIA_TYPE in request.headers.get('accept', '')
 
-        # Remove extra spaces
-        date_str = re.sub(r'\s+', ' ', date_str).strip()
-
-        # Try to extract just the date part (remove time if present)
-        date_match = re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{4}|\d{4}[/-]\d{1,2}[/-]\d{1,2}', date_str)
-        if date_match:
-            date_str = date_match.group()
-
-        try:
-            # Try different date formats
-            for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%Y/%m/%d', '%d-%m-%Y']:
-                try:
-                    parsed_date = pd.to_datetime(date_str, format=fmt)
-                    cleaned_dates.append(parsed_date)
-                    break
-                except:
-                    continue
-            else:
-                # If no format works, try pandas' automatic parsing
-                try:
-                    parsed_date = pd.to_datetime(date_str, dayfirst=True)
-                    cleaned_dates.append(parsed_date)
-                except:
-                    print(f"Warning: Could not parse date '{date_str}', using NaT")
-                    cleaned_dates.append(pd.NaT)
-        except Exception as e:
-            print(f"Error parsing date '{date_str}': {e}")
-            cleaned_dates.append(pd.NaT)
-
-    return pd.Series(cleaned_dates)
+def arrow_response(df, metadata=None, filename=None):
+    """
+    Sérialise un DataFrame en flux Arrow IPC.
+    Les colonnes texte sont encodées en dictionnaire pour ne pas répéter
+    les identifiants de train, villes et noms d'événements à chaque ligne.
+    """
+    import pyarrow as pa
+
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object or pd.api.types.is_string_dtype(df[col]):
+            df[col] = df[col].astype('category')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b'oncf': json.dumps(sanitize_for_json(metadata), default=str).encode('utf-8'),
+        })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    headers = {}
+    if filename:
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_STREAM_MEDIA_TYPE, headers=headers)
+
+def known_cities():
+    """Villes du jeu de données courant (référence du contrôle de cohérence), ou None"""
+    if merged_data is None:
+        return None
+    column = 'Ville_Arrivee' if 'Ville_Arrivee' in merged_data.columns else 'Ville_Arrivée'
+    return merged_data[column].dropna().unique().tolist()
+
+def publish_quality(dataset, report, quarantined=None):
+    """Conserve le rapport pour GET /data-quality et alimente les métriques"""
+    global quarantined_rows
+    data_quality_reports[dataset] = {**report, 'checked_at': datetime.now().isoformat()}
+    if dataset == 'passengers':
+        quarantined_rows = quarantined
+    for name, check in report['checks'].items():
+        if check['count']:
+            DATA_QUALITY_ROWS.inc(check['count'], dataset=dataset, check=name)
+    flagged = {name: check['count'] for name, check in report['checks'].items() if check['count']}
+    if flagged:
+        logger.warning("⚠️ Contrôle qualité dataset=%s mode=%s rows_in=%d rows_out=%d checks=%s",
+                       dataset, report['mode'], report['rows_in'], report['rows_out'], flagged)
+
+def quality_error_response(e):
+    return HTTPException(status_code=400, detail=sanitize_for_json({"message": str(e), "data_quality": e.report}))
+
+def ingestion_pipeline(quality_mode=None, **options):
+    """Pipeline d'ingestion (voir ingestion.py), villes du jeu courant comme référence"""
+    return IngestionPipeline(quality_mode, known_cities=known_cities(), cache=upload_cache, **options)
+
+def profiled_call(profile, func, *args):
+    """Appelle func(*args) (dans le pool de threads) en l'ajoutant au profil de la requête, s'il y en a un"""
+    with profile_thread(profile):
+        return func(*args)
 
 def merge_available_data():
     """Fusionne les données disponibles (passagers, événements, vacances)"""
-    global merged_data, passengers_df, evenements_df, vacances_df
+    global merged_data
 
     if passengers_df is None:
         return None
 
-    # Commencer avec les données passagers
-    merged_data = passengers_df.copy()
-
-    # Ajouter les événements si disponibles
-    if evenements_df is not None:
-        merged_data = merged_data.merge(evenements_df, on='Date', how='left')
-        # Remplir les valeurs manquantes
-        if 'Evenement_Present' in merged_data.columns:
-            merged_data['Evenement_Present'] = merged_data['Evenement_Present'].fillna(0)
-        else:
-            merged_data['Evenement_Present'] = 0
-        if 'Description_Evenement' in merged_data.columns:
-            merged_data['Description_Evenement'] = merged_data['Description_Evenement'].fillna('')
-        else:
-            merged_data['Description_Evenement'] = ''
-    else:
-        # Ajouter des colonnes par défaut si pas d'événements
-        merged_data['Evenement_Present'] = 0
-        merged_data['Description_Evenement'] = ''
-
-    # Ajouter les vacances si disponibles
-    if vacances_df is not None:
-        # Créer un DataFrame étendu pour les vacances avec tous les jours consécutifs
-        vacances_extended = []
-        for _, row in vacances_df.iterrows():
-            date_debut = pd.to_datetime(row['Date'])
-            duree_vacances = int(row.get('Vacance', 1))  # Valeur par défaut 1 si pas spécifiée
-
-            # Créer une entrée pour chaque jour de vacance
-            for i in range(duree_vacances):
-                jour_vacance = date_debut + pd.Timedelta(days=i)
-                vacances_extended.append({
-                    'Date': jour_vacance,
-                    'Vacance': 1,  # Marquer comme jour de vacance
-                    'Type_Vacances': row.get('Type_Vacances', 'Vacance'),
-                    'Titre_Vacances': row.get('Titre_Vacances', 'Vacance'),
-                    'Description_Vacances': row.get('Description_Vacances', f'Vacance (jour {i+1}/{duree_vacances})')
-                })
-
-        if vacances_extended:
-            vacances_extended_df = pd.DataFrame(vacances_extended)
-            merged_data = merged_data.merge(vacances_extended_df, on='Date', how='left')
-            if 'Vacance' in merged_data.columns:
-                merged_data['Vacance'] = merged_data['Vacance'].fillna(0)
-            else:
-                merged_data['Vacance'] = 0
-        else:
-            merged_data['Vacance'] = 0
-    else:
-        # Ajouter une colonne par défaut si pas de vacances
-        merged_data['Vacance'] = 0
-
-    # Normalize column names for consistency - Enhanced version
-    def normalize_column_names(df):
-        """Normalise les noms de colonnes en gérant les accents et variations"""
-        column_mapping = {
-            # Variations pour les villes
-            'Ville_Arrivée': 'Ville_Arrivee',
-            'Ville_Arrivee': 'Ville_Arrivee',
-
-            # Variations pour les événements
-            'Événement_Présent': 'Evenement_Present',
-            'Evenement_Present': 'Evenement_Present',
-            'Event_Present': 'Evenement_Present',
-
-            # Variations pour les descriptions d'événements
-            'Description_Événement': 'Description_Evenement',
-            'Description_Evenement': 'Description_Evenement',
-            'Event_Description': 'Description_Evenement',
-
-            # Variations pour les vacances
-            'Vacance': 'Vacance',
-            'Holiday': 'Vacance',
-            'Vacation': 'Vacance'
-        }
-
-        # Appliquer le mapping
-        for old_name, new_name in column_mapping.items():
-            if old_name in df.columns:
-                df = df.rename(columns={old_name: new_name})
-
-        return df
-
-    # Appliquer la normalisation
-    merged_data = normalize_column_names(merged_data)
-
-    # Convert Date back to string for JSON serialization
-    merged_data['Date'] = merged_data['Date'].dt.strftime('%Y-%m-%d')
+    merged_data = ingestion_pipeline().merge(passengers_df, evenements_df, vacances_df)
+    bump_data_version()
+    track_forecast_accuracy()
 
     return merged_data
 
+def track_forecast_accuracy():
+    """
+    Joint les nouvelles valeurs observées aux prévisions émises et met à jour MAPE et
+    biais glissants. Un modèle qui passe en dérive relance la tâche refresh-forecasts
+    (réentraînement sur les données qui viennent d'arriver) sans attendre l'heure creuse.
+    """
+    global drifting_models
+    matched = accuracy_tracker.evaluate(merged_data)
+    if not matched:
+        return {'matched_rows': 0}
+    drifting = set(accuracy_tracker.drifting_models())
+    new_drift = sorted(drifting - drifting_models)
+    drifting_models = drifting
+    retrain_triggered = False
+    if new_drift:
+        retrain_triggered = job_scheduler.submit('refresh-forecasts', reason='drift')
+        logger.warning("⚠️ Dérive des prévisions models=%s retrain_triggered=%s", new_drift, retrain_triggered)
+    logger.info("📏 Précision des prévisions mise à jour matched_rows=%d drifting=%s", matched, sorted(drifting))
+    return {'matched_rows': matched, 'drifting_models': sorted(drifting), 'retrain_triggered': retrain_triggered}
+
 # Load sample data on startup
 def load_sample_data_on_startup():
-    """Charge les données d'exemple au démarrage"""
-    global merged_data, evenements_df, vacances_df
+    """
+    Charge les données d'exemple au démarrage.
+    Exécuté dans un thread par le lifespan : les globales ne sont publiées qu'une
+    fois la fusion terminée, et seulement si aucun upload n'a eu lieu entre-temps.
+    """
+    global merged_data, passengers_df, evenements_df, vacances_df, data_ready
     try:
-        import pandas as pd
-        import os
-
         # Chemins des fichiers
-        passengers_file = '../sample_data/passengers.csv'
-        evenements_file = '../sample_data/evenements.csv'
-        vacances_file = '../sample_data/vacances.csv'
+        passengers_file = os.path.join(SAMPLE_DATA_DIR, 'passengers.csv')
+        evenements_file = os.path.join(SAMPLE_DATA_DIR, 'evenements.csv')
+        vacances_file = os.path.join(SAMPLE_DATA_DIR, 'vacances.csv')
 
         # Vérifier que les fichiers existent
         if not all(os.path.exists(f) for f in [passengers_file, evenements_file, vacances_file]):
-            print("⚠️ Fichiers d'exemple non trouvés, démarrage sans données")
+            logger.warning("⚠️ Fichiers d'exemple non trouvés, démarrage sans données")
+            return
+
+        result = IngestionPipeline(executor=ingestion_executor).run(passengers_file, evenements_file, vacances_file)
+
+        # Ne pas écraser des données uploadées pendant le chargement
+        if data_version > 0:
+            logger.info("ℹ️ Données déjà uploadées, données d'exemple ignorées")
             return
 
-        # Lire les fichiers CSV
-        passengers_df = pd.read_csv(passengers_file)
-        evenements_df = pd.read_csv(evenements_file)
-        vacances_df = pd.read_csv(vacances_file)
-
-        # Garder le nom original de la colonne avec accent
-        # Pas besoin de renommer Description_Événement
-
-        # Convertir les dates
-        passengers_df['Date'] = clean_and_parse_dates(passengers_df['Date'])
-        evenements_df['Date'] = clean_and_parse_dates(evenements_df['Date'])
-        vacances_df['Date'] = clean_and_parse_dates(vacances_df['Date'])
-
-        # Supprimer les lignes avec dates invalides
-        passengers_df = passengers_df.dropna(subset=['Date'])
-        evenements_df = evenements_df.dropna(subset=['Date'])
-        vacances_df = vacances_df.dropna(subset=['Date'])
-
-        # Fusionner les données
-        merged_data = passengers_df.merge(evenements_df, on='Date', how='left')
-        merged_data = merged_data.merge(vacances_df, on='Date', how='left')
-
-        # Remplir les valeurs manquantes
-        merged_data['Evenement_Present'] = merged_data['Evenement_Present'].fillna(0)
-        merged_data['Vacance'] = merged_data['Vacance'].fillna(0)
-        if 'Description_Evenement' in merged_data.columns:
-            merged_data['Description_Evenement'] = merged_data['Description_Evenement'].fillna('')
+        merged_data = result['merged']
+        passengers_df = result['passengers']
+        evenements_df = result['events']
+        vacances_df = result['holidays']
+        for dataset, report in result['quality'].items():
+            publish_quality(dataset, report, result['quarantined'] if dataset == 'passengers' else None)
+        bump_data_version()
+        bump_calendar_version()
+
+        logger.info("✅ Données d'exemple chargées: %d enregistrements timings_ms=%s",
+                    merged_data.shape[0], result['timings_ms'])
+
+    except Exception as e:
+        logger.warning("⚠️ Erreur lors du chargement des données d'exemple: %s", e)
+    finally:
+        data_ready = True
+
+FEATURE_COLUMNS = ['Train_ID_encoded', 'Ville_Arrivée_encoded', 'day_of_year',
+                   'month', 'day_of_week', 'Evenement_Present', 'Vacance']
+
+@contextmanager
+def training_stage(stage, progress=None):
+    """stage_timer, plus les événements de progression started/done si `progress` est fourni"""
+    if progress is None:
+        with stage_timer(stage):
+            yield
+        return
+    progress('stage', {'stage': stage, 'status': 'started'})
+    start = time.perf_counter()
+    with stage_timer(stage):
+        yield
+    progress('stage', {'stage': stage, 'status': 'done', 'duration_ms': round((time.perf_counter() - start) * 1000, 2)})
+
+def fit_model(source_df, model_type, partition_by=None, min_partition_rows=50, interval_level=None, progress=None):
+    """
+    Entraîne le modèle demandé sur un jeu fusionné (format merged_data).
+    Avec partition_by ('city' ou 'route'), entraîne un modèle par partition
+    en parallèle plus un modèle global de repli (voir modeling.fit_partitioned).
+    Avec interval_level, un XGBoost entraîne aussi son modèle quantile.
+    `progress(event, data)`, si fourni, est appelé au début et à la fin de chaque étape.
+    Renvoie l'entrée stockée dans trained_models (modèle, encodeurs, métriques).
+    """
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    model = make_model(model_type)
+    if model is None:
+        raise HTTPException(status_code=400, detail="Invalid model type")
+    if partition_by is not None and partition_by not in PARTITION_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid partition_by, expected one of {list(PARTITION_MODES)}")
+    if interval_level is not None and not 0 < interval_level < 1:
+        raise HTTPException(status_code=400, detail="Invalid interval_level, expected a value between 0 and 1")
+
+    with training_stage('feature_build', progress):
+        # Prepare features
+        df = source_df.copy()
+
+        # Convert Date back to datetime for processing
+        df['Date'] = pd.to_datetime(df['Date'])
+
+        # Create label encoders for categorical variables
+        le_train = LabelEncoder()
+        le_ville = LabelEncoder()
+
+        df['Train_ID_encoded'] = le_train.fit_transform(df['Train_ID'])
+        df['Ville_Arrivée_encoded'] = le_ville.fit_transform(df['Ville_Arrivee'])
+
+        # Create date features
+        df['day_of_year'] = df['Date'].dt.dayofyear
+        df['month'] = df['Date'].dt.month
+        df['day_of_week'] = df['Date'].dt.dayofweek
+
+        # Prepare feature matrix
+        X = df[FEATURE_COLUMNS]
+        y = df['Nombre_Passagers']
+
+        # Split data for training
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+
+    with training_stage('fit', progress):
+        # Train the model
+        if partition_by:
+            model = fit_partitioned(X_train, y_train, model_type, partition_by, min_partition_rows,
+                                    executor=training_executor)
         else:
-            merged_data['Description_Evenement'] = ''
-
-        # Normalize column names for consistency using the enhanced function
-        def normalize_column_names_startup(df):
-            """Normalise les noms de colonnes en gérant les accents et variations"""
-            column_mapping = {
-                # Variations pour les villes
-                'Ville_Arrivée': 'Ville_Arrivee',
-                'Ville_Arrivee': 'Ville_Arrivee',
-
-                # Variations pour les événements
-                'Événement_Présent': 'Evenement_Present',
-                'Evenement_Present': 'Evenement_Present',
-                'Event_Present': 'Evenement_Present',
-
-                # Variations pour les descriptions d'événements
-                'Description_Événement': 'Description_Evenement',
-                'Description_Evenement': 'Description_Evenement',
-                'Event_Description': 'Description_Evenement',
-
-                # Variations pour les vacances
-                'Vacance': 'Vacance',
-                'Holiday': 'Vacance',
-                'Vacation': 'Vacance'
-            }
+            model.fit(X_train, y_train)
+        quantile_model = None
+        if interval_level is not None and model_type == "XGBoost" and not partition_by:
+            quantile_model = fit_quantile_model(X_train, y_train, interval_level)
 
-            # Appliquer le mapping
-            for old_name, new_name in column_mapping.items():
-                if old_name in df.columns:
-                    df = df.rename(columns={old_name: new_name})
+    with training_stage('evaluate', progress):
+        # Evaluate model
+        y_pred_test = model.predict(X_test)
+        mse = mean_squared_error(y_test, y_pred_test)
+        r2 = r2_score(y_test, y_pred_test)
 
-            return df
+    return {
+        'model': model,
+        'le_train': le_train,
+        'le_ville': le_ville,
+        'feature_columns': FEATURE_COLUMNS,
+        'mse': mse,
+        'r2': r2,
+        'partition_by': partition_by,
+        'n_partitions': model.n_partitions if partition_by else None,
+        'min_partition_rows': min_partition_rows if partition_by else None,
+        # XᵀX, Xᵀy conservés pour les mises à jour incrémentales de la régression linéaire
+        'sufficient_stats': (linear_sufficient_stats(X_train, y_train)
+                             if model_type == "Linear Regression" and not partition_by else None),
+        # Intervalles de prédiction : quantiles des résidus (tous modèles) et modèle quantile XGBoost
+        'residual_quantiles': residual_quantiles(y_test, y_pred_test),
+        'quantile_model': quantile_model,
+        'quantile_level': interval_level if quantile_model is not None else None,
+        'model_type': model_type,
+        'updates': 0,
+        'last_date': df['Date'].max(),
+        'train_ids': df['Train_ID'].unique(),
+        'villes': df['Ville_Arrivee'].unique()
+    }
 
-        # Appliquer la normalisation
-        merged_data = normalize_column_names_startup(merged_data)
+def update_trained_model(entry, source_df, model_type, progress=None):
+    """
+    Met à jour un modèle déjà entraîné avec les jours postérieurs à sa dernière date
+    d'entraînement (voir modeling.update_model). Renvoie la nouvelle entrée, ou None
+    si la mise à jour incrémentale est impossible (modèle partitionné, nouveau train
+    ou nouvelle ville, aucun jour nouveau alors que les données ont changé : lignes
+    modifiées ou supprimées) : l'appelant réentraîne alors complètement.
+    """
+    from sklearn.metrics import mean_squared_error, r2_score
 
-        # Convertir Date en string pour JSON
-        merged_data['Date'] = merged_data['Date'].dt.strftime('%Y-%m-%d')
+    if entry.get('partition_by'):
+        return None
 
-        print(f"✅ Données d'exemple chargées: {merged_data.shape[0]} enregistrements")
+    with training_stage('feature_build', progress):
+        df = source_df.copy()
+        df['Date'] = pd.to_datetime(df['Date'])
+        recent = df[df['Date'] > entry['last_date']].copy()
+        if recent.empty:
+            return None
+
+        le_train, le_ville = entry['le_train'], entry['le_ville']
+        if not (np.isin(recent['Train_ID'], le_train.classes_).all()
+                and np.isin(recent['Ville_Arrivee'], le_ville.classes_).all()):
+            return None
+
+        recent['Train_ID_encoded'] = le_train.transform(recent['Train_ID'])
+        recent['Ville_Arrivée_encoded'] = le_ville.transform(recent['Ville_Arrivee'])
+        recent['day_of_year'] = recent['Date'].dt.dayofyear
+        recent['month'] = recent['Date'].dt.month
+        recent['day_of_week'] = recent['Date'].dt.dayofweek
+        X = recent[FEATURE_COLUMNS]
+        y = recent['Nombre_Passagers']
+
+    mse, r2, quantiles = entry['mse'], entry['r2'], entry['residual_quantiles']
+    if len(recent) >= 2:
+        with training_stage('evaluate', progress):
+            # Erreur du modèle sur les nouveaux jours, mesurée avant de les apprendre;
+            # ses résidus remplacent ceux de l'évaluation initiale pour les intervalles
+            y_pred = entry['model'].predict(X)
+            mse = mean_squared_error(y, y_pred)
+            r2 = r2_score(y, y_pred)
+            quantiles = residual_quantiles(y, y_pred)
+
+    with training_stage('fit', progress):
+        try:
+            # Copies mises à jour : le modèle publié continue de servir /forecast, /scenarios...
+            model, stats = update_model(entry['model'], model_type, X, y, entry.get('sufficient_stats'))
+            quantile_model = entry.get('quantile_model')
+            if quantile_model is not None:
+                quantile_model, _ = update_model(quantile_model, model_type, X, y)
+        except ValueError as e:
+            logger.info("incremental update unavailable model_type=%s reason=%s", model_type, e)
+            return None
+
+    # Nouvelle entrée (version et modèle compilé attribués par l'appelant avant publication)
+    return {
+        **entry,
+        'model': model,
+        'quantile_model': quantile_model,
+        'compiled': None,
+        'mse': mse,
+        'r2': r2,
+        'residual_quantiles': quantiles,
+        'sufficient_stats': stats,
+        'updates': entry.get('updates', 0) + 1,
+        'last_date': recent['Date'].max(),
+    }
 
-    except Exception as e:
-        print(f"⚠️ Erreur lors du chargement des données d'exemple: {e}")
+def register_model(model_type, entry):
+    """
+    Compile le modèle pour l'inférence à faible latence (entry['compiled']) et le
+    publie dans le registre sur disque. Les modèles partitionnés ne sont pas compilés.
+    """
+    entry['compiled'] = None
+    if entry.get('partition_by'):
+        return
+    with stage_timer('compile'):
+        try:
+            entry['compiled'] = compile_model(entry['model'], model_type)
+        except ValueError as e:
+            logger.info("model not compiled model_type=%s reason=%s", model_type, e)
+            return
+    if entry['compiled'] is None:
+        return
+    try:
+        save_model(model_type, entry['compiled'], {
+            'version': entry.get('version'),
+            'trained_at': datetime.now().isoformat(),
+            'last_date': entry['last_date'].strftime('%Y-%m-%d'),
+            'feature_columns': entry['feature_columns'],
+            'train_classes': entry['le_train'].classes_.tolist(),
+            'ville_classes': entry['le_ville'].classes_.tolist(),
+            'train_ids': list(entry['train_ids']),
+            'villes': list(entry['villes']),
+            'mse': entry['mse'],
+            'r2': entry['r2'],
+            'updates': entry.get('updates', 0),
+        })
+    except OSError as e:
+        logger.warning("⚠️ Enregistrement du modèle impossible model_type=%s error=%s", model_type, e)
+
+def forecast_interval(entry, grid, point, level):
+    """
+    Bornes (basse, haute) de l'intervalle de prédiction sur toute la grille en un lot :
+    prédictions par arbre pour un Random Forest, modèle quantile pour un XGBoost,
+    distribution des résidus sinon (régression linéaire, modèles partitionnés).
+    """
+    model = entry['model']
+    if entry.get('model_type') == "Random Forest" and not entry.get('partition_by'):
+        lower, upper = forest_interval(model, grid, level)
+    elif entry.get('quantile_model') is not None and entry.get('quantile_level') == level:
+        bounds = entry['quantile_model'].predict(grid)
+        lower, upper = bounds[:, 0], bounds[:, 1]
+    else:
+        lower, upper = residual_interval(point, entry['residual_quantiles'], level)
+    # L'intervalle contient toujours la prévision ponctuelle
+    lower = np.maximum(0, np.round(np.minimum(lower, point))).astype(np.int64)
+    upper = np.maximum(0, np.round(np.maximum(upper, point))).astype(np.int64)
+    return lower, upper
+
+def build_forecast_grid(entry, days_to_predict, events_df=None, holidays_df=None, start_day=0):
+    """
+    Grille de features date x train x ville pour les jours start_day+1 à days_to_predict
+    suivant la dernière date d'entraînement. Renvoie (grid, labels) où labels contient,
+    ligne à ligne, date, train, ville et informations du calendrier; (None, None) si vide.
+    """
+    le_train = entry['le_train']
+    le_ville = entry['le_ville']
+
+    last_date = entry['last_date']
+    future_dates = [last_date + timedelta(days=i+1) for i in range(start_day, days_to_predict)]
+    unique_trains = entry['train_ids']
+    unique_villes = entry['villes']
+    if not future_dates or len(unique_trains) == 0 or len(unique_villes) == 0:
+        return None, None
+
+    # Indicateurs du calendrier regroupé par date, comme à l'entraînement (voir ingestion.calendar_by_date)
+    table = forecast_calendar(events_df, holidays_df)
+    calendar = table.reindex(pd.DatetimeIndex(future_dates).normalize()).fillna(CALENDAR_DEFAULTS).astype(table.dtypes)
+
+    # Grille complète date x train x ville, prédite ensuite en un seul appel
+    # (un modèle partitionné route lui-même chaque ligne vers sa partition)
+    n_dates, n_trains, n_villes = len(future_dates), len(unique_trains), len(unique_villes)
+    per_date = n_trains * n_villes
+    dates_index = pd.DatetimeIndex(future_dates)
+    event_flags, vacance_flags, event_names, vacance_names, vacance_durations = (
+        np.repeat(calendar[column].to_numpy(dtype=object), per_date)
+        for column in ('event_present', 'vacance_present', 'event_name', 'vacance_name', 'vacance_duration')
+    )
+    grid = pd.DataFrame({
+        'Train_ID_encoded': np.tile(np.repeat(le_train.transform(unique_trains), n_villes), n_dates),
+        'Ville_Arrivée_encoded': np.tile(le_ville.transform(unique_villes), n_dates * n_trains),
+        'day_of_year': np.repeat(dates_index.dayofyear.to_numpy(), per_date),
+        'month': np.repeat(dates_index.month.to_numpy(), per_date),
+        'day_of_week': np.repeat(dates_index.dayofweek.to_numpy(), per_date),
+        'Evenement_Present': event_flags.astype(np.int64),
+        'Vacance': vacance_flags.astype(np.int64),
+    })
+    labels = {
+        'date': np.repeat(dates_index.strftime('%Y-%m-%d').to_numpy(), per_date),
+        'train_id': np.tile(np.repeat(np.asarray(unique_trains), n_villes), n_dates),
+        'ville_arrivee': np.tile(np.asarray(unique_villes), n_dates * n_trains),
+        'event_present': event_flags,
+        'vacance_present': vacance_flags,
+        'event_name': event_names,
+        'vacance_name': vacance_names,
+        'vacance_duration': vacance_durations,
+    }
+    return grid, labels
+
+def generate_forecast(entry, days_to_predict, events_df=None, holidays_df=None, start_day=0, interval_level=None):
+    """
+    Génère les prédictions pour les jours suivant la dernière date d'entraînement.
+    Avec start_day, seuls les jours start_day+1 à days_to_predict sont calculés.
+    Avec interval_level, chaque prédiction porte aussi predicted_lower / predicted_upper.
+    """
+    with stage_timer('predict'):
+        grid, labels = build_forecast_grid(entry, days_to_predict, events_df, holidays_df, start_day)
+        if grid is None:
+            return []
+        point = entry['model'].predict(grid)
+        predicted = np.maximum(0, np.round(point)).astype(np.int64)
+
+        predictions = [
+            {
+                'date': date_label,
+                'train_id': train_id,
+                'ville_arrivee': ville,
+                'predicted_passengers': passengers,
+                'event_present': event_present,
+                'vacance_present': vacance_present,
+                'event_name': event_name,
+                'vacance_name': vacance_name,
+                'vacance_duration': vacance_duration
+            }
+            for date_label, train_id, ville, passengers, event_present, vacance_present,
+                event_name, vacance_name, vacance_duration in zip(
+                labels['date'].tolist(), labels['train_id'].tolist(), labels['ville_arrivee'].tolist(),
+                predicted.tolist(), labels['event_present'].tolist(), labels['vacance_present'].tolist(),
+                labels['event_name'].tolist(), labels['vacance_name'].tolist(), labels['vacance_duration'].tolist(),
+            )
+        ]
+
+        if interval_level is not None:
+            lower, upper = forecast_interval(entry, grid, point, interval_level)
+            for prediction, low, high in zip(predictions, lower.tolist(), upper.tolist()):
+                prediction['predicted_lower'] = low
+                prediction['predicted_upper'] = high
+
+    return predictions
+
+def cached_forecast(model_type, entry, days_to_predict, events_df=None, holidays_df=None, interval_level=None):
+    """
+    Prévision mise en cache par (version du modèle, version des données, version du calendrier).
+    Un horizon plus court est servi comme préfixe d'un horizon déjà calculé, un horizon
+    plus long ne calcule que les jours manquants. Renvoie (prédictions, 'hit'|'partial'|'miss').
+    """
+    days_to_predict = max(days_to_predict, 0)
+    key = (entry.get('version'), data_version, calendar_version, interval_level)
+    cached_key, cached_days, cached = _forecast_cache.get(model_type, (None, 0, []))
+    if cached_key != key:
+        cached_days, cached = 0, []
+
+    if cached_days >= days_to_predict:
+        status = 'hit'
+    else:
+        status = 'partial' if cached_days else 'miss'
+        cached = cached + generate_forecast(entry, days_to_predict, events_df, holidays_df,
+                                            start_day=cached_days, interval_level=interval_level)
+        cached_days = days_to_predict
+        _forecast_cache[model_type] = (key, cached_days, cached)
+    record_cache('forecast', status == 'hit')
 
-# Charger les données au démarrage
-load_sample_data_on_startup()
+    # Les prédictions sont ordonnées par date : un horizon est un préfixe de la liste
+    rows_per_day = len(entry['train_ids']) * len(entry['villes'])
+    return cached[:days_to_predict * rows_per_day], status
 
 class PredictionRequest(BaseModel):
     model_type: str
     days_to_predict: int
+    partition_by: Optional[str] = None  # 'city' ou 'route' pour un modèle par partition
+    min_partition_rows: int = 50
+    incremental: bool = False  # mettre à jour le modèle existant au lieu de réentraîner
+    interval_level: Optional[float] = None  # ex. 0.8 pour un intervalle de prédiction à 80 %
+
+class ScenarioOverride(BaseModel):
+    date: str
+    end_date: Optional[str] = None  # période date..end_date incluse
+    event_present: Optional[int] = None
+    vacance_present: Optional[int] = None
+    train_id: Optional[str] = None  # restreindre à un train
+    ville_arrivee: Optional[str] = None  # restreindre à une ville
+
+class Scenario(BaseModel):
+    name: str
+    overrides: List[ScenarioOverride]
+
+class ScenarioRequest(BaseModel):
+    model_type: str
+    days_to_predict: int
+    scenarios: List[Scenario]
 
 class PredictionResult(BaseModel):
     date: str
@@ -300,6 +768,28 @@ class PredictionResult(BaseModel):
 async def root():
     return {"message": "ONCF Passenger Prediction API"}
 
+@app.get("/health")
+async def health():
+    """Vivacité du processus (ne dépend pas des données)"""
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics():
+    """Métriques au format texte Prometheus"""
+    DATASET_ROWS.set(len(merged_data) if merged_data is not None else 0, dataset='merged')
+    DATASET_ROWS.set(len(evenements_df) if evenements_df is not None else 0, dataset='events')
+    DATASET_ROWS.set(len(vacances_df) if vacances_df is not None else 0, dataset='holidays')
+    DATASET_ROWS.set(len(passengers_df) if passengers_df is not None else 0, dataset='passengers')
+    TRAINED_MODELS.set(len(trained_models))
+    return Response(content=render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/ready")
+async def readiness():
+    """Indique si la restauration des données de démarrage est terminée"""
+    if not data_ready:
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready", "data_loaded": merged_data is not None}
+
 @app.get("/test")
 async def test_connection():
     return {"status": "ok", "message": "Backend is running", "timestamp": datetime.now().isoformat()}
@@ -330,9 +820,7 @@ async def test_upload(
         raise HTTPException(status_code=400, detail=f"Test upload failed: {str(e)}")
 
 @app.get("/data-preview")
-async def get_data_preview():
-    global merged_data
-
+async def get_data_preview(request: Request):
     if merged_data is None:
         return {
             "total_records": 0,
@@ -343,7 +831,13 @@ async def get_data_preview():
             "last_updated": None
         }
 
-    try:
+    as_arrow = wants_arrow(request)
+    etag = make_etag('data', data_version, 'arrow' if as_arrow else 'json')
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    def build_preview():
         # Calculate statistics correctly
         total_records = len(merged_data)
         passengers_count = total_records  # Each row is a passenger record
@@ -361,351 +855,365 @@ async def get_data_preview():
         else:
             date_range = None
 
-        print(f"Data preview - Total: {total_records}, Passengers: {passengers_count}, Events: {events_count}, Holidays: {holidays_count}")
-        
-        # FIX: Sanitize the merged_data DataFrame before converting to dictionary
-        # This is the key change to handle non-compliant float values.
-        sanitized_data = merged_data.replace([np.inf, -np.inf, np.nan], None).to_dict('records')
-        
-        return {
+        logger.debug("data preview total=%d passengers=%d events=%d holidays=%d",
+                     total_records, passengers_count, events_count, holidays_count)
+
+        stats = {
             "total_records": total_records,
             "passengers_count": passengers_count,
             "events_count": int(events_count),
             "holidays_count": int(holidays_count),
             "date_range": date_range,
-            "last_updated": datetime.now().isoformat(),
-            "merged_data": sanitized_data if merged_data is not None else []
+            "last_updated": data_last_updated
         }
+
+        with stage_timer('serialize'):
+            if as_arrow:
+                return arrow_response(merged_data, metadata=stats)
+
+            # FIX: Sanitize the merged_data DataFrame before converting to dictionary
+            # This is the key change to handle non-compliant float values.
+            sanitized_data = merged_data.replace([np.inf, -np.inf, np.nan], None).to_dict('records')
+
+            return JSONResponse({**stats, "merged_data": sanitized_data})
+
+    try:
+        return cached_response('data-preview', etag, build_preview)
     except Exception as e:
-        print(f"Error in data preview: {e}")
+        logger.exception("data preview failed error=%s", e)
         # Add a detailed error message to help debugging
         raise HTTPException(status_code=500, detail=f"Error getting data preview: {str(e)}. This might be due to non-JSON compliant float values (like NaN or Inf) in the data. Make sure your data is clean.")
 
 @app.post("/upload-csv")
 async def upload_csv_files(
+    request: Request,
     passengers_file: UploadFile = File(...),
     evenements_file: UploadFile = File(...),
-    vacances_file: UploadFile = File(...)
+    vacances_file: UploadFile = File(...),
+    quality_mode: Optional[str] = None,
 ):
-    global merged_data, evenements_df, vacances_df
-
+    global merged_data, passengers_df, evenements_df, vacances_df
+    await wait_for_startup_load()
     try:
-        # Read CSV files
-        passengers_content = await passengers_file.read()
-        evenements_content = await evenements_file.read()
-        vacances_content = await vacances_file.read()
-
-        # Parse CSV data with error handling
-        try:
-            passengers_df = pd.read_csv(io.StringIO(passengers_content.decode('utf-8')))
-            evenements_df = pd.read_csv(io.StringIO(evenements_content.decode('utf-8')))
-            vacances_df = pd.read_csv(io.StringIO(vacances_content.decode('utf-8')))
-        except UnicodeDecodeError:
-            # Try with different encoding
-            passengers_df = pd.read_csv(io.StringIO(passengers_content.decode('latin-1')))
-            evenements_df = pd.read_csv(io.StringIO(evenements_content.decode('latin-1')))
-            vacances_df = pd.read_csv(io.StringIO(vacances_content.decode('latin-1')))
-
-        print(f"Passengers columns: {list(passengers_df.columns)}")
-        print(f"Events columns: {list(evenements_df.columns)}")
-        print(f"Holidays columns: {list(vacances_df.columns)}")
-
-        # Clean and convert Date columns to datetime
-        passengers_df['Date'] = clean_and_parse_dates(passengers_df['Date'])
-        evenements_df['Date'] = clean_and_parse_dates(evenements_df['Date'])
-        vacances_df['Date'] = clean_and_parse_dates(vacances_df['Date'])
-
-        # Remove rows with invalid dates
-        passengers_df = passengers_df.dropna(subset=['Date'])
-        evenements_df = evenements_df.dropna(subset=['Date'])
-        vacances_df = vacances_df.dropna(subset=['Date'])
-
-        print(f"Passengers data shape: {passengers_df.shape}")
-        print(f"Events data shape: {evenements_df.shape}")
-        print(f"Holidays data shape: {vacances_df.shape}")
-
-        # Merge datasets on Date - use left join to keep all passenger records
-        # First, let's check the date ranges
-        print(f"Passengers date range: {passengers_df['Date'].min()} to {passengers_df['Date'].max()}")
-        print(f"Events date range: {evenements_df['Date'].min()} to {evenements_df['Date'].max()}")
-        print(f"Holidays date range: {vacances_df['Date'].min()} to {vacances_df['Date'].max()}")
-
-        # Check for duplicate dates in each dataset
-        print(f"Passengers unique dates: {passengers_df['Date'].nunique()}")
-        print(f"Events unique dates: {evenements_df['Date'].nunique()}")
-        print(f"Holidays unique dates: {vacances_df['Date'].nunique()}")
-
-        # Merge datasets on Date - use left join to keep all passenger records
-        merged_data = passengers_df.merge(evenements_df, on='Date', how='left')
-        print(f"After first merge shape: {merged_data.shape}")
-
-        merged_data = merged_data.merge(vacances_df, on='Date', how='left')
-        print(f"After second merge shape: {merged_data.shape}")
-
-        print(f"Merged data shape: {merged_data.shape}")
-        print(f"Merged columns: {list(merged_data.columns)}")
-
-        # Check for missing values after merge
-        print(f"Missing Événement_Présent: {merged_data['Événement_Présent'].isna().sum()}")
-        print(f"Missing Vacance: {merged_data['Vacance'].isna().sum()}")
-
-        # Fill missing values
-        if 'Événement_Présent' in merged_data.columns:
-            merged_data['Événement_Présent'] = merged_data['Événement_Présent'].fillna(0)
-        else:
-            merged_data['Événement_Présent'] = 0
-
-        if 'Vacance' in merged_data.columns:
-            merged_data['Vacance'] = merged_data['Vacance'].fillna(0)
-        else:
-            merged_data['Vacance'] = 0
-
-        if 'Description_Événement' in merged_data.columns:
-            merged_data['Description_Événement'] = merged_data['Description_Événement'].fillna('')
-        else:
-            merged_data['Description_Événement'] = ''
-
-        # Normalize column names for consistency
-        column_mapping = {
-            'Ville_Arrivée': 'Ville_Arrivee',
-            'Événement_Présent': 'Evenement_Present'
-            # Garder Description_Événement avec accent
-        }
-
-        # Rename columns to normalized names
-        for old_name, new_name in column_mapping.items():
-            if old_name in merged_data.columns:
-                merged_data = merged_data.rename(columns={old_name: new_name})
-
-        # Ensure all required columns exist
-        required_columns = ['Date', 'Train_ID', 'Ville_Arrivee', 'Nombre_Passagers', 'Evenement_Present', 'Vacance']
-        for col in required_columns:
-            if col not in merged_data.columns:
-                raise HTTPException(status_code=400, detail=f"Missing required column: {col}")
-
-        # Convert Date back to string for JSON serialization
-        merged_data['Date'] = merged_data['Date'].dt.strftime('%Y-%m-%d')
-
-        print(f"Final merged data shape: {merged_data.shape}")
-        print(f"Sample data: {merged_data.head(3).to_dict('records')}")
-
-        # Calculate final statistics
-        total_records = len(merged_data)
-        passengers_count = len(merged_data)  # Each row represents a passenger record
-        events_count = merged_data['Evenement_Present'].sum()
-        holidays_count = merged_data['Vacance'].sum()
-
-        print(f"Final stats - Total: {total_records}, Passengers: {passengers_count}, Events: {events_count}, Holidays: {holidays_count}")
-
-        # Mettre à jour les variables globales pour les prédictions futures
-        evenements_df = evenements_df.copy()
-        vacances_df = vacances_df.copy()
-
-        return {
-            "message": "Files uploaded and merged successfully",
-            "total_records": total_records,
-            "passengers_count": passengers_count,
-            "events_count": int(events_count),
-            "holidays_count": int(holidays_count),
-            "columns": list(merged_data.columns),
-            "sample_data": merged_data.head(5).replace([np.inf, -np.inf, np.nan], None).to_dict('records'),
-            "merged_data": merged_data.replace([np.inf, -np.inf, np.nan], None).to_dict('records'),
-            "date_range": {
-                "start": merged_data['Date'].min(),
-                "end": merged_data['Date'].max()
-            },
-            "last_updated": datetime.now().isoformat()
-        }
+        pipeline = ingestion_pipeline(quality_mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    try:
+        with maybe_profile(request, 'upload-csv') as profile:
+            # Read CSV files
+            # Lecture et empreinte de chaque fichier (clé du cache d'upload)
+            (passengers_content, passengers_digest), (evenements_content, evenements_digest), \
+                (vacances_content, vacances_digest) = await asyncio.gather(
+                    read_upload(passengers_file), read_upload(evenements_file), read_upload(vacances_file))
+
+            # Décodage, parsing, normalisation, contrôle qualité et fusion (voir ingestion.py)
+            run = functools.partial(pipeline.run, passengers_content, evenements_content, vacances_content, digests={
+                'passengers': passengers_digest, 'events': evenements_digest, 'holidays': vacances_digest,
+            })
+            if not profile:
+                # Un fichier par worker du pool; la fusion attend les trois. Profilage : pas de
+                # pool de processus, les étapes restent sur un thread que cProfile observe
+                pipeline.executor = ingestion_executor
+            # Hors de la boucle d'événements
+            result = await run_in_threadpool(profiled_call, profile, run)
+            merged = result['merged']
+
+            if logger.isEnabledFor(logging.DEBUG):
+                # Plages de dates et dates uniques : calculées uniquement en mode debug
+                for name in ('passengers', 'events', 'holidays'):
+                    frame = result[name]
+                    logger.debug("upload dataset=%s shape=%s date_min=%s date_max=%s unique_dates=%d",
+                                 name, frame.shape, frame['Date'].min(), frame['Date'].max(), frame['Date'].nunique())
+                logger.debug("upload final shape=%s sample=%s", merged.shape, merged.head(3).to_dict('records'))
+
+            # Calculate final statistics
+            total_records = len(merged)
+            passengers_count = len(merged)  # Each row represents a passenger record
+            events_count = merged['Evenement_Present'].sum()
+            holidays_count = merged['Vacance'].sum()
+
+            logger.info("upload merged total=%d passengers=%d events=%d holidays=%d cache=%s files_ms=%s timings_ms=%s",
+                        total_records, passengers_count, events_count, holidays_count, result['cache'],
+                        result['files_ms'], result['timings_ms'])
+
+            # Mettre à jour les variables globales pour les prédictions futures
+            merged_data = merged
+            passengers_df = result['passengers']
+            evenements_df = result['events']
+            vacances_df = result['holidays']
+            for dataset, report in result['quality'].items():
+                publish_quality(dataset, report, result['quarantined'] if dataset == 'passengers' else None)
+            bump_data_version()
+            bump_calendar_version()
+            forecast_accuracy = track_forecast_accuracy()
+
+            with stage_timer('serialize'):
+                return {
+                    "message": "Files uploaded and merged successfully",
+                    "profile_id": profile.id if profile else None,
+                    "total_records": total_records,
+                    "passengers_count": passengers_count,
+                    "events_count": int(events_count),
+                    "holidays_count": int(holidays_count),
+                    "columns": list(merged_data.columns),
+                    "sample_data": merged_data.head(5).replace([np.inf, -np.inf, np.nan], None).to_dict('records'),
+                    "merged_data": merged_data.replace([np.inf, -np.inf, np.nan], None).to_dict('records'),
+                    "date_range": {
+                        "start": merged_data['Date'].min(),
+                        "end": merged_data['Date'].max()
+                    },
+                    "data_quality": sanitize_for_json(result['quality']),
+                    "upload_cache": result['cache'],
+                    "timings_ms": result['timings_ms'],
+                    "files_ms": result['files_ms'],
+                    "forecast_accuracy": forecast_accuracy,
+                    "last_updated": datetime.now().isoformat()
+                }
+
+    except DataQualityError as e:
+        raise quality_error_response(e)
     except Exception as e:
-        print(f"Error processing files: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("upload failed error=%s", e)
         raise HTTPException(status_code=400, detail=f"Error processing files: {str(e)}")
 
-@app.post("/train-and-predict")
-async def train_and_predict(request: PredictionRequest):
-    global merged_data, trained_models, prediction_history, evenements_df, vacances_df
+def train_for_request(request, progress=None):
+    """
+    Entraîne (ou réutilise / met à jour) le modèle demandé et le stocke dans
+    trained_models. `progress(event, data)` reçoit le début et la fin de chaque
+    étape. Sous training_lock : la nouvelle entrée est construite à part et publiée
+    en une affectation, une fois l'entraînement terminé. Renvoie (entrée du modèle,
+    mode d'entraînement).
+    """
+    with training_lock:
+        return _train_for_request(request, progress)
+
+def _train_for_request(request, progress):
+    # Instantané : un upload concurrent (tâche planifiée, flux SSE) ne mélange pas deux versions
+    source_df, source_version = merged_data, data_version
+    existing = trained_models.get(request.model_type)
+    entry = None
+    if (existing is not None and existing.get('data_version') == source_version
+            and existing.get('partition_by') == request.partition_by
+            and existing.get('min_partition_rows') == (request.min_partition_rows if request.partition_by else None)
+            and (request.interval_level is None or request.model_type != "XGBoost" or request.partition_by
+                 or existing.get('quantile_level') == request.interval_level)):
+        # Données inchangées : l'entraînement (déterministe) donnerait le même modèle
+        entry = existing
+        training_mode = 'reused'
+    else:
+        if request.incremental and existing is not None and not request.partition_by:
+            entry = update_trained_model(existing, source_df, request.model_type, progress)
+            if entry is None:
+                logger.info("incremental update impossible model_type=%s, full retrain", request.model_type)
+        training_mode = 'incremental' if entry is not None else 'full'
+        if entry is None:
+            entry = fit_model(source_df, request.model_type, request.partition_by,
+                              request.min_partition_rows, request.interval_level, progress)
+        if entry is not existing:
+            entry['version'] = next_model_version()
+            register_model(request.model_type, entry)
+        # Nouvelle entrée plutôt qu'une modification de celle en service
+        entry = {**entry, 'data_version': source_version}
+        _forecast_cache.pop(request.model_type, None)
+
+    # Store trained model
+    trained_models[request.model_type] = entry
+    return entry, training_mode
+
+def record_prediction(request, entry, predictions, training_mode, forecast_cache, profile_id=None):
+    """Ajoute la prévision à prediction_history et renvoie l'enregistrement"""
+    prediction_record = {
+        'id': len(prediction_history) + 1,
+        'model_type': request.model_type,
+        'model_version': entry.get('version'),
+        'days_predicted': request.days_to_predict,
+        'partition_by': request.partition_by,
+        'training_mode': training_mode,
+        'forecast_cache': forecast_cache,
+        'interval_level': request.interval_level,
+        'predictions_count': len(predictions),
+        'predictions': sanitize_for_json(predictions),  # Sanitize predictions before storing
+        'model_performance': {
+            'mse': entry['mse'],
+            'r2': entry['r2']
+        },
+        'created_at': datetime.now().isoformat(),
+        'status': 'completed',
+        'profile_id': profile_id
+    }
+    prediction_history.append(prediction_record)
+    bump_history_version()
+    accuracy_tracker.add_forecast(request.model_type, entry.get('version'), entry['last_date'], predictions)
+    return prediction_record
 
+def check_prediction_request(request):
     if merged_data is None:
         raise HTTPException(status_code=400, detail="No data uploaded. Please upload CSV files first.")
+    if request.interval_level is not None and not 0 < request.interval_level < 1:
+        raise HTTPException(status_code=400, detail="Invalid interval_level, expected a value between 0 and 1")
 
-    try:
-        # Prepare features
-        df = merged_data.copy()
-
-        # Convert Date back to datetime for processing
-        df['Date'] = pd.to_datetime(df['Date'])
-
-        # Create label encoders for categorical variables
-        le_train = LabelEncoder()
-        le_ville = LabelEncoder()
-
-        df['Train_ID_encoded'] = le_train.fit_transform(df['Train_ID'])
-        df['Ville_Arrivée_encoded'] = le_ville.fit_transform(df['Ville_Arrivee'])
-
-        # Create date features
-        df['day_of_year'] = df['Date'].dt.dayofyear
-        df['month'] = df['Date'].dt.month
-        df['day_of_week'] = df['Date'].dt.dayofweek
-
-        # Prepare feature matrix
-        feature_columns = ['Train_ID_encoded', 'Ville_Arrivée_encoded', 'day_of_year',
-                          'month', 'day_of_week', 'Evenement_Present', 'Vacance']
-        X = df[feature_columns]
-        y = df['Nombre_Passagers']
-
-        # Split data for training
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-        # Train selected model
-        if request.model_type == "Linear Regression":
-            model = LinearRegression()
-        elif request.model_type == "Random Forest":
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
-        elif request.model_type == "XGBoost":
-            model = xgb.XGBRegressor(n_estimators=100, random_state=42)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid model type")
-
-        # Train the model
-        model.fit(X_train, y_train)
+@app.post("/train-and-predict")
+def train_and_predict(request: PredictionRequest, http_request: Request):
+    check_prediction_request(request)
 
-        # Evaluate model
-        y_pred_test = model.predict(X_test)
-        mse = mean_squared_error(y_test, y_pred_test)
-        r2 = r2_score(y_test, y_pred_test)
+    try:
+        with maybe_profile(http_request, 'train-and-predict') as profile:
+            entry, training_mode = train_for_request(request)
+            mse, r2 = entry['mse'], entry['r2']
+
+            predictions, forecast_cache = cached_forecast(
+                request.model_type, entry, request.days_to_predict, evenements_df, vacances_df, request.interval_level
+            )
+
+            with stage_timer('serialize'):
+                # Store prediction in history
+                prediction_record = record_prediction(request, entry, predictions, training_mode, forecast_cache,
+                                                      profile.id if profile else None)
+
+                if wants_arrow(http_request):
+                    return arrow_response(pd.DataFrame(predictions), metadata={
+                        'message': f'Model {request.model_type} trained and predictions generated successfully',
+                        'model_performance': {'r2': r2, 'mse': mse, 'accuracy': r2},
+                        'prediction_count': len(predictions),
+                        'prediction_id': prediction_record['id'],
+                        'training_mode': training_mode,
+                        'forecast_cache': forecast_cache,
+                        'profile_id': prediction_record['profile_id']
+                    })
 
-        # Store trained model
-        trained_models[request.model_type] = {
-            'model': model,
-            'le_train': le_train,
-            'le_ville': le_ville,
-            'feature_columns': feature_columns,
-            'mse': mse,
-            'r2': r2
-        }
+                return {
+                    'message': f'Model {request.model_type} trained and predictions generated successfully',
+                    'predictions': sanitize_for_json(predictions), # Sanitize predictions before returning
+                    'model_performance': {
+                        'r2': r2,
+                        'mse': mse,
+                        'accuracy': r2  # Use R² as accuracy metric
+                    },
+                    'prediction_count': len(predictions),
+                    'prediction_id': prediction_record['id'],
+                    'training_mode': training_mode,
+                    'forecast_cache': forecast_cache,
+                    'profile_id': prediction_record['profile_id']
+                }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error during training and prediction: {str(e)}")
 
-        # Générer les prédictions pour les dates futures
-        last_date = df['Date'].max()
-        future_dates = [last_date + timedelta(days=i+1) for i in range(request.days_to_predict)]
-        predictions = []
-        unique_trains = df['Train_ID'].unique()
-        unique_villes = df['Ville_Arrivee'].unique()
-        # S'assurer que les colonnes Date sont bien en datetime
-        if evenements_df is not None and 'Date' in evenements_df.columns:
-            evenements_df['Date'] = pd.to_datetime(evenements_df['Date'])
-        if vacances_df is not None and 'Date' in vacances_df.columns:
-            vacances_df['Date'] = pd.to_datetime(vacances_df['Date'])
-        for date in future_dates:
-            # Chercher si la date est un événement ou une vacance
-            event_present = 0
-            vacance_present = 0
-            event_name = ""
-            vacance_name = ""
-            vacance_duration = 0
-
-            if evenements_df is not None and 'Date' in evenements_df.columns and 'Evenement_Present' in evenements_df.columns:
-                match = evenements_df[evenements_df['Date'] == date]
-                if not match.empty:
-                    event_present = int(match.iloc[0]['Evenement_Present'])
-                    # Récupérer le nom de l'événement s'il existe
-                    if 'Description_Evenement' in match.columns:
-                        event_name = str(match.iloc[0]['Description_Evenement'])
-                    elif 'Description_Événement' in match.columns:
-                        event_name = str(match.iloc[0]['Description_Événement'])
-                    elif 'Nom_Événement' in match.columns:
-                        event_name = str(match.iloc[0]['Nom_Événement'])
-                    elif 'Description' in match.columns:
-                        event_name = str(match.iloc[0]['Description'])
-                    else:
-                        event_name = "Événement"
-
-            # Chercher les vacances avec gestion des durées multiples
-            if vacances_df is not None and 'Date' in vacances_df.columns and 'Vacance' in vacances_df.columns:
-                # Vérifier si cette date est dans une période de vacances
-                for _, vacance_row in vacances_df.iterrows():
-                    date_debut_vacance = pd.to_datetime(vacance_row['Date'])
-                    duree_vacance = int(vacance_row.get('Vacance', 1))
-
-                    # Vérifier si la date actuelle est dans la période de vacances
-                    if date_debut_vacance <= date < date_debut_vacance + pd.Timedelta(days=duree_vacance):
-                        vacance_present = 1
-                        vacance_duration = duree_vacance
-                        # Récupérer le nom de la vacance
-                        if 'Titre_Vacances' in vacance_row:
-                            vacance_name = str(vacance_row['Titre_Vacances'])
-                        elif 'Description' in vacance_row:
-                            vacance_name = str(vacance_row['Description'])
-                        else:
-                            vacance_name = "Vacance"
-                        break
-            for train_id in unique_trains:
-                for ville in unique_villes:
-                    train_encoded = le_train.transform([train_id])[0]
-                    ville_encoded = le_ville.transform([ville])[0]
-                    prediction_df = pd.DataFrame({
-                        'Train_ID_encoded': [train_encoded],
-                        'Ville_Arrivée_encoded': [ville_encoded],
-                        'day_of_year': [date.dayofyear],
-                        'month': [date.month],
-                        'day_of_week': [date.dayofweek],
-                        'Evenement_Present': [event_present],
-                        'Vacance': [vacance_present]
-                    })
-                    pred_passengers = model.predict(prediction_df)[0]
-                    predictions.append({
-                        'date': date.strftime('%Y-%m-%d'),
-                        'train_id': train_id,
-                        'ville_arrivee': ville,
-                        'predicted_passengers': max(0, round(pred_passengers)),
-                        'event_present': event_present,
-                        'vacance_present': vacance_present,
-                        'event_name': event_name,
-                        'vacance_name': vacance_name,
-                        'vacance_duration': vacance_duration
-                    })
+def sse_event(event, data):
+    """Un message Server-Sent Events (data en JSON sur une ligne)"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
-        # Store prediction in history
-        prediction_record = {
-            'id': len(prediction_history) + 1,
-            'model_type': request.model_type,
-            'days_predicted': request.days_to_predict,
-            'predictions_count': len(predictions),
-            'predictions': sanitize_for_json(predictions),  # Sanitize predictions before storing
-            'model_performance': {
-                'mse': mse,
-                'r2': r2
-            },
-            'created_at': datetime.now().isoformat(),
-            'status': 'completed'
-        }
-        prediction_history.append(prediction_record)
+def stream_training(request, emit):
+    """
+    Corps de /train-and-predict/stream, exécuté dans un thread : entraînement avec
+    progression par étape, puis prévision par blocs de STREAM_FORECAST_DAYS jours
+    (les jours déjà calculés sont repris du cache de prévisions), émise jour par jour.
+    Le modèle n'est publié dans trained_models qu'une fois l'entraînement terminé.
+    """
+    if training_lock.locked():
+        # Un autre entraînement (tâche planifiée, autre requête) est en cours : le flux attend son tour
+        emit('stage', {'stage': 'queued', 'status': 'started'})
+    entry, training_mode = train_for_request(request, progress=emit)
+    emit('model', {
+        'model_type': request.model_type,
+        'training_mode': training_mode,
+        'model_performance': {'r2': entry['r2'], 'mse': entry['mse'], 'accuracy': entry['r2']},
+    })
+
+    rows_per_day = len(entry['train_ids']) * len(entry['villes'])
+    emit('stage', {'stage': 'forecast', 'status': 'started', 'days': request.days_to_predict})
+    start = time.perf_counter()
+    predictions, statuses = [], []
+    for days in range(STREAM_FORECAST_DAYS, request.days_to_predict + STREAM_FORECAST_DAYS, STREAM_FORECAST_DAYS):
+        days = min(days, request.days_to_predict)
+        produced = len(predictions)
+        predictions, status = cached_forecast(
+            request.model_type, entry, days, evenements_df, vacances_df, request.interval_level
+        )
+        statuses.append(status)
+        for offset in range(produced, len(predictions), rows_per_day):
+            rows = predictions[offset:offset + rows_per_day]
+            emit('forecast', {'date': rows[0]['date'], 'day': offset // rows_per_day + 1,
+                              'predictions': sanitize_for_json(rows)})
+    emit('stage', {'stage': 'forecast', 'status': 'done',
+                   'duration_ms': round((time.perf_counter() - start) * 1000, 2)})
+
+    if all(status == 'hit' for status in statuses):
+        forecast_cache = 'hit'
+    else:
+        forecast_cache = 'miss' if statuses[0] == 'miss' else 'partial'
+    prediction_record = record_prediction(request, entry, predictions, training_mode, forecast_cache)
+    emit('done', {
+        'message': f'Model {request.model_type} trained and predictions generated successfully',
+        'prediction_count': len(predictions),
+        'prediction_id': prediction_record['id'],
+        'training_mode': training_mode,
+        'forecast_cache': forecast_cache,
+    })
+
+@app.post("/train-and-predict/stream")
+async def train_and_predict_stream(request: PredictionRequest):
+    """
+    Variante de /train-and-predict en Server-Sent Events : événements `stage`
+    (queued si un autre entraînement est en cours, puis feature_build, fit, evaluate,
+    forecast : started/done), `model` (performances),
+    `forecast` (prédictions d'un jour), puis `done` ou `error`. Un commentaire
+    keep-alive est envoyé pendant les étapes longues. La prévision est enregistrée
+    dans l'historique comme pour /train-and-predict, même si le client se déconnecte.
+    """
+    check_prediction_request(request)
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
 
-        return {
-            'message': f'Model {request.model_type} trained and predictions generated successfully',
-            'predictions': sanitize_for_json(predictions), # Sanitize predictions before returning
-            'model_performance': {
-                'r2': r2,
-                'mse': mse,
-                'accuracy': r2  # Use R² as accuracy metric
-            },
-            'prediction_count': len(predictions),
-            'prediction_id': prediction_record['id']
-        }
+    def emit(event, data):
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error during training and prediction: {str(e)}")
+    def work():
+        try:
+            stream_training(request, emit)
+        except HTTPException as e:
+            emit('error', {'status': e.status_code, 'detail': e.detail})
+        except Exception as e:
+            logger.exception("train-and-predict stream failed model_type=%s error=%s", request.model_type, e)
+            emit('error', {'status': 500, 'detail': f"Error during training and prediction: {str(e)}"})
+        finally:
+            emit(None, None)
+
+    async def stream():
+        job = loop.run_in_executor(None, work)
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                break
+            yield sse_event(event, data)
+        await job
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
 
 @app.get("/prediction-history")
-async def get_prediction_history():
-    return {
+async def get_prediction_history(request: Request):
+    etag = make_etag('history', history_version)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    return cached_response('prediction-history', etag, lambda: JSONResponse({
         "history": prediction_history,
         "total_predictions": len(prediction_history)
-    }
+    }))
 
 @app.get("/export-predictions")
-async def export_predictions():
+async def export_predictions(request: Request):
     if not prediction_history:
         raise HTTPException(status_code=404, detail="No predictions found")
 
@@ -716,17 +1224,25 @@ async def export_predictions():
         if 'predictions' not in latest_prediction or not latest_prediction['predictions']:
             raise HTTPException(status_code=404, detail="No predictions data found in latest prediction")
 
-        # Convert to DataFrame for CSV export
+        # Convert to DataFrame for export
         df = pd.DataFrame(latest_prediction['predictions'])
 
+        model_name = latest_prediction['model_type'].replace(' ', '_')
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+        if wants_arrow(request):
+            return arrow_response(
+                df,
+                metadata={'model_type': latest_prediction['model_type'], 'prediction_id': latest_prediction['id']},
+                filename=f"predictions_{model_name}_{timestamp}.arrows"
+            )
+
         # Convert to CSV
         csv_buffer = io.StringIO()
         df.to_csv(csv_buffer, index=False)
         csv_content = csv_buffer.getvalue()
 
         # Generate filename
-        model_name = latest_prediction['model_type'].replace(' ', '_')
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"predictions_{model_name}_{timestamp}.csv"
 
         # Return CSV file
@@ -738,13 +1254,14 @@ async def export_predictions():
             }
         )
     except Exception as e:
-        print(f"Error in export_predictions: {e}")
+        logger.exception("export predictions failed error=%s", e)
         raise HTTPException(status_code=500, detail=f"Error exporting predictions: {str(e)}")
 
 @app.delete("/delete-row")
 async def delete_row(index: int = None, date: str = None, train_id: str = None, ville_arrivee: str = None):
     """Supprime une ligne de merged_data par index ou par (date, train_id, ville_arrivee)"""
     global merged_data
+    await wait_for_startup_load()
     if merged_data is None:
         raise HTTPException(status_code=400, detail="Aucune donnée chargée.")
     df = merged_data.copy()
@@ -760,6 +1277,7 @@ async def delete_row(index: int = None, date: str = None, train_id: str = None,
     else:
         raise HTTPException(status_code=400, detail="Fournir index ou (date, train_id, ville_arrivee)")
     merged_data = df.reset_index(drop=True)
+    bump_data_version()
     return {"message": "Ligne supprimée avec succès.", "total_records": len(merged_data)}
 
 @app.put("/edit-row")
@@ -772,6 +1290,7 @@ async def edit_row(
 ):
     """Modifie une ligne de merged_data par index ou par (date, train_id, ville_arrivee)"""
     global merged_data
+    await wait_for_startup_load()
     if merged_data is None:
         raise HTTPException(status_code=400, detail="Aucune donnée chargée.")
     df = merged_data.copy()
@@ -792,119 +1311,248 @@ async def edit_row(
         if k in df.columns:
             df.at[row_idx, k] = v
     merged_data = df
+    bump_data_version()
     return {"message": "Ligne modifiée avec succès.", "row": df.iloc[row_idx].to_dict()}
 
 @app.post("/reset-data")
 async def reset_data():
     global merged_data, evenements_df, vacances_df, prediction_history
+    await wait_for_startup_load()
     merged_data = None
     evenements_df = None
     vacances_df = None
     prediction_history = []
+    accuracy_tracker.reset()
+    drifting_models.clear()
+    bump_data_version()
+    bump_calendar_version()
+    bump_history_version()
     return {"message": "Données réinitialisées."}
 
 @app.post("/upload-passengers")
-async def upload_passengers_file(passengers_file: UploadFile = File(...)):
+async def upload_passengers_file(request: Request, passengers_file: UploadFile = File(...), quality_mode: Optional[str] = None):
     """Upload du fichier passagers uniquement"""
     global passengers_df
+    await wait_for_startup_load()
 
     try:
-        passengers_content = await passengers_file.read()
-
-        try:
-            passengers_df = pd.read_csv(io.StringIO(passengers_content.decode('utf-8')))
-        except UnicodeDecodeError:
-            passengers_df = pd.read_csv(io.StringIO(passengers_content.decode('latin-1')))
-
-        # Clean and convert Date column
-        passengers_df['Date'] = clean_and_parse_dates(passengers_df['Date'])
-        passengers_df = passengers_df.dropna(subset=['Date'])
-
-        # Fusionner automatiquement si tous les fichiers sont présents
-        merged_data = merge_available_data()
-
-        return {
-            "message": "Fichier passagers uploadé avec succès",
-            "passengers_count": len(passengers_df),
-            "merged_available": merged_data is not None,
-            "total_records": len(merged_data) if merged_data is not None else 0,
-            "missing_files": []
-        }
+        with maybe_profile(request, 'upload-passengers') as profile:
+            passengers_content, passengers_digest = await read_upload(passengers_file)
+            pipeline = ingestion_pipeline(quality_mode)
+            passengers_df, quality, quarantine = await run_in_threadpool(
+                profiled_call, profile, pipeline.load_passengers, passengers_content, passengers_digest)
+            publish_quality('passengers', quality, quarantine)
+
+            # Fusionner automatiquement si tous les fichiers sont présents
+            with stage_timer('merge'):
+                merged_data = merge_available_data()
+
+            return {
+                "message": "Fichier passagers uploadé avec succès",
+                "profile_id": profile.id if profile else None,
+                "passengers_count": len(passengers_df),
+                "merged_available": merged_data is not None,
+                "total_records": len(merged_data) if merged_data is not None else 0,
+                "missing_files": [],
+                "data_quality": sanitize_for_json(quality),
+                "upload_cache": pipeline.cache_status
+            }
 
+    except DataQualityError as e:
+        raise quality_error_response(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erreur lors du traitement du fichier passagers: {str(e)}")
 
 @app.post("/upload-events")
-async def upload_events_file(evenements_file: UploadFile = File(...)):
+async def upload_events_file(request: Request, evenements_file: UploadFile = File(...), quality_mode: Optional[str] = None):
     """Upload du fichier événements uniquement"""
     global evenements_df
+    await wait_for_startup_load()
 
     try:
-        evenements_content = await evenements_file.read()
-
-        try:
-            evenements_df = pd.read_csv(io.StringIO(evenements_content.decode('utf-8')))
-        except UnicodeDecodeError:
-            evenements_df = pd.read_csv(io.StringIO(evenements_content.decode('latin-1')))
-
-        # Clean and convert Date column
-        evenements_df['Date'] = clean_and_parse_dates(evenements_df['Date'])
-        evenements_df = evenements_df.dropna(subset=['Date'])
-
-        # Fusionner automatiquement si tous les fichiers sont présents
-        merged_data = merge_available_data()
-
-        return {
-            "message": "Fichier événements uploadé avec succès",
-            "events_count": len(evenements_df),
-            "merged_available": merged_data is not None,
-            "total_records": len(merged_data) if merged_data is not None else 0,
-            "missing_files": []
-        }
+        with maybe_profile(request, 'upload-events') as profile:
+            evenements_content, evenements_digest = await read_upload(evenements_file)
+            pipeline = ingestion_pipeline(quality_mode)
+            evenements_df, quality = await run_in_threadpool(
+                profiled_call, profile, pipeline.load_side_table, evenements_content, 'events', evenements_digest)
+            publish_quality('events', quality)
+            bump_calendar_version()
+
+            # Fusionner automatiquement si tous les fichiers sont présents
+            with stage_timer('merge'):
+                merged_data = merge_available_data()
+
+            return {
+                "message": "Fichier événements uploadé avec succès",
+                "profile_id": profile.id if profile else None,
+                "events_count": len(evenements_df),
+                "merged_available": merged_data is not None,
+                "total_records": len(merged_data) if merged_data is not None else 0,
+                "missing_files": [],
+                "data_quality": sanitize_for_json(quality),
+                "upload_cache": pipeline.cache_status
+            }
 
+    except DataQualityError as e:
+        raise quality_error_response(e)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erreur lors du traitement du fichier événements: {str(e)}")
 
 @app.post("/upload-holidays")
-async def upload_holidays_file(vacances_file: UploadFile = File(...)):
+async def upload_holidays_file(request: Request, vacances_file: UploadFile = File(...), quality_mode: Optional[str] = None):
     """Upload du fichier vacances uniquement"""
     global vacances_df
+    await wait_for_startup_load()
 
     try:
-        vacances_content = await vacances_file.read()
+        with maybe_profile(request, 'upload-holidays') as profile:
+            vacances_content, vacances_digest = await read_upload(vacances_file)
+            pipeline = ingestion_pipeline(quality_mode)
+            vacances_df, quality = await run_in_threadpool(
+                profiled_call, profile, pipeline.load_side_table, vacances_content, 'holidays', vacances_digest)
+            publish_quality('holidays', quality)
+            bump_calendar_version()
+
+            # Fusionner automatiquement si tous les fichiers sont présents
+            with stage_timer('merge'):
+                merged_data = merge_available_data()
+
+            return {
+                "message": "Fichier vacances uploadé avec succès",
+                "profile_id": profile.id if profile else None,
+                "holidays_count": len(vacances_df),
+                "merged_available": merged_data is not None,
+                "total_records": len(merged_data) if merged_data is not None else 0,
+                "missing_files": [],
+                "data_quality": sanitize_for_json(quality),
+                "upload_cache": pipeline.cache_status
+            }
 
-        try:
-            vacances_df = pd.read_csv(io.StringIO(vacances_content.decode('utf-8')))
-        except UnicodeDecodeError:
-            vacances_df = pd.read_csv(io.StringIO(vacances_content.decode('latin-1')))
+    except DataQualityError as e:
+        raise quality_error_response(e)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Erreur lors du traitement du fichier vacances: {str(e)}")
 
-        # Clean and convert Date column
-        vacances_df['Date'] = clean_and_parse_dates(vacances_df['Date'])
-        vacances_df = vacances_df.dropna(subset=['Date'])
+@app.get("/data-quality")
+async def get_data_quality(limit: int = 100):
+    """Derniers rapports du contrôle qualité et lignes passagers en quarantaine"""
+    quarantined = []
+    if quarantined_rows is not None and limit > 0:
+        rows = quarantined_rows.head(limit)
+        quarantined = rows.astype(object).where(rows.notna(), None).to_dict('records')
+    return sanitize_for_json({
+        "reports": data_quality_reports,
+        "quarantined_total": data_quality_reports.get('passengers', {}).get('rows_quarantined', 0),
+        "quarantined": quarantined,
+    })
+
+@app.post("/upload-capacity")
+async def upload_capacity_file(request: Request, capacity_file: UploadFile = File(...)):
+    """Upload de la table de capacité des trains (Train_ID, Places, Voitures)"""
+    global capacity_df, capacity_version
 
-        # Fusionner automatiquement si tous les fichiers sont présents
-        merged_data = merge_available_data()
+    try:
+        with maybe_profile(request, 'upload-capacity') as profile:
+            capacity_content = await capacity_file.read()
 
-        return {
-            "message": "Fichier vacances uploadé avec succès",
-            "holidays_count": len(vacances_df),
-            "merged_available": merged_data is not None,
-            "total_records": len(merged_data) if merged_data is not None else 0,
-            "missing_files": []
-        }
+            with stage_timer('parse'):
+                try:
+                    raw_capacity = pd.read_csv(io.StringIO(capacity_content.decode('utf-8')))
+                except UnicodeDecodeError:
+                    raw_capacity = pd.read_csv(io.StringIO(capacity_content.decode('latin-1')))
+                capacity_df = normalize_capacity_table(raw_capacity)
+            capacity_version += 1
+            _capacity_cache.clear()
+
+            return {
+                "message": "Table de capacité uploadée avec succès",
+                "profile_id": profile.id if profile else None,
+                "trains_count": len(capacity_df),
+                "total_places": int(capacity_df['Places'].sum()),
+            }
 
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Erreur lors du traitement du fichier vacances: {str(e)}")
+        raise HTTPException(status_code=400, detail=f"Erreur lors du traitement de la table de capacité: {str(e)}")
+
+@app.get("/capacity-report")
+def get_capacity_report(
+    prediction_id: Optional[int] = None,
+    target_load_factor: float = 0.9,
+    use_upper_bound: bool = False,
+    alerts_limit: int = 100
+):
+    """
+    Taux de remplissage, alertes de dépassement et voitures supplémentaires par train
+    et par jour pour une prévision de l'historique (la dernière par défaut), agrégés
+    par jour et par ligne.
+    Le rapport est mis en cache avec la prévision jusqu'au prochain upload de capacité.
+    Avec use_upper_bound, la demande est la borne haute de l'intervalle de prédiction.
+    """
+    if capacity_df is None:
+        raise HTTPException(status_code=400, detail="No capacity table uploaded. Use /upload-capacity first.")
+    if not prediction_history:
+        raise HTTPException(status_code=400, detail="No predictions available. Call /train-and-predict first.")
+    if not 0 < target_load_factor <= 2:
+        raise HTTPException(status_code=400, detail="Invalid target_load_factor, expected a value in (0, 2]")
+
+    if prediction_id is None:
+        record = prediction_history[-1]
+    else:
+        record = next((r for r in prediction_history if r['id'] == prediction_id), None)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Prediction {prediction_id} not found")
+
+    key = (record['id'], record['created_at'], capacity_version, target_load_factor, use_upper_bound)
+    report = _capacity_cache.get(key)
+    record_cache('capacity', report is not None)
+    if report is None:
+        predictions = pd.DataFrame(record['predictions'])
+        demand_column = 'predicted_passengers'
+        if use_upper_bound:
+            if 'predicted_upper' not in predictions.columns:
+                raise HTTPException(status_code=400, detail="Prediction has no intervals; train with interval_level")
+            demand_column = 'predicted_upper'
+
+        with stage_timer('capacity'):
+            plan = capacity_plan(predictions, capacity_df, target_load_factor, demand_column)
+            by_day, by_line = aggregate_plan(plan, predictions, demand_column)
+            alerts = plan[plan['above_target']].sort_values('load_factor', ascending=False)
+            report = {
+                'prediction_id': record['id'],
+                'model_type': record['model_type'],
+                'target_load_factor': target_load_factor,
+                'demand': demand_column,
+                'summary': {
+                    'rows': len(predictions),
+                    'train_days': len(plan),
+                    'over_capacity': int(plan['over_capacity'].sum()),
+                    'above_target': int(plan['above_target'].sum()),
+                    'extra_cars': int(plan['extra_cars'].sum()),
+                    'trains_without_capacity': sorted(plan.loc[plan['capacity_missing'], 'train_id'].unique().tolist()),
+                },
+                'by_day': sanitize_for_json(by_day.to_dict('records')),
+                'by_line': sanitize_for_json(by_line.to_dict('records')),
+                'alerts': sanitize_for_json(alerts[[
+                    'date', 'train_id', 'lines', 'demand', 'places', 'load_factor', 'over_capacity', 'extra_cars'
+                ]].to_dict('records')),
+            }
+        _capacity_cache[key] = report
+
+    return {**report, 'alerts': report['alerts'][:max(alerts_limit, 0)], 'alerts_total': len(report['alerts'])}
 
 @app.get("/future-events")
-async def get_future_events():
+async def get_future_events(request: Request):
     """Récupère les événements et vacances futures"""
-    global merged_data, evenements_df, vacances_df
-
     if merged_data is None:
         return {"future_events": [], "future_holidays": []}
 
-    try:
+    # Le corps vient aussi de evenements_df / vacances_df : un upload du calendrier change l'ETag
+    etag = make_etag('data', data_version, 'calendar', calendar_version)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    def build_future_events():
         # Trouver la dernière date des données passagers
         last_date = pd.to_datetime(merged_data['Date'].max())
 
@@ -919,7 +1567,7 @@ async def get_future_events():
             for _, row in future_events_df.iterrows():
                 future_events.append({
                     'date': row['Date'].strftime('%Y-%m-%d'),
-                    'description': row.get('Description_Événement', 'Événement'),
+                    'description': row.get('Description_Evenement', 'Événement'),
                     'type': row.get('Type_Événement', 'Événement')
                 })
 
@@ -944,98 +1592,729 @@ async def get_future_events():
                         'jour_dans_sequence': i + 1
                     })
 
-        return {
+        return JSONResponse({
             "future_events": sorted(future_events, key=lambda x: x['date']),
             "future_holidays": sorted(future_holidays, key=lambda x: x['date'])
-        }
+        })
 
+    try:
+        return cached_response('future-events', etag, build_future_events)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des événements futurs: {str(e)}")
 
-@app.get("/current-date-info")
-async def get_current_date_info():
-    """Récupère les informations pour la date actuelle (événements, vacances, prédiction moyenne)"""
-    global merged_data, evenements_df, vacances_df
+# (data_version, couples (train, ville) présents dans l'historique)
+_observed_routes = (None, None)
+
+def observed_routes():
+    """Couples (train, ville) qui circulent dans merged_data, recalculés quand les données changent"""
+    global _observed_routes
+    version, routes = _observed_routes
+    if version == data_version:
+        return routes
+    data = merged_data
+    routes = None if data is None else pd.MultiIndex.from_frame(
+        data[['Train_ID', 'Ville_Arrivee']].astype(str).drop_duplicates())
+    _observed_routes = (data_version, routes)
+    return routes
+
+def summarize_forecast_days(predictions, routes=None):
+    """
+    Résumé par jour d'une prévision : total, totaux par train et par ville, et moyenne
+    par (train, ville). La moyenne ne porte que sur les couples de `routes` (ceux qui
+    circulent dans l'historique) quand il est fourni : comme l'ancienne moyenne des
+    enregistrements passagers, elle ignore les couples de la grille qui ne circulent
+    jamais. Renvoie {date 'YYYY-MM-DD': résumé}.
+    """
+    if not predictions:
+        return {}
+    frame = pd.DataFrame(predictions, columns=['date', 'train_id', 'ville_arrivee', 'predicted_passengers'])
+    frame['predicted_passengers'] = pd.to_numeric(frame['predicted_passengers'], errors='coerce').fillna(0).astype(np.int64)
+    by_train = frame.groupby(['date', 'train_id'], sort=False)['predicted_passengers'].sum()
+    by_city = frame.groupby(['date', 'ville_arrivee'], sort=False)['predicted_passengers'].sum()
+    totals = frame.groupby('date', sort=False)['predicted_passengers'].agg(['sum', 'size'])
+    served = frame
+    if routes is not None:
+        served = frame[pd.MultiIndex.from_frame(frame[['train_id', 'ville_arrivee']].astype(str)).isin(routes)]
+    averages = served.groupby('date', sort=False)['predicted_passengers'].agg(['mean', 'size'])
+
+    days = {}
+    for day, (total, size) in zip(totals.index, totals.itertuples(index=False)):
+        mean, served_rows = averages.loc[day] if day in averages.index else (np.nan, 0)
+        days[day] = {
+            'total_passengers': int(total),
+            'average_passengers': round(float(mean)) if served_rows else None,
+            'rows': int(size),
+            'served_rows': int(served_rows),
+            'by_train': {str(k): int(v) for k, v in by_train.loc[day].items()},
+            'by_city': {str(k): int(v) for k, v in by_city.loc[day].items()},
+        }
+    return days
+
+# Prévision du jour calculée à la demande quand la date n'est pas couverte par le magasin :
+# {model_type: (clé scoreur / calendrier / date, résumé)}
+_today_forecasts = {}
+
+def today_forecast_model():
+    """Modèle utilisé par défaut : le premier de RETRAIN_MODELS publié, sinon entraîné ou compilé"""
+    store = published_forecasts
+    for model_type in RETRAIN_MODELS:
+        if model_type in store:
+            return model_type
+    for model_type in RETRAIN_MODELS:
+        if model_type in trained_models or os.path.exists(registry_path(model_type)):
+            return model_type
+    return next(iter(trained_models), None)
+
+def day_forecast(model_type, day):
+    """
+    Prévision d'un jour par train et par ville : lue dans le résumé matérialisé du magasin
+    de prévisions si le jour est couvert, sinon calculée une fois (grille train x ville du
+    modèle) puis gardée tant que le modèle, le calendrier et la date ne changent pas.
+    Renvoie None si aucun modèle n'est disponible.
+    """
+    day_text = day.strftime('%Y-%m-%d')
+    forecast = published_forecasts.get(model_type)
+    if forecast is not None and day_text in forecast['daily']:
+        record_cache('day_forecast', True)
+        return {
+            'model_type': model_type,
+            'model_version': forecast['model_version'],
+            'source': 'store',
+            'generated_at': forecast['generated_at'],
+            'stale': forecast_store_summary(forecast)['stale'],
+            **forecast['daily'][day_text],
+        }
 
+    scorer = point_scorer(model_type)
+    if scorer is None:
+        return None
+    key = (scorer['key'], calendar_version, data_version, day)
+    cached = _today_forecasts.get(model_type)
+    record_cache('day_forecast', cached is not None and cached[0] == key)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    trains, villes = list(scorer['train_codes']), list(scorer['ville_codes'])
+    flags = calendar_index().get(day, NO_CALENDAR_DAY)
+    count = len(trains) * len(villes)
+    values = score_rows(
+        scorer,
+        np.repeat(np.arange(len(trains)), len(villes)), np.tile(np.arange(len(villes)), len(trains)),
+        np.full(count, day.timetuple().tm_yday), np.full(count, day.month), np.full(count, day.weekday()),
+        np.full(count, flags['event_present']), np.full(count, flags['vacance_present']),
+    )
+    predictions = [
+        {'date': day_text, 'train_id': train, 'ville_arrivee': ville, 'predicted_passengers': value}
+        for (train, ville), value in zip(
+            ((train, ville) for train in trains for ville in villes),
+            np.maximum(0, np.round(values)).astype(np.int64).tolist(),
+        )
+    ]
+    summary = summarize_forecast_days(predictions, observed_routes()).get(day_text)
+    if summary is None:
+        return None
+    result = {
+        'model_type': model_type,
+        'model_version': scorer['version'],
+        'source': 'model',
+        'generated_at': datetime.now().isoformat(),
+        'stale': False,
+        **summary,
+    }
+    _today_forecasts[model_type] = (key, result)
+    return result
+
+@app.get("/current-date-info")
+async def get_current_date_info(model_type: Optional[str] = None):
+    """
+    Informations pour la date actuelle : prévision du modèle pour aujourd'hui (totaux par
+    train et par ville, lus dans le résumé matérialisé du magasin de prévisions),
+    événements et vacances lus dans le calendrier précalculé.
+    """
     try:
         from datetime import date
         current_date = date.today()
-        current_date_str = current_date.strftime('%Y-%m-%d')
-
-        # Initialiser les résultats
-        result = {
-            "date": current_date_str,
+        model_type = model_type or today_forecast_model()
+        forecast = day_forecast(model_type, current_date) if model_type else None
+
+        flags = calendar_index().get(current_date, NO_CALENDAR_DAY)
+        events, holidays = [], []
+        if flags['event_present'] == 1:
+            event_name = flags['event_name'] or "Événement"
+            events.append({"name": event_name, "description": event_name})
+        if flags['vacance_present'] == 1:
+            vacance_name = flags['vacance_name'] or "Vacance"
+            holidays.append({
+                "name": vacance_name,
+                "description": f"{vacance_name} (jour {flags['vacance_day']}/{flags['vacance_duration']})",
+                "duration": flags['vacance_duration'],
+                "day_in_sequence": flags['vacance_day']
+            })
+
+        return sanitize_for_json({
+            "date": current_date.strftime('%Y-%m-%d'),
             "formatted_date": current_date.strftime('%d/%m/%Y'),
-            "average_prediction": 0,
-            "events": [],
-            "holidays": [],
-            "has_events": False,
-            "has_holidays": False
+            # Moyenne de la prévision du jour par (train, ville) qui circule, comme l'ancienne moyenne par enregistrement
+            "average_prediction": forecast['average_passengers'] if forecast else None,
+            "forecast": forecast,
+            "events": events,
+            "holidays": holidays,
+            "has_events": bool(events),
+            "has_holidays": bool(holidays)
+        })
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des informations de la date actuelle: {str(e)}")
+
+def refresh_forecasts():
+    """
+    Tâche planifiée : réentraîne les modèles RETRAIN_MODELS sur la dernière version
+    des données (réutilisés si elle n'a pas changé), calcule la prévision de l'horizon
+    standard le plus long (les plus courts en sont des préfixes) et publie le tout
+    d'un bloc. Les prévisions restent aussi dans le cache de /train-and-predict :
+    en journée, un horizon standard est une simple lecture.
+    """
+    global published_forecasts, forecast_store_version
+    if merged_data is None:
+        return {'published': False, 'reason': 'no data'}
+    source_version, source_calendar = data_version, calendar_version
+    routes = observed_routes()
+    horizon = max(FORECAST_HORIZONS)
+    store, summary = {}, {}
+    for model_type in RETRAIN_MODELS:
+        try:
+            # Réglages du modèle en service (partitions, intervalles) : la tâche ne le remplace pas par un modèle par défaut
+            existing = trained_models.get(model_type) or {}
+            settings = {'partition_by': existing.get('partition_by'),
+                        'min_partition_rows': existing.get('min_partition_rows'),
+                        'interval_level': existing.get('quantile_level')}
+            request = PredictionRequest(model_type=model_type, days_to_predict=horizon,
+                                        **{k: v for k, v in settings.items() if v is not None})
+            entry, training_mode = train_for_request(request)
+            predictions, forecast_cache = cached_forecast(model_type, entry, horizon, evenements_df, vacances_df)
+        except Exception as e:
+            logger.exception("❌ Rafraîchissement %s en échec: %s", model_type, e)
+            summary[model_type] = {'status': 'error', 'error': str(e)}
+            if model_type in published_forecasts:
+                store[model_type] = published_forecasts[model_type]  # Dernière prévision publiée conservée
+            continue
+        store[model_type] = {
+            'model_type': model_type,
+            'model_version': entry.get('version'),
+            'data_version': source_version,
+            'calendar_version': source_calendar,
+            'generated_at': datetime.now().isoformat(),
+            'horizon_days': horizon,
+            'rows_per_day': len(entry['train_ids']) * len(entry['villes']),
+            'model_performance': {'r2': entry['r2'], 'mse': entry['mse']},
+            'last_date': entry['last_date'],
+            'predictions': sanitize_for_json(predictions),
+            # Résumé par jour matérialisé à la publication : /current-date-info n'est qu'une lecture
+            'daily': summarize_forecast_days(predictions, routes),
         }
+        summary[model_type] = {'status': 'ok', 'training_mode': training_mode, 'forecast_cache': forecast_cache,
+                               'predictions': len(predictions)}
+
+    if (data_version, calendar_version) != (source_version, source_calendar):
+        logger.warning("⚠️ Données modifiées pendant le rafraîchissement, publication annulée")
+        return {'published': False, 'reason': 'data changed during refresh', 'models': summary}
+    # Publication atomique : une seule affectation, les lecteurs voient l'ancien ou le nouveau jeu
+    published_forecasts = store
+    forecast_store_version += 1
+    for model_type, forecast in store.items():
+        accuracy_tracker.add_forecast(model_type, forecast['model_version'], forecast['last_date'], forecast['predictions'])
+    logger.info("✅ Prévisions publiées models=%s horizons=%s", list(store), FORECAST_HORIZONS)
+    return {'published': True, 'horizons': FORECAST_HORIZONS, 'models': summary}
+
+def forecast_store_summary(forecast):
+    """Métadonnées d'une prévision publiée (sans les lignes), avec son état de fraîcheur"""
+    return {
+        **{k: v for k, v in forecast.items() if k not in ('predictions', 'daily', 'last_date')},
+        'stale': (forecast['data_version'], forecast['calendar_version']) != (data_version, calendar_version),
+    }
 
-        # Calculer la prédiction moyenne si des données sont disponibles
-        if merged_data is not None and len(merged_data) > 0:
-            # Prendre la moyenne des passagers des données existantes comme estimation
-            avg_passengers = merged_data['Nombre_Passagers'].mean()
-            # FIX: Ensure avg_passengers is a valid number before rounding
-            if pd.isna(avg_passengers) or np.isinf(avg_passengers):
-                result["average_prediction"] = None
-            else:
-                result["average_prediction"] = round(avg_passengers)
-
-        # Chercher les événements pour la date actuelle
-        if evenements_df is not None and 'Date' in evenements_df.columns:
-            evenements_df['Date'] = pd.to_datetime(evenements_df['Date'])
-            current_events = evenements_df[evenements_df['Date'].dt.date == current_date]
-
-            for _, event in current_events.iterrows():
-                if event.get('Evenement_Present', 0) == 1:
-                    event_name = ""
-                    if 'Description_Evenement' in event:
-                        event_name = str(event['Description_Evenement'])
-                    elif 'Description_Événement' in event:
-                        event_name = str(event['Description_Événement'])
-                    else:
-                        event_name = "Événement"
-
-                    result["events"].append({
-                        "name": event_name,
-                        "description": event_name
-                    })
-                    result["has_events"] = True
+@app.get("/forecast-store")
+async def get_forecast_store(request: Request, model_type: Optional[str] = None, days: Optional[int] = None):
+    """
+    Prévisions matérialisées par la tâche planifiée (lecture seule). Sans model_type,
+    la liste des modèles publiés; sinon les prédictions des `days` premiers jours
+    (défaut : horizon complet). `stale` signale des données modifiées depuis.
+    """
+    store = published_forecasts
+    if model_type is None:
+        return {
+            'horizons': FORECAST_HORIZONS,
+            'models': [forecast_store_summary(forecast) for forecast in store.values()],
+        }
+    forecast = store.get(model_type)
+    if forecast is None:
+        raise HTTPException(status_code=404, detail=f"Aucune prévision publiée pour {model_type}")
+    days = forecast['horizon_days'] if days is None else days
+    if not 0 < days <= forecast['horizon_days']:
+        raise HTTPException(status_code=400, detail=f"days doit être entre 1 et {forecast['horizon_days']}")
+
+    etag = make_etag('forecast-store', forecast_store_version, data_version, calendar_version)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    return cached_response(f'forecast-store:{model_type}:{days}', etag, lambda: JSONResponse({
+        **forecast_store_summary(forecast),
+        'days': days,
+        'predictions': forecast['predictions'][:days * forecast['rows_per_day']],
+    }))
+
+@app.get("/scheduler")
+async def get_scheduler():
+    """Tâches planifiées : expression cron, prochaine et dernière exécution"""
+    return {'enabled': bool(RETRAIN_CRON), 'models': RETRAIN_MODELS, 'horizons': FORECAST_HORIZONS,
+            'jobs': sanitize_for_json(job_scheduler.status())}
+
+@app.post("/scheduler/{job_name}/run")
+async def run_scheduled_job(job_name: str):
+    """Exécute immédiatement une tâche planifiée (ex. refresh-forecasts)"""
+    await wait_for_startup_load()
+    if job_name not in job_scheduler.jobs:
+        raise HTTPException(status_code=404, detail=f"Tâche inconnue: {job_name}")
+    result = await job_scheduler.trigger(job_name)
+    return sanitize_for_json({'job': job_scheduler.jobs[job_name].summary(), 'result': result})
+
+@app.get("/forecast-accuracy")
+async def get_forecast_accuracy(request: Request, model_type: Optional[str] = None):
+    """
+    Précision des prévisions émises, jointes aux passagers observés : MAPE et biais
+    glissants par modèle et par (modèle, train, ville, tranche d'horizon), dérive signalée
+    au-delà de DRIFT_MAPE_THRESHOLD / DRIFT_BIAS_THRESHOLD.
+    """
+    etag = make_etag('forecast-accuracy', accuracy_tracker.version, model_type)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+    return cached_response(f'forecast-accuracy:{model_type}', etag, lambda: JSONResponse(sanitize_for_json({
+        **accuracy_tracker.summary(model_type),
+        'thresholds': {'mape': DRIFT_MAPE_THRESHOLD, 'bias_pct': DRIFT_BIAS_THRESHOLD,
+                       'min_samples': ACCURACY_MIN_SAMPLES},
+        'drifting_models': sorted(drifting_models),
+        'last_evaluation': accuracy_tracker.last_evaluation,
+    })))
+
+@app.get("/models")
+async def get_registered_models():
+    """Modèles compilés publiés dans le registre (métadonnées uniquement)"""
+    return {"models": sanitize_for_json(list_models())}
+
+MAX_POINT_QUERIES = 100
+# Au-delà, le predict vectorisé de scikit-learn / xgboost est plus rapide que l'évaluateur compilé
+COMPILED_MAX_ROWS = 256
+NO_CALENDAR_DAY = CALENDAR_DEFAULTS
+# (calendar_version, {date: indicateurs du jour}) et, par type de modèle, le scoreur prêt à l'emploi
+_calendar_table = (None, None)
+_calendar_index = (None, {})
+_point_scorers = {}
+
+def calendar_table():
+    """Calendrier regroupé par date (ingestion.calendar_by_date), reconstruit seulement quand il change"""
+    global _calendar_table
+    version, table = _calendar_table
+    record_cache('calendar', version == calendar_version)
+    if version == calendar_version:
+        return table
+    table = calendar_by_date(evenements_df, vacances_df)
+    _calendar_table = (calendar_version, table)
+    return table
+
+def forecast_calendar(events_df, holidays_df):
+    """Calendrier des tables données : celui en cache pour les tables courantes"""
+    if events_df is evenements_df and holidays_df is vacances_df:
+        return calendar_table()
+    return calendar_by_date(events_df, holidays_df)
+
+def calendar_index():
+    """
+    Index date -> indicateurs événement/vacance (mêmes règles que l'entraînement et
+    generate_forecast), reconstruit uniquement lorsque le calendrier change.
+    """
+    global _calendar_index
+    version, index = _calendar_index
+    if version == calendar_version:
+        return index
+    table = calendar_table()
+    index = dict(zip(table.index.date, table.to_dict('records')))
+    _calendar_index = (calendar_version, index)
+    return index
+
+def calendar_frame():
+    """Indicateurs événement/vacance indexés par date (pour les jointures vectorisées), mis en cache"""
+    return calendar_table()[['event_present', 'vacance_present']]
+
+def score_rows(scorer, train_codes, ville_codes, day_of_year, month, day_of_week, event_present, vacance_present):
+    """
+    Prédictions brutes (une par ligne) pour des lignes déjà encodées, en un seul appel au modèle.
+    Un code -1 (train ou ville inconnus du modèle) est remplacé par toutes les valeurs connues
+    et la prédiction de la ligne est la moyenne de ces combinaisons.
+    """
+    train_codes = np.asarray(train_codes, dtype=np.int64)
+    ville_codes = np.asarray(ville_codes, dtype=np.int64)
+    if not len(train_codes):
+        return np.empty(0)
+    known_train, known_ville = train_codes >= 0, ville_codes >= 0
+    width_ville = np.where(known_ville, 1, len(scorer['ville_codes']))
+    repeats = np.where(known_train, 1, len(scorer['train_codes'])) * width_ville
+    starts = np.cumsum(repeats) - repeats
+    # Position de chaque ligne développée dans le bloc de sa ligne d'origine
+    local = np.arange(repeats.sum()) - np.repeat(starts, repeats)
+    features = np.column_stack([
+        np.where(np.repeat(known_train, repeats), np.repeat(train_codes, repeats), local // np.repeat(width_ville, repeats)),
+        np.where(np.repeat(known_ville, repeats), np.repeat(ville_codes, repeats), local % np.repeat(width_ville, repeats)),
+        np.repeat(day_of_year, repeats),
+        np.repeat(month, repeats),
+        np.repeat(day_of_week, repeats),
+        np.repeat(event_present, repeats),
+        np.repeat(vacance_present, repeats),
+    ]).astype(float)
+    values = scorer['predict'](features)
+    if len(values) == len(train_codes):
+        return values
+    return np.add.reduceat(values, starts) / repeats
+
+def point_scorer(model_type):
+    """
+    Prédicteur et tables d'encodage (dict valeur -> code) du modèle demandé : modèle
+    entraîné en mémoire s'il existe, sinon modèle compilé du registre. Mis en cache
+    jusqu'à ce que le modèle change. Renvoie None si aucun modèle n'est disponible.
+    """
+    entry = trained_models.get(model_type)
+    if entry is not None:
+        key = ('memory', entry.get('version'))
+    elif os.path.exists(registry_path(model_type)):
+        key = ('registry', os.path.getmtime(registry_path(model_type)))
+    else:
+        return None
 
-        # Chercher les vacances pour la date actuelle
-        if vacances_df is not None and 'Date' in vacances_df.columns:
-            vacances_df['Date'] = pd.to_datetime(vacances_df['Date'])
+    scorer = _point_scorers.get(model_type)
+    record_cache('point_scorer', scorer is not None and scorer['key'] == key)
+    if scorer is not None and scorer['key'] == key:
+        return scorer
+
+    if entry is not None:
+        compiled = entry.get('compiled')
+
+        def predict(X):
+            # Modèle compilé pour les petites requêtes (latence), modèle d'origine pour les gros lots (débit)
+            if compiled is not None and len(X) <= COMPILED_MAX_ROWS:
+                return compiled.predict(X)
+            return entry['model'].predict(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+        train_classes, ville_classes = entry['le_train'].classes_.tolist(), entry['le_ville'].classes_.tolist()
+        version = entry.get('version')
+    else:
+        compiled, metadata = load_model(model_type)
+        predict = compiled.predict
+        train_classes, ville_classes = metadata['train_classes'], metadata['ville_classes']
+        version = metadata.get('version')
+
+    scorer = {
+        'key': key,
+        'version': version,
+        'source': key[0],
+        'predict': predict,
+        'train_codes': {value: code for code, value in enumerate(train_classes)},
+        'ville_codes': {value: code for code, value in enumerate(ville_classes)},
+    }
+    _point_scorers[model_type] = scorer
+    return scorer
+
+@app.get("/forecast")
+async def point_forecast(
+    model_type: str,
+    date: List[str] = Query(...),
+    train_id: List[str] = Query(...),
+    ville_arrivee: List[str] = Query(...)
+):
+    """
+    Prévision ponctuelle pour un ou quelques (date, train, ville) sans recalculer toute la grille.
+    Les paramètres peuvent être répétés (même nombre de valeurs, ou une seule valeur réutilisée).
+    Un train ou une ville inconnus du modèle reçoivent la moyenne des prédictions sur
+    toutes les valeurs connues (fallback: true).
+    """
+    count = max(len(date), len(train_id), len(ville_arrivee))
+    if any(len(values) not in (1, count) for values in (date, train_id, ville_arrivee)):
+        raise HTTPException(status_code=400, detail="date, train_id and ville_arrivee must have the same number of values (or one)")
+    if count > MAX_POINT_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_POINT_QUERIES} points per request")
+
+    scorer = point_scorer(model_type)
+    if scorer is None:
+        raise HTTPException(status_code=404, detail=f"No trained model for {model_type}")
+    calendar = calendar_index()
+    train_codes, ville_codes = scorer['train_codes'], scorer['ville_codes']
+
+    rows, points = [], []
+    for i in range(count):
+        day_text = date[i if len(date) > 1 else 0]
+        train = train_id[i if len(train_id) > 1 else 0]
+        ville = ville_arrivee[i if len(ville_arrivee) > 1 else 0]
+        try:
+            day = datetime.strptime(day_text, '%Y-%m-%d').date()
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid date {day_text!r}, expected YYYY-MM-DD")
+        flags = calendar.get(day, NO_CALENDAR_DAY)
+        train_code, ville_code = train_codes.get(train, -1), ville_codes.get(ville, -1)
+        rows.append((train_code, ville_code, day.timetuple().tm_yday, day.month, day.weekday(),
+                     flags['event_present'], flags['vacance_present']))
+        points.append({'date': day_text, 'train_id': train, 'ville_arrivee': ville, **flags,
+                       'fallback': train_code < 0 or ville_code < 0})
+
+    values = score_rows(scorer, *zip(*rows))
+    for point, value in zip(points, values.tolist()):
+        point['predicted_passengers'] = max(0, int(round(value)))
 
-            # Vérifier si la date actuelle est dans une période de vacances
-            for _, vacance in vacances_df.iterrows():
-                date_debut_vacance = vacance['Date'].date()
-                duree_vacance = int(vacance.get('Vacance', 1))
-
-                # Vérifier si la date actuelle est dans la période de vacances
-                for i in range(duree_vacance):
-                    jour_vacance = date_debut_vacance + pd.Timedelta(days=i).to_pytimedelta()
-                    if jour_vacance == current_date:
-                        vacance_name = "Vacance"
-                        if 'Titre_Vacances' in vacance:
-                            vacance_name = str(vacance['Titre_Vacances'])
-                        elif 'Description' in vacance:
-                            vacance_name = str(vacance['Description'])
-
-                        result["holidays"].append({
-                            "name": vacance_name,
-                            "description": f"{vacance_name} (jour {i+1}/{duree_vacance})",
-                            "duration": duree_vacance,
-                            "day_in_sequence": i + 1
-                        })
-                        result["has_holidays"] = True
-                        break
-
-        return result
+    return {
+        'model_type': model_type,
+        'model_version': scorer['version'],
+        'model_source': scorer['source'],
+        'predictions': points,
+    }
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération des informations de la date actuelle: {str(e)}")
+def score_chunk(scorer, chunk):
+    """
+    Score vectorisé d'un bloc (Date, Train_ID, Ville_Arrivee, surcharges optionnelles).
+    Les indicateurs absents ou vides sont lus dans le calendrier; une date invalide
+    donne une prédiction vide.
+    """
+    dates = pd.to_datetime(chunk['Date'], errors='coerce')
+    valid = dates.notna().to_numpy()
+    calendar = calendar_frame().reindex(dates.dt.normalize()).fillna(0)
+    event = calendar['event_present'].to_numpy(dtype=np.int64)
+    vacance = calendar['vacance_present'].to_numpy(dtype=np.int64)
+    if 'Evenement_Present' in chunk.columns:
+        override = pd.to_numeric(chunk['Evenement_Present'], errors='coerce')
+        event = np.where(override.notna(), override.fillna(0), event).astype(np.int64)
+    if 'Vacance' in chunk.columns:
+        override = pd.to_numeric(chunk['Vacance'], errors='coerce')
+        vacance = np.where(override.notna(), override.fillna(0), vacance).astype(np.int64)
+
+    trains = chunk['Train_ID'].astype(str)
+    villes = chunk['Ville_Arrivee'].astype(str)
+    train_codes = trains.map(scorer['train_codes']).fillna(-1).to_numpy(dtype=np.int64)
+    ville_codes = villes.map(scorer['ville_codes']).fillna(-1).to_numpy(dtype=np.int64)
+
+    predicted = pd.array([pd.NA] * len(chunk), dtype='Int64')
+    if valid.any():
+        valid_dates = dates[valid]
+        values = score_rows(
+            scorer, train_codes[valid], ville_codes[valid],
+            valid_dates.dt.dayofyear.to_numpy(), valid_dates.dt.month.to_numpy(),
+            valid_dates.dt.dayofweek.to_numpy(), event[valid], vacance[valid],
+        )
+        predicted[valid] = np.maximum(0, np.round(values)).astype(np.int64)
+
+    return pd.DataFrame({
+        'date': np.where(valid, dates.dt.strftime('%Y-%m-%d'), chunk['Date'].astype(str)).astype(object),
+        'train_id': trains.to_numpy(dtype=object),
+        'ville_arrivee': villes.to_numpy(dtype=object),
+        'predicted_passengers': predicted,
+        'event_present': event,
+        'vacance_present': vacance,
+        'fallback': (train_codes < 0) | (ville_codes < 0),
+    })
+
+MAX_SCENARIOS = 20
+
+def parse_override_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+@app.post("/scenarios")
+def run_scenarios(request: ScenarioRequest):
+    """
+    Simulations what-if sans réentraînement : la prévision de base et chaque scénario
+    (surcharges des indicateurs événement/vacance par période, train ou ville) sont
+    prédits en un seul lot empilé. Renvoie, par scénario, les écarts par jour, par
+    route (train, ville) et pour chaque ligne route x jour modifiée.
+    """
+    entry = trained_models.get(request.model_type)
+    if entry is None:
+        raise HTTPException(status_code=400, detail=f"Model {request.model_type} not trained. Call /train-and-predict first.")
+    if not request.scenarios or len(request.scenarios) > MAX_SCENARIOS:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {MAX_SCENARIOS} scenarios expected")
+
+    with stage_timer('feature_build'):
+        grid, labels = build_forecast_grid(entry, request.days_to_predict, evenements_df, vacances_df)
+        if grid is None:
+            raise HTTPException(status_code=400, detail="Empty forecast grid")
+        dates, trains, villes = labels['date'], labels['train_id'], labels['ville_arrivee']
+        base_event = grid['Evenement_Present'].to_numpy()
+        base_vacance = grid['Vacance'].to_numpy()
+
+        stacked, changed_masks = [grid], []
+        for scenario in request.scenarios:
+            event, vacance = base_event.copy(), base_vacance.copy()
+            changed = np.zeros(len(grid), dtype=bool)
+            for override in scenario.overrides:
+                start = parse_override_date(override.date)
+                end = parse_override_date(override.end_date) if override.end_date else start
+                mask = (dates >= start) & (dates <= end)
+                if override.train_id is not None:
+                    mask &= trains == override.train_id
+                if override.ville_arrivee is not None:
+                    mask &= villes == override.ville_arrivee
+                if override.event_present is not None:
+                    event[mask] = override.event_present
+                if override.vacance_present is not None:
+                    vacance[mask] = override.vacance_present
+                changed |= mask
+            stacked.append(grid.assign(Evenement_Present=event, Vacance=vacance))
+            changed_masks.append(changed)
+
+    with stage_timer('predict'):
+        # Base + scénarios en un seul appel au modèle
+        values = entry['model'].predict(pd.concat(stacked, ignore_index=True))
+        predicted = np.maximum(0, np.round(values)).astype(np.int64).reshape(len(stacked), len(grid))
+
+    base = predicted[0]
+    day_codes, day_labels = pd.factorize(dates)
+    route_codes, route_labels = pd.factorize(pd.MultiIndex.from_arrays([trains, villes]))
+    base_by_day = np.bincount(day_codes, weights=base, minlength=len(day_labels))
+    base_by_route = np.bincount(route_codes, weights=base, minlength=len(route_labels))
+
+    results = []
+    for scenario, scenario_predicted, changed, scenario_stack in zip(
+            request.scenarios, predicted[1:], changed_masks, stacked[1:]):
+        delta = scenario_predicted - base
+        by_day = np.bincount(day_codes, weights=scenario_predicted, minlength=len(day_labels))
+        by_route = np.bincount(route_codes, weights=scenario_predicted, minlength=len(route_labels))
+        touched_routes = np.unique(route_codes[changed])
+        rows = np.flatnonzero(changed)
+        results.append({
+            'name': scenario.name,
+            'total_passengers': int(scenario_predicted.sum()),
+            'delta_total': int(delta.sum()),
+            'affected_rows': int(changed.sum()),
+            'by_day': [
+                {'date': day, 'base': int(b), 'scenario': int(v), 'delta': int(v - b)}
+                for day, b, v in zip(day_labels.tolist(), base_by_day, by_day)
+            ],
+            'by_route': [
+                {'train_id': route_labels[i][0], 'ville_arrivee': route_labels[i][1],
+                 'base': int(base_by_route[i]), 'scenario': int(by_route[i]),
+                 'delta': int(by_route[i] - base_by_route[i])}
+                for i in touched_routes
+            ],
+            'changes': [
+                {'date': dates[i], 'train_id': trains[i], 'ville_arrivee': villes[i],
+                 'event_present': int(scenario_stack['Evenement_Present'].iat[i]),
+                 'vacance_present': int(scenario_stack['Vacance'].iat[i]),
+                 'base': int(base[i]), 'scenario': int(scenario_predicted[i]), 'delta': int(delta[i])}
+                for i in rows
+            ],
+        })
+
+    return {
+        'model_type': request.model_type,
+        'model_version': entry.get('version'),
+        'days_predicted': request.days_to_predict,
+        'base_total_passengers': int(base.sum()),
+        'scenarios': results,
+    }
+
+@app.post("/score-batch")
+async def score_batch(request: Request, model_type: str, file: UploadFile = File(...)):
+    """
+    Scoring d'un fichier CSV ou Parquet de (Date, Train_ID, Ville_Arrivee) avec surcharges
+    optionnelles Evenement_Present / Vacance. Le fichier est lu et scoré par blocs et les
+    résultats sont renvoyés en streaming (CSV, ou Arrow IPC avec ?format=arrow) :
+    la mémoire utilisée ne dépend pas de la taille du fichier.
+    """
+    scorer = point_scorer(model_type)
+    if scorer is None:
+        raise HTTPException(status_code=404, detail=f"No trained model for {model_type}")
+
+    chunks = iter_input_chunks(file.file, file.filename)
+    try:
+        # Le premier bloc est lu avant de répondre pour signaler un fichier invalide en 400,
+        # dans le threadpool comme les suivants (StreamingResponse y itère le générateur)
+        first = await run_in_threadpool(next, chunks, None)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid scoring file: {str(e)}")
+    writer = ArrowChunkWriter() if wants_arrow(request) else CsvChunkWriter()
+
+    if first is not None:
+        chunks = itertools.chain([first], chunks)
+
+    def stream():
+        rows = 0
+        with stage_timer('batch_score'):
+            for chunk in chunks:
+                rows += len(chunk)
+                yield writer.write(score_chunk(scorer, chunk))
+            yield writer.close()
+        logger.info("batch scored model_type=%s rows=%d", model_type, rows)
+
+    return StreamingResponse(stream(), media_type=writer.media_type, headers={
+        'Content-Disposition': f'attachment; filename="scores.{"arrows" if wants_arrow(request) else "csv"}"',
+        'X-Model-Version': str(scorer['version']),
+    })
+
+@app.get("/profiles")
+async def get_profiles():
+    """Liste les profils conservés (les plus récents d'abord)"""
+    return {"profiles": list_profiles()}
+
+@app.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = 'pstats'):
+    """Télécharge un profil : binaire pstats (défaut) ou résumé texte (?format=text)"""
+    capture = get_profile(profile_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Profil non trouvé")
+    if format == 'text':
+        return Response(content=capture.as_text(), media_type="text/plain; charset=utf-8")
+    return Response(
+        content=capture.as_pstats_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f"attachment; filename={capture.label}_{capture.id}.prof"}
+    )
+
+@app.post("/debug/synthetic-load")
+def synthetic_load(
+    rows: int = 10000,
+    model_type: str = "Random Forest",
+    days_to_predict: int = 7,
+    n_trains: int = 10,
+    n_cities: int = 5
+):
+    """
+    Entraîne et prédit sur un jeu synthétique de `rows` lignes, toujours profilé.
+    N'altère ni merged_data, ni trained_models, ni l'historique. Disponible
+    seulement avec DEBUG_ENDPOINTS=1 (sinon 404).
+    """
+    if not DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if rows < 10 or rows > 2_000_000:
+        raise HTTPException(status_code=400, detail="rows doit être compris entre 10 et 2 000 000")
+
+    with profile_block(f'synthetic-load-{rows}') as profile:
+        start = time.perf_counter()
+        with stage_timer('synthetic_generate'):
+            data = generate_merged_dataset(rows, n_trains=n_trains, n_cities=n_cities)
+        generated_at = time.perf_counter()
+        entry = fit_model(data, model_type)
+        trained_at = time.perf_counter()
+        predictions = generate_forecast(entry, days_to_predict)
+        predicted_at = time.perf_counter()
+
+    return {
+        "rows": rows,
+        "model_type": model_type,
+        "predictions_count": len(predictions),
+        "model_performance": sanitize_for_json({"mse": entry['mse'], "r2": entry['r2']}),
+        "timings_s": {
+            "generate": generated_at - start,
+            "train": trained_at - generated_at,
+            "predict": predicted_at - trained_at
+        },
+        "profile_id": profile.id if profile else None
+    }
 
 if __name__ == "__main__":
     import uvicorn
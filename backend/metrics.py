@@ -0,0 +1,199 @@
+"""
+Métriques au format texte Prometheus, sans dépendance externe.
+
+Les compteurs, jauges et histogrammes sont tenus en mémoire par processus et
+rendus par `render_prometheus()` pour l'endpoint `/metrics`.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Bornes (en secondes) adaptées à des requêtes allant de la milliseconde à l'entraînement complet
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = [(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for k, v in pairs]
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {value}' for key, value in items]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _format_labels(self.labelnames, key, ('le', repr(float(bound))))
+                lines.append(f'{self.name}_bucket{labels} {bucket_count}')
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, ("le", "+Inf"))} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'oncf_http_request_duration_seconds', 'Latence des requêtes HTTP par endpoint',
+    ('method', 'route', 'status')
+)
+STAGE_DURATION = Histogram(
+    'oncf_stage_duration_seconds', 'Durée des étapes internes (decode, parse, normalize, validate, enrich, store, feature_build, fit, predict, serialize)',
+    ('stage',)
+)
+CACHE_REQUESTS = Counter(
+    'oncf_cache_requests_total', 'Accès aux caches internes par résultat (hit/miss)',
+    ('cache', 'result')
+)
+DATA_QUALITY_ROWS = Counter(
+    'oncf_data_quality_rows_total', 'Lignes signalées par le contrôle qualité à l\'ingestion',
+    ('dataset', 'check')
+)
+JOIN_ROWS_ADDED = Counter(
+    'oncf_join_rows_added_total', 'Lignes ajoutées aux passagers par les jointures sur Date (0 attendu)',
+    ('join',)
+)
+JOIN_DUPLICATES_AVOIDED = Counter(
+    'oncf_join_duplicate_rows_avoided_total',
+    'Lignes que la jointure aurait dupliquées sans regroupement préalable par date', ('join',)
+)
+SCHEDULED_JOB_RUNS = Counter(
+    'oncf_scheduled_job_runs_total', 'Exécutions des tâches planifiées par résultat', ('job', 'status')
+)
+SCHEDULED_JOB_DURATION = Gauge(
+    'oncf_scheduled_job_last_duration_seconds', 'Durée de la dernière exécution de chaque tâche planifiée', ('job',)
+)
+FORECAST_ROWS_EVALUATED = Counter(
+    'oncf_forecast_rows_evaluated_total', 'Lignes de prévision jointes à une valeur observée'
+)
+FORECAST_MAPE = Gauge(
+    'oncf_forecast_mape', 'MAPE glissant des prévisions par modèle (fenêtre ACCURACY_WINDOW_DAYS)', ('model_type',)
+)
+FORECAST_BIAS = Gauge(
+    'oncf_forecast_bias_ratio', 'Biais relatif glissant (prévision - réel) / réel par modèle', ('model_type',)
+)
+FORECAST_DRIFT = Gauge('oncf_forecast_drift', 'Dérive détectée (1) ou non (0) par modèle', ('model_type',))
+DATASET_ROWS = Gauge('oncf_dataset_rows', 'Nombre de lignes par jeu de données chargé', ('dataset',))
+TRAINED_MODELS = Gauge('oncf_trained_models', 'Nombre de modèles entraînés en mémoire')
+PROCESS_MEMORY = Gauge('oncf_process_resident_memory_bytes', 'Mémoire résidente du processus')
+PROCESS_PEAK_MEMORY = Gauge('oncf_process_peak_resident_memory_bytes', 'Pic de mémoire résidente du processus')
+
+
+@contextmanager
+def stage_timer(stage):
+    """Mesure la durée d'une étape interne et l'enregistre dans STAGE_DURATION"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, stage=stage)
+
+
+def record_cache(cache, hit):
+    """Comptabilise un accès à un cache (hit ou miss)"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+
+
+def process_memory():
+    """Renvoie (mémoire résidente, pic) en octets; lit /proc si disponible"""
+    rss = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if peak is None and resource is not None:
+        # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = maxrss if os.uname().sysname == 'Darwin' else maxrss * 1024
+    if peak is None:
+        peak = rss or 0
+    return (rss if rss is not None else peak), peak
+
+
+def render_prometheus():
+    """Rend toutes les métriques au format d'exposition texte Prometheus"""
+    rss, peak = process_memory()
+    PROCESS_MEMORY.set(rss)
+    PROCESS_PEAK_MEMORY.set(peak)
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
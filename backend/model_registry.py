@@ -0,0 +1,73 @@
+"""
+Registre des modèles compilés sur disque.
+
+Chaque type de modèle a une entrée `<type>.npz` contenant les tableaux du
+modèle compilé (voir compiled_models.py) et ses métadonnées JSON (version,
+encodeurs, période d'entraînement, métriques). Le fichier est écrit puis
+renommé atomiquement; il se recharge avec `np.load(allow_pickle=False)`,
+sans scikit-learn ni xgboost.
+"""
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from compiled_models import COMPILED_KINDS
+
+REGISTRY_DIR = os.getenv(
+    'MODEL_REGISTRY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model_registry'),
+)
+
+
+def model_key(model_type):
+    """'Random Forest' -> 'random_forest' (même convention que la documentation des modèles)"""
+    return model_type.lower().replace(' ', '_')
+
+
+def registry_path(model_type):
+    return os.path.join(REGISTRY_DIR, model_key(model_type) + '.npz')
+
+
+def save_model(model_type, compiled, metadata):
+    """Publie atomiquement le modèle compilé et ses métadonnées; renvoie le chemin écrit"""
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    metadata = {**metadata, 'model_type': model_type, 'kind': compiled.kind}
+    arrays = {**compiled.to_arrays(), 'metadata': np.array(json.dumps(metadata, default=str))}
+    path = registry_path(model_type)
+    fd, tmp_path = tempfile.mkstemp(dir=REGISTRY_DIR, suffix='.npz.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+
+def load_model(model_type):
+    """Renvoie (modèle compilé, métadonnées), ou None si le modèle n'est pas enregistré"""
+    path = registry_path(model_type)
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    metadata = json.loads(str(arrays.pop('metadata')))
+    return COMPILED_KINDS[metadata['kind']].from_arrays(arrays), metadata
+
+
+def list_models():
+    """Métadonnées de tous les modèles enregistrés"""
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    models = []
+    for name in sorted(os.listdir(REGISTRY_DIR)):
+        if not name.endswith('.npz'):
+            continue
+        with np.load(os.path.join(REGISTRY_DIR, name), allow_pickle=False) as archive:
+            metadata = json.loads(str(archive['metadata']))
+        metadata['size_bytes'] = os.path.getsize(os.path.join(REGISTRY_DIR, name))
+        models.append(metadata)
+    return models
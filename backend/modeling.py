@@ -0,0 +1,194 @@
+"""
+Construction des modèles, entraînement partitionné et mises à jour incrémentales.
+
+Un modèle partitionné entraîne un modèle par ville d'arrivée ou par route
+(couple train/ville) en parallèle dans un pool de processus fourni par l'appelant
+(créé une fois au démarrage de l'application), plus un modèle
+global de repli pour les partitions trop petites ou inconnues. À l'inférence,
+chaque ligne est routée vers le modèle de sa partition, par lots vectorisés.
+"""
+import copy
+
+import numpy as np
+
+PARTITION_MODES = ('city', 'route')
+
+# En dessous de ce volume, le transfert des données vers les workers dépasse le gain du parallélisme
+PARALLEL_MIN_ROWS = 20000
+
+# Arbres (Random Forest) ou itérations de boosting (XGBoost) ajoutés à chaque mise à jour
+INCREMENTAL_TREES = 20
+INCREMENTAL_ROUNDS = 20
+
+
+def make_model(model_type):
+    """Instancie le modèle demandé; les bibliothèques ML sont importées au premier entraînement"""
+    if model_type == "Linear Regression":
+        from sklearn.linear_model import LinearRegression
+        return LinearRegression()
+    elif model_type == "Random Forest":
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(n_estimators=100, random_state=42)
+    elif model_type == "XGBoost":
+        import xgboost as xgb
+        return xgb.XGBRegressor(n_estimators=100, random_state=42)
+    return None
+
+
+def partition_keys(X, partition_by):
+    """Clé de partition de chaque ligne de X (DataFrame des colonnes de features)"""
+    cities = X['Ville_Arrivée_encoded'].to_numpy(dtype=np.int64)
+    if partition_by == 'city':
+        return cities
+    trains = X['Train_ID_encoded'].to_numpy(dtype=np.int64)
+    # Couple (train, ville) encodé sur un seul entier, indépendamment des données vues
+    return trains * 1_000_000 + cities
+
+
+def _fit_one(job):
+    """Point d'entrée des workers : (clé, type de modèle, X, y) -> (clé, modèle entraîné)"""
+    key, model_type, X, y = job
+    model = make_model(model_type)
+    model.fit(X, y)
+    return key, model
+
+
+class PartitionedModel:
+    """Un modèle par partition + un modèle global de repli, avec l'interface predict() de sklearn"""
+
+    def __init__(self, model_type, partition_by, models, fallback, min_partition_rows):
+        self.model_type = model_type
+        self.partition_by = partition_by
+        self.models = models
+        self.fallback = fallback
+        self.min_partition_rows = min_partition_rows
+
+    @property
+    def n_partitions(self):
+        return len(self.models)
+
+    def predict(self, X):
+        keys = partition_keys(X, self.partition_by)
+        predictions = np.empty(len(X), dtype=float)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        fallback_mask = np.zeros(len(X), dtype=bool)
+        for position, key in enumerate(unique_keys):
+            rows = inverse == position
+            model = self.models.get(int(key))
+            if model is None:
+                fallback_mask |= rows
+                continue
+            predictions[rows] = model.predict(X[rows])
+        if fallback_mask.any():
+            predictions[fallback_mask] = self.fallback.predict(X[fallback_mask])
+        return predictions
+
+
+def fit_partitioned(X, y, model_type, partition_by, min_partition_rows=50, executor=None):
+    """
+    Entraîne un modèle par partition (ville ou route), en parallèle sur `executor`
+    (pool de processus partagé) au-delà de PARALLEL_MIN_ROWS lignes, sinon sur le
+    thread appelant. Les partitions de moins de `min_partition_rows` lignes utilisent
+    le modèle global.
+    """
+    if partition_by not in PARTITION_MODES:
+        raise ValueError(f"partition_by doit valoir {' ou '.join(PARTITION_MODES)}")
+
+    keys = partition_keys(X, partition_by)
+    unique_keys, counts = np.unique(keys, return_counts=True)
+    jobs = [(None, model_type, X, y)]
+    for key, count in zip(unique_keys, counts):
+        if count >= min_partition_rows:
+            rows = keys == key
+            jobs.append((int(key), model_type, X[rows], y[rows]))
+
+    if executor is not None and len(jobs) > 1 and len(X) >= PARALLEL_MIN_ROWS:
+        fitted = dict(executor.map(_fit_one, jobs))
+    else:
+        fitted = dict(map(_fit_one, jobs))
+
+    fallback = fitted.pop(None)
+    return PartitionedModel(model_type, partition_by, fitted, fallback, min_partition_rows)
+
+
+def linear_sufficient_stats(X, y):
+    """Statistiques suffisantes XᵀX, Xᵀy (avec colonne d'intercept) d'une régression linéaire"""
+    A = np.column_stack([np.ones(len(X)), np.asarray(X, dtype=float)])
+    y = np.asarray(y, dtype=float)
+    return {'xtx': A.T @ A, 'xty': A.T @ y, 'n': len(A)}
+
+
+def update_model(model, model_type, X, y, stats=None):
+    """
+    Met à jour un modèle entraîné avec de nouvelles lignes, sans repartir de zéro :
+    - Linear Regression : cumule XᵀX, Xᵀy et résout en forme fermée
+    - Random Forest : warm_start, ajoute INCREMENTAL_TREES arbres entraînés sur X
+    - XGBoost : poursuit le boosting du booster existant sur X
+    La mise à jour porte sur une copie : le modèle d'origine, qui peut servir des
+    prédictions en parallèle, n'est jamais modifié. Renvoie (modèle mis à jour,
+    statistiques suffisantes à jour ou None hors régression linéaire).
+    Lève ValueError si le modèle ne peut pas être mis à jour.
+    """
+    if model_type == "Linear Regression":
+        if stats is None:
+            raise ValueError("statistiques suffisantes absentes")
+        new_stats = linear_sufficient_stats(X, y)
+        stats = {key: stats[key] + new_stats[key] for key in new_stats}
+        beta = np.linalg.lstsq(stats['xtx'], stats['xty'], rcond=None)[0]
+        model = copy.deepcopy(model)
+        model.intercept_ = beta[0]
+        model.coef_ = beta[1:]
+        return model, stats
+    if model_type == "Random Forest":
+        model = copy.deepcopy(model)
+        model.set_params(warm_start=True, n_estimators=model.n_estimators + INCREMENTAL_TREES)
+        model.fit(X, y)
+        return model, None
+    if model_type == "XGBoost":
+        booster = model.get_booster()
+        model = copy.deepcopy(model)
+        model.set_params(n_estimators=INCREMENTAL_ROUNDS)
+        model.fit(X, y, xgb_model=booster)
+        return model, None
+    raise ValueError(f"mise à jour incrémentale non prise en charge pour {model_type}")
+
+
+# Quantiles des résidus conservés pour les intervalles (101 points, indépendants du niveau demandé)
+RESIDUAL_GRID = np.linspace(0, 1, 101)
+
+
+def quantile_bounds(level):
+    """Quantiles (bas, haut) d'un intervalle central de niveau `level` (ex. 0.8 -> 0.1, 0.9)"""
+    if not 0 < level < 1:
+        raise ValueError("le niveau de l'intervalle doit être compris entre 0 et 1")
+    alpha = (1 - level) / 2
+    return alpha, 1 - alpha
+
+
+def residual_quantiles(y_true, y_pred):
+    """Distribution compacte des résidus d'évaluation"""
+    residuals = np.asarray(y_true, dtype=float) - np.asarray(y_pred, dtype=float)
+    return np.quantile(residuals, RESIDUAL_GRID)
+
+
+def fit_quantile_model(X, y, level):
+    """Modèle XGBoost à objectif quantile prédisant les deux bornes de l'intervalle en une passe"""
+    import xgboost as xgb
+    model = xgb.XGBRegressor(n_estimators=100, random_state=42, objective='reg:quantileerror',
+                             quantile_alpha=np.array(quantile_bounds(level)))
+    model.fit(X, y)
+    return model
+
+
+def forest_interval(model, X, level):
+    """Quantiles des prédictions des arbres, calculés sur la matrice (arbres × lignes)"""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    per_tree = np.stack([tree.predict(X, check_input=False) for tree in model.estimators_])
+    lower, upper = np.quantile(per_tree, quantile_bounds(level), axis=0)
+    return lower, upper
+
+
+def residual_interval(point, quantiles, level):
+    """Intervalle point + quantiles des résidus"""
+    lo, hi = quantile_bounds(level)
+    return point + np.interp(lo, RESIDUAL_GRID, quantiles), point + np.interp(hi, RESIDUAL_GRID, quantiles)
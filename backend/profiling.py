@@ -0,0 +1,159 @@
+"""
+Profilage à la demande des requêtes d'entraînement et d'upload.
+
+Un client active le profilage pour une seule requête avec l'en-tête
+`X-Profile: 1` ou le paramètre `?profile=1`. Le profil cProfile est conservé
+en mémoire (les MAX_STORED_PROFILES derniers) et téléchargeable via
+`/profiles/{profile_id}`. Le travail qu'une requête confie au pool de threads
+(`profile_thread`) est ajouté au profil de la requête.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_HEADER = 'x-profile'
+MAX_STORED_PROFILES = 20
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+_profiles = OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+class ProfileCapture:
+    """Profil d'une requête : identifiant connu dès le début, statistiques à la fin"""
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.created_at = datetime.now().isoformat()
+        self.duration_s = None
+        self.stats_data = None
+        # Statistiques des blocs exécutés sur d'autres threads, fusionnées à la fin du profil
+        self.thread_stats = []
+
+    def summary(self):
+        return {
+            'profile_id': self.id,
+            'label': self.label,
+            'created_at': self.created_at,
+            'duration_s': self.duration_s,
+        }
+
+    def as_pstats_bytes(self):
+        """Format binaire lisible par `pstats.Stats(fichier)` ou snakeviz"""
+        return marshal.dumps(self.stats_data)
+
+    def as_text(self, sort='cumulative', limit=50):
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsSource(dict(self.stats_data)), stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+
+class _StatsSource:
+    """Adaptateur permettant à pstats.Stats de relire des statistiques déjà extraites"""
+
+    def __init__(self, stats_data):
+        self.stats = stats_data
+
+    def create_stats(self):
+        pass
+
+
+def profiling_requested(request):
+    """Vrai si la requête demande un profil (en-tête X-Profile ou ?profile=1)"""
+    flag = request.headers.get(PROFILE_HEADER) or request.query_params.get('profile')
+    return flag is not None and flag.lower() in _TRUE_VALUES
+
+
+@contextmanager
+def profile_block(label):
+    """Profile inconditionnellement le bloc et conserve le résultat"""
+    capture = ProfileCapture(label)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Un autre profileur est déjà actif sur ce thread : on n'empile pas
+        yield None
+        return
+    start = time.perf_counter()
+    try:
+        yield capture
+    finally:
+        profiler.disable()
+        capture.duration_s = time.perf_counter() - start
+        profiler.create_stats()
+        capture.stats_data = _merge_stats(profiler.stats, capture.thread_stats)
+        _store(capture)
+
+
+@contextmanager
+def profile_thread(capture):
+    """
+    Profile le bloc, exécuté sur un autre thread que la requête (pool de threads),
+    dans le profil `capture` de la requête; sans profil (None), ne coûte rien.
+    """
+    if capture is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.create_stats()
+        capture.thread_stats.append(profiler.stats)
+
+
+def _merge_stats(stats_data, others):
+    if not others:
+        return stats_data
+    merged = pstats.Stats(_StatsSource(dict(stats_data)))
+    for other in others:
+        merged.add(_StatsSource(dict(other)))
+    return merged.stats
+
+
+@contextmanager
+def maybe_profile(request, label):
+    """
+    Profile le bloc si la requête le demande, sinon ne coûte rien.
+    Dans une route async, le profil inclut aussi le code des autres
+    coroutines exécutées pendant les `await` du bloc.
+    """
+    if not profiling_requested(request):
+        yield None
+        return
+    with profile_block(label) as capture:
+        yield capture
+
+
+def _store(capture):
+    with _profiles_lock:
+        _profiles[capture.id] = capture
+        while len(_profiles) > MAX_STORED_PROFILES:
+            _profiles.popitem(last=False)
+
+
+def get_profile(profile_id):
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def list_profiles():
+    with _profiles_lock:
+        return [capture.summary() for capture in reversed(_profiles.values())]
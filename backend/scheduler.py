@@ -0,0 +1,185 @@
+"""
+Planificateur de tâches local, sans service externe.
+
+Les tâches sont décrites par une expression cron à 5 champs (minute, heure,
+jour du mois, mois, jour de la semaine; `*`, listes `1,3`, plages `1-5` et
+pas `*/15`) en heure locale. `JobScheduler` tourne dans la boucle asyncio de
+l'application et exécute chaque tâche dans un thread; une tâche ne se
+chevauche jamais avec elle-même.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from metrics import SCHEDULED_JOB_DURATION, SCHEDULED_JOB_RUNS
+
+logger = logging.getLogger("oncf")
+
+# (minimum, maximum) de chaque champ cron
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+# Réveil au plus tard toutes les MAX_SLEEP_SECONDS (changement d'heure, mise en veille)
+MAX_SLEEP_SECONDS = 60
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        value_range, _, step = part.partition('/')
+        if value_range == '*':
+            start, end = low, high
+        elif '-' in value_range:
+            start, end = (int(v) for v in value_range.split('-', 1))
+        else:
+            start = end = int(value_range)
+        step = int(step) if step else 1
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Champ cron invalide: {text!r} (attendu entre {low} et {high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Expression cron à 5 champs; `next_after` donne la prochaine minute correspondante"""
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expression cron invalide: {expression!r} (5 champs attendus)")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+        )
+        # Comme cron : si jour du mois et jour de la semaine sont restreints, l'un ou l'autre suffit
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays  # cron : dimanche = 0
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment):
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Aucune échéance pour l'expression cron {self.expression!r}")
+
+
+class ScheduledJob:
+    def __init__(self, name, schedule, func):
+        self.name = name
+        self.schedule = schedule
+        self.func = func
+        self.next_run = schedule.next_after(datetime.now())
+        self.last_run = None
+        self.last_status = None
+        self.last_duration_s = None
+        self.last_result = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._lock.locked()
+
+    def run(self, reason='schedule'):
+        """Exécute la tâche (thread appelant); ignorée si une exécution est déjà en cours"""
+        if not self._lock.acquire(blocking=False):
+            logger.info("⏭️ Tâche %s déjà en cours, exécution ignorée", self.name)
+            return None
+        start = time.perf_counter()
+        self.last_run = datetime.now()
+        try:
+            logger.info("⏰ Tâche %s démarrée (%s)", self.name, reason)
+            self.last_result = self.func()
+            self.last_status, self.last_error = 'success', None
+            return self.last_result
+        except Exception as e:
+            logger.exception("❌ Tâche %s en échec: %s", self.name, e)
+            self.last_status, self.last_error = 'error', str(e)
+            return None
+        finally:
+            self.last_duration_s = time.perf_counter() - start
+            SCHEDULED_JOB_RUNS.inc(job=self.name, status=self.last_status)
+            SCHEDULED_JOB_DURATION.set(self.last_duration_s, job=self.name)
+            logger.info("⏰ Tâche %s terminée status=%s duration=%.1fs", self.name, self.last_status, self.last_duration_s)
+            self._lock.release()
+
+    def summary(self):
+        return {
+            'name': self.name,
+            'cron': self.schedule.expression,
+            'next_run': self.next_run.isoformat() if self.next_run else None,
+            'running': self.running,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'last_status': self.last_status,
+            'last_duration_s': round(self.last_duration_s, 3) if self.last_duration_s is not None else None,
+            'last_result': self.last_result,
+            'last_error': self.last_error,
+        }
+
+
+class JobScheduler:
+    """Boucle asyncio qui lance les tâches à leur échéance, chacune dans un thread"""
+
+    def __init__(self):
+        self.jobs = {}
+        self._task = None
+        self._loop = None
+
+    def add(self, name, cron, func):
+        self.jobs[name] = ScheduledJob(name, CronSchedule(cron), func)
+        return self.jobs[name]
+
+    def start(self):
+        if self.jobs and self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = self._loop.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def trigger(self, name, reason='manual'):
+        """Exécute une tâche immédiatement, hors de la boucle d'événements"""
+        job = self.jobs[name]
+        return await asyncio.get_running_loop().run_in_executor(None, job.run, reason)
+
+    def submit(self, name, reason):
+        """Lance une tâche en arrière-plan sans attendre sa fin (depuis n'importe quel thread)"""
+        job = self.jobs.get(name)
+        if job is None or self._loop is None or job.running:
+            return False
+        self._loop.call_soon_threadsafe(self._loop.run_in_executor, None, job.run, reason)
+        return True
+
+    async def _run_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = datetime.now()
+            for job in self.jobs.values():
+                if job.next_run <= now:
+                    job.next_run = job.schedule.next_after(now)
+                    loop.run_in_executor(None, job.run)
+            wake_at = min(job.next_run for job in self.jobs.values())
+            await asyncio.sleep(min(max((wake_at - datetime.now()).total_seconds(), 0.5), MAX_SLEEP_SECONDS))
+
+    def status(self):
+        return [job.summary() for job in self.jobs.values()]
@@ -0,0 +1,162 @@
+"""
+Génération de données synthétiques à l'échelle du réseau ONCF.
+
+`generate_network` produit les trois fichiers d'upload (passagers, événements,
+vacances) pour N trains, M villes et Y années de comptages journaliers, avec un
+calendrier réaliste : jours fériés marocains, vacances scolaires et événements
+ponctuels (festivals, matchs). `generate_merged_dataset` en dérive directement
+un jeu au format merged_data pour les benchmarks et `/debug/synthetic-load`.
+
+Usage:
+    python synthetic_data.py --trains 50 --cities 12 --years 3 --output ../synthetic_data
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+CITIES = [
+    'Casablanca', 'Rabat', 'Fès', 'Marrakech', 'Tanger', 'Meknès', 'Oujda', 'Kénitra',
+    'El Jadida', 'Safi', 'Settat', 'Khouribga', 'Nador', 'Taza', 'Béni Mellal', 'Asilah',
+]
+
+# (mois, jour, nom) des jours fériés à date fixe
+FIXED_HOLIDAYS = [
+    (1, 1, 'Nouvel An'), (1, 11, 'Manifeste de l\'Indépendance'), (1, 14, 'Nouvel An Amazigh'),
+    (5, 1, 'Fête du Travail'), (7, 30, 'Fête du Trône'), (8, 14, 'Oued Ed-Dahab'),
+    (8, 20, 'Révolution du Roi et du Peuple'), (8, 21, 'Fête de la Jeunesse'),
+    (11, 6, 'Marche Verte'), (11, 18, 'Fête de l\'Indépendance'),
+]
+
+# (mois, jour, durée en jours, nom) des vacances scolaires
+SCHOOL_HOLIDAYS = [
+    (1, 20, 7, 'Vacances de mi-année'), (3, 24, 9, 'Vacances de printemps'),
+    (7, 1, 62, 'Vacances d\'été'), (11, 1, 5, 'Vacances d\'automne'),
+]
+
+EVENT_NAMES = ['Festival', 'Match de football', 'Salon', 'Concert', 'Moussem', 'Marathon']
+
+
+def generate_network(n_trains=10, n_cities=5, years=1, start='2022-01-01', events_per_year=24, seed=42):
+    """
+    Renvoie (passengers_df, evenements_df, vacances_df) au format des CSV d'upload.
+    Chaque train dessert une ville d'arrivée fixe et circule tous les jours.
+    """
+    rng = np.random.default_rng(seed)
+    n_cities = max(1, min(n_cities, len(CITIES)))
+    dates = pd.date_range(start, periods=max(1, int(round(365.25 * years))), freq='D')
+    n_days = len(dates)
+
+    # Calendrier des événements : un par ligne de date, comme evenements.csv
+    event_flags = np.zeros(n_days, dtype=int)
+    event_count = min(n_days, max(0, int(events_per_year * years)))
+    event_days = rng.choice(n_days, size=event_count, replace=False) if event_count else np.array([], dtype=int)
+    event_flags[event_days] = 1
+    event_descriptions = np.full(n_days, '', dtype=object)
+    event_descriptions[event_days] = rng.choice(EVENT_NAMES, size=event_count)
+    evenements_df = pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Evenement_Present': event_flags,
+        'Description_Evenement': event_descriptions,
+    })
+
+    # Calendrier des vacances : date de début + durée, comme vacances.csv
+    holiday_rows = []
+    for year in range(dates[0].year, dates[-1].year + 1):
+        for month, day, name in FIXED_HOLIDAYS:
+            holiday_rows.append((pd.Timestamp(year, month, day), 1, name))
+        for month, day, duration, name in SCHOOL_HOLIDAYS:
+            holiday_rows.append((pd.Timestamp(year, month, day), duration, name))
+    vacances_df = pd.DataFrame(holiday_rows, columns=['Date', 'Vacance', 'Titre_Vacances'])
+    vacances_df = vacances_df[(vacances_df['Date'] >= dates[0]) & (vacances_df['Date'] <= dates[-1])]
+    vacances_df = vacances_df.sort_values('Date').reset_index(drop=True)
+
+    holiday_flags = _expand_holidays(dates, vacances_df)
+    vacances_df['Date'] = vacances_df['Date'].dt.strftime('%Y-%m-%d')
+
+    # Comptages journaliers : base par train, saisonnalité, week-end, événements, vacances
+    train_base = rng.uniform(80, 400, n_trains)
+    train_city = np.arange(n_trains) % n_cities
+    day_of_year = dates.dayofyear.to_numpy()
+    seasonal = 1 + 0.15 * np.sin(2 * np.pi * (day_of_year - 80) / 365.25)
+    weekend = np.where(dates.dayofweek.to_numpy() >= 4, 1.2, 1.0)
+    daily_factor = seasonal * weekend * (1 + 0.35 * event_flags) * (1 + 0.25 * holiday_flags)
+    growth = 1 + 0.03 * np.arange(n_days) / 365.25
+
+    counts = np.outer(daily_factor * growth, train_base)
+    counts = counts * rng.lognormal(0, 0.08, counts.shape)
+    counts = np.maximum(0, counts).round().astype(np.int64)
+
+    train_ids = np.array([f'T{i + 1:03d}' for i in range(n_trains)])
+    cities = np.array(CITIES[:n_cities])
+    passengers_df = pd.DataFrame({
+        'Date': np.repeat(dates.strftime('%Y-%m-%d').to_numpy(), n_trains),
+        'Train_ID': np.tile(train_ids, n_days),
+        'Ville_Arrivée': np.tile(cities[train_city], n_days),
+        'Nombre_Passagers': counts.ravel(),
+    })
+    return passengers_df, evenements_df, vacances_df
+
+
+def _expand_holidays(dates, vacances_df):
+    """Indicateur 0/1 par jour de `dates` à partir des périodes (début, durée)"""
+    flags = np.zeros(len(dates), dtype=int)
+    if vacances_df.empty:
+        return flags
+    offsets = (vacances_df['Date'] - dates[0]).dt.days.to_numpy()
+    durations = vacances_df['Vacance'].to_numpy()
+    for offset, duration in zip(offsets, durations):
+        flags[max(0, offset):max(0, offset + duration)] = 1
+    return flags
+
+
+def network_shape_for_rows(n_rows, years=3, n_cities=12):
+    """Choisit (n_trains, n_cities, years) pour approcher n_rows lignes passagers"""
+    days = int(round(365.25 * years))
+    if n_rows < days:
+        return 1, 1, max(n_rows, 1) / 365.25
+    return max(1, math.ceil(n_rows / days)), n_cities, years
+
+
+def generate_merged_dataset(n_rows, n_trains=10, n_cities=5, seed=42):
+    """Renvoie n_rows lignes au format merged_data (Date, Train_ID, Ville_Arrivee, Nombre_Passagers, ...)"""
+    years = max(n_rows / n_trains, 1) / 365.25
+    passengers_df, evenements_df, vacances_df = generate_network(
+        n_trains=n_trains, n_cities=n_cities, years=years, seed=seed
+    )
+    passengers_df = passengers_df.head(n_rows).rename(columns={'Ville_Arrivée': 'Ville_Arrivee'})
+
+    dates = pd.to_datetime(evenements_df['Date'])
+    vacances_df = vacances_df.assign(Date=pd.to_datetime(vacances_df['Date']))
+    calendar = evenements_df.assign(Vacance=_expand_holidays(pd.DatetimeIndex(dates), vacances_df))
+    merged = passengers_df.merge(calendar, on='Date', how='left')
+    return merged[['Date', 'Train_ID', 'Ville_Arrivee', 'Nombre_Passagers',
+                   'Evenement_Present', 'Description_Evenement', 'Vacance']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un réseau synthétique au format des CSV d'upload")
+    parser.add_argument('--trains', type=int, default=10)
+    parser.add_argument('--cities', type=int, default=5)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--start', default='2022-01-01')
+    parser.add_argument('--events-per-year', type=int, default=24)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='synthetic_data')
+    args = parser.parse_args()
+
+    passengers_df, evenements_df, vacances_df = generate_network(
+        args.trains, args.cities, args.years, args.start, args.events_per_year, args.seed
+    )
+    os.makedirs(args.output, exist_ok=True)
+    passengers_df.to_csv(os.path.join(args.output, 'passengers.csv'), index=False)
+    evenements_df.to_csv(os.path.join(args.output, 'evenements.csv'), index=False)
+    vacances_df.to_csv(os.path.join(args.output, 'vacances.csv'), index=False)
+    print(f"✅ {len(passengers_df)} lignes passagers, {int(evenements_df['Evenement_Present'].sum())} événements, "
+          f"{len(vacances_df)} périodes de vacances écrites dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
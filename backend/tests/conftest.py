@@ -0,0 +1,13 @@
+"""
+Tests unitaires du backend : `python -m pytest backend/tests`.
+
+Les modules du backend s'importent comme depuis backend/ (uvicorn main:app);
+registre de modèles et cache d'upload pointent vers des répertoires temporaires.
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('MODEL_REGISTRY_DIR', tempfile.mkdtemp(prefix='oncf-registry-'))
+os.environ.setdefault('UPLOAD_CACHE_DIR', tempfile.mkdtemp(prefix='oncf-upload-cache-'))
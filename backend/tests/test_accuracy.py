@@ -0,0 +1,145 @@
+import pandas as pd
+import pytest
+
+import accuracy
+from accuracy import AccuracyTracker
+
+ROUTES = [('T1', 'Rabat'), ('T2', 'Fes')]
+
+
+def forecast_rows(start, days, predicted=100.0):
+    """Prévision de `days` jours à partir de `start` pour chaque ligne de ROUTES"""
+    return [
+        {'date': day.strftime('%Y-%m-%d'), 'train_id': train, 'ville_arrivee': ville, 'predicted_passengers': predicted}
+        for day in pd.date_range(start, periods=days) for train, ville in ROUTES
+    ]
+
+
+def actual_rows(rows, actual):
+    return pd.DataFrame({
+        'Date': [row['date'] for row in rows],
+        'Train_ID': [row['train_id'] for row in rows],
+        'Ville_Arrivee': [row['ville_arrivee'] for row in rows],
+        'Nombre_Passagers': actual,
+    })
+
+
+def test_evaluate_joins_actuals_to_forecasts():
+    tracker = AccuracyTracker()
+    rows = forecast_rows('2024-01-02', 3)
+    assert tracker.add_forecast('Linear Regression', 1, '2024-01-01', rows) == 6
+
+    # Deux premiers jours observés; une ligne en double (sommée) et une ligne sans prévision
+    observed = actual_rows(rows[:4], [90, 80, 50, 120])
+    extra = pd.DataFrame({'Date': ['2024-01-02', '2024-01-02'], 'Train_ID': ['T1', 'T9'],
+                          'Ville_Arrivee': ['Rabat', 'Rabat'], 'Nombre_Passagers': [10, 70]})
+    assert tracker.evaluate(pd.concat([observed, extra], ignore_index=True)) == 4
+
+    forecasts = tracker.forecasts.sort_values(['date', 'train_id'])
+    assert forecasts['actual'].tolist()[:4] == [100, 80, 50, 120]
+    assert forecasts['actual'].isna().sum() == 2
+    assert forecasts['horizon_days'].tolist() == [1, 1, 2, 2, 3, 3]
+    # Lignes déjà jointes : rien de nouveau
+    assert tracker.evaluate(observed) == 0
+
+
+def test_same_model_version_is_tracked_once():
+    tracker = AccuracyTracker()
+    assert tracker.add_forecast('XGBoost', 3, '2024-01-01', forecast_rows('2024-01-02', 7)) == 14
+    # Même version, horizon plus long : seuls les jours pas encore suivis sont ajoutés
+    assert tracker.add_forecast('XGBoost', 3, '2024-01-01', forecast_rows('2024-01-02', 10)) == 6
+    assert tracker.add_forecast('XGBoost', 3, '2024-01-01', forecast_rows('2024-01-02', 7)) == 0
+    assert tracker.add_forecast('XGBoost', 4, '2024-01-01', forecast_rows('2024-01-02', 7)) == 14
+    tracker.evaluate(actual_rows(forecast_rows('2024-01-02', 1), [100, 100]))
+    assert len(tracker.forecasts) == 34
+
+
+def test_rolling_window():
+    tracker = AccuracyTracker(window_days=7)
+    rows = forecast_rows('2024-01-02', 20)
+    tracker.add_forecast('Random Forest', 1, '2024-01-01', rows)
+    # Erreur de 50 % sur les 10 premiers jours, nulle ensuite
+    tracker.evaluate(actual_rows(rows, [200] * 20 + [100] * 20))
+
+    # Lignes jointes hors fenêtre retirées : les 7 derniers jours observés restent
+    assert tracker.forecasts['date'].min() == pd.Timestamp('2024-01-15')
+    summary = tracker.summary()
+    assert (summary['window_start'], summary['window_end']) == ('2024-01-15', '2024-01-21')
+    assert summary['models'][0]['samples'] == 14
+    assert summary['models'][0]['mape'] == 0
+
+
+def test_mape_and_bias():
+    tracker = AccuracyTracker()
+    rows = forecast_rows('2024-01-02', 2, predicted=110.0)
+    rows[1]['predicted_passengers'] = rows[3]['predicted_passengers'] = 90.0
+    tracker.add_forecast('Linear Regression', 1, '2024-01-01', rows)
+    # Valeur réelle nulle : exclue du MAPE, comptée dans le biais
+    tracker.evaluate(actual_rows(rows, [100, 100, 100, 0]))
+
+    model = tracker.summary()['models'][0]
+    assert model['samples'] == 4
+    assert model['mape'] == pytest.approx(0.1)
+    assert model['bias'] == pytest.approx((10 - 10 + 10 + 90) / 4)
+    assert model['bias_pct'] == pytest.approx(100 / 300)
+    routes = {(row['train_id'], row['horizon']): row for row in tracker.summary()['routes']}
+    assert routes[('T1', '1-7')]['mape'] == pytest.approx(0.1)
+    assert tracker.summary(model_type='XGBoost')['models'] == []
+
+
+@pytest.mark.parametrize('predicted, samples, drift', [
+    (125.0, 2, False),  # MAPE au seuil : pas de dérive
+    (130.0, 2, True),
+    (130.0, 1, False),  # Trop peu de lignes observées
+])
+def test_drift_threshold(monkeypatch, predicted, samples, drift):
+    monkeypatch.setattr(accuracy, 'DRIFT_MAPE_THRESHOLD', 0.25)
+    monkeypatch.setattr(accuracy, 'DRIFT_BIAS_THRESHOLD', 1.0)
+    monkeypatch.setattr(accuracy, 'ACCURACY_MIN_SAMPLES', 4)
+    tracker = AccuracyTracker()
+    rows = forecast_rows('2024-01-02', samples, predicted=predicted)
+    tracker.add_forecast('XGBoost', 1, '2024-01-01', rows)
+    tracker.evaluate(actual_rows(rows, 100))
+
+    model = tracker.summary()['models'][0]
+    assert model['drift'] is drift
+    assert model['drift_reasons'] == (['mape'] if drift else [])
+    assert tracker.drifting_models() == (['XGBoost'] if drift else [])
+
+
+def test_bias_drift(monkeypatch):
+    monkeypatch.setattr(accuracy, 'ACCURACY_MIN_SAMPLES', 4)
+    tracker = AccuracyTracker()
+    rows = forecast_rows('2024-01-02', 2, predicted=120.0)
+    tracker.add_forecast('Linear Regression', 1, '2024-01-01', rows)
+    tracker.evaluate(actual_rows(rows, 100))
+    assert tracker.summary()['models'][0]['drift_reasons'] == ['bias']
+
+
+def test_window_prunes_rows_never_observed():
+    tracker = AccuracyTracker(window_days=7)
+    rows = forecast_rows('2024-01-02', 20)
+    tracker.add_forecast('Linear Regression', 1, '2024-01-01', rows)
+    # T2 ne circule jamais : ses lignes n'auront pas de valeur réelle
+    observed = [row for row in rows if row['train_id'] == 'T1']
+    assert tracker.evaluate(actual_rows(observed, 100)) == 20
+
+    assert tracker.forecasts['date'].min() == pd.Timestamp('2024-01-15')
+    assert tracker.forecasts['actual'].isna().sum() == 7
+    # La fenêtre suit les dernières lignes jointes : une valeur observée sans prévision ne retire rien
+    tracker.add_forecast('Linear Regression', 2, '2024-01-21', forecast_rows('2024-01-22', 3))
+    assert tracker.evaluate(actual_rows(forecast_rows('2024-01-30', 1), [100, 100])) == 0
+    assert tracker.forecasts['date'].min() == pd.Timestamp('2024-01-15')
+    tracker.evaluate(actual_rows([row for row in forecast_rows('2024-01-22', 3) if row['train_id'] == 'T1'], 100))
+    # Fenêtre 18-24 janvier : T2 (en attente) retiré avec T1 (joint) avant le 18
+    assert tracker.forecasts['date'].min() == pd.Timestamp('2024-01-18')
+    assert len(tracker.forecasts) == 2 * 7
+
+
+def test_pending_rows_pruned_without_any_match():
+    tracker = AccuracyTracker(window_days=7)
+    tracker.add_forecast('XGBoost', 1, '2024-01-01', forecast_rows('2024-01-02', 10))
+    other = pd.DataFrame({'Date': ['2024-01-11'], 'Train_ID': ['T9'], 'Ville_Arrivee': ['Rabat'],
+                          'Nombre_Passagers': [50]})
+    assert tracker.evaluate(other) == 0
+    assert tracker.forecasts['date'].min() == pd.Timestamp('2024-01-05')
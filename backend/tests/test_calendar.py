@@ -0,0 +1,53 @@
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+from ingestion import IngestionPipeline, calendar_by_date
+
+EVENTS = pd.DataFrame({
+    # 2024-01-02 en double : la première ligne n'a pas d'événement, la seconde si
+    'Date': ['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-05'],
+    'Evenement_Present': [1, 0, 1, 1],
+    'Description_Evenement': ['Nouvel An', '', 'Match', 'Finale'],
+})
+HOLIDAYS = pd.DataFrame({
+    # Deux périodes qui se chevauchent les 4 et 5 janvier
+    'Date': ['2024-01-03', '2024-01-04'],
+    'Vacance': [3, 4],
+    'Titre_Vacances': ['Hiver', 'Régionales'],
+})
+
+
+def test_calendar_collapses_duplicate_dates():
+    calendar = calendar_by_date(EVENTS, HOLIDAYS)
+    day = calendar.loc['2024-01-02']
+    assert (day['event_present'], day['event_name']) == (1, 'Match')
+
+    assert calendar.loc['2024-01-03', ['vacance_present', 'vacance_duration', 'vacance_day']].tolist() == [1, 3, 1]
+    overlap = calendar.loc['2024-01-05']
+    assert overlap['vacance_name'] == 'Hiver | Régionales'
+    assert calendar.loc['2024-01-07', 'vacance_present'] == 1
+    assert '2024-01-08' not in calendar.index.strftime('%Y-%m-%d')
+    assert calendar_by_date(None, None).empty
+
+
+def test_training_and_forecast_features_agree():
+    import main
+
+    dates = pd.date_range('2024-01-01', '2024-01-08').strftime('%Y-%m-%d')
+    passengers = pd.DataFrame({'Date': pd.to_datetime(dates), 'Train_ID': 'T1',
+                               'Ville_Arrivee': 'Rabat', 'Nombre_Passagers': 100})
+    events = EVENTS.assign(Date=pd.to_datetime(EVENTS['Date']))
+    holidays = HOLIDAYS.assign(Date=pd.to_datetime(HOLIDAYS['Date']))
+    merged = IngestionPipeline().merge(passengers, events, holidays)
+
+    # Prévision des mêmes jours : dernière date d'entraînement la veille du premier jour
+    entry = {
+        'le_train': LabelEncoder().fit(['T1']), 'le_ville': LabelEncoder().fit(['Rabat']),
+        'train_ids': ['T1'], 'villes': ['Rabat'], 'last_date': pd.Timestamp('2023-12-31'),
+    }
+    grid, labels = main.build_forecast_grid(entry, len(dates), events, holidays)
+
+    assert grid['Evenement_Present'].tolist() == merged['Evenement_Present'].tolist()
+    assert grid['Vacance'].tolist() == merged['Vacance'].tolist()
+    assert list(labels['date']) == list(merged['Date'])
+    assert labels['event_present'].tolist() == [1, 1, 0, 0, 1, 0, 0, 0]
@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+from capacity import aggregate_plan, capacity_plan, normalize_capacity_table
+
+CAPACITY = normalize_capacity_table(pd.DataFrame({
+    'Train_ID': ['T1', 'T2', 'T3'], 'Places': [200, 200, 200], 'Voitures': [4, 4, 4],
+}))
+
+
+def predictions(demand_by_train, days=2, cities=('Rabat', 'Fes', 'Tanger')):
+    """Grille jours × trains × villes; demand_by_train[train] est répartie sur les villes"""
+    return pd.DataFrame([
+        {'date': day.strftime('%Y-%m-%d'), 'train_id': train, 'ville_arrivee': city,
+         'predicted_passengers': demand / len(cities)}
+        for day in pd.date_range('2024-01-01', periods=days)
+        for train, demand in demand_by_train.items() for city in cities
+    ])
+
+
+def test_demand_is_summed_per_train_and_day():
+    # T1 : 300 passagers répartis sur 3 villes (100 chacune, sous les 200 places prises une à une)
+    frame = predictions({'T1': 300, 'T2': 150, 'T3': 90})
+    plan = capacity_plan(frame, CAPACITY, target_load_factor=0.9)
+
+    assert len(plan) == 6
+    t1 = plan[plan['train_id'] == 'T1'].iloc[0]
+    assert (t1['demand'], t1['lines'], t1['load_factor']) == (300, 3, 1.5)
+    assert t1['over_capacity'] and t1['above_target']
+    # ceil(300 / 0.9) = 334 places, 134 de plus, voitures de 50 places
+    assert t1['extra_cars'] == 3
+    assert plan['over_capacity'].sum() == 2 and plan['extra_cars'].sum() == 6
+    assert not plan.loc[plan['train_id'] != 'T1', 'above_target'].any()
+
+
+def test_rollups_count_each_train_once_per_day():
+    frame = predictions({'T1': 300, 'T2': 150, 'T3': 90})
+    plan = capacity_plan(frame, CAPACITY, target_load_factor=0.9)
+    by_day, by_line = aggregate_plan(plan, frame)
+
+    day = by_day.iloc[0]
+    assert (day['places'], day['trains'], day['demand']) == (600, 3, pytest.approx(540))
+    assert (day['over_capacity'], day['extra_cars'], day['load_factor']) == (1, 3, 0.9)
+
+    line = by_line.set_index('ville_arrivee').loc['Rabat']
+    # Les trois trains desservent chaque ville, deux jours : 6 trains-jours, chacun une fois
+    assert (line['places'], line['trains'], line['over_capacity']) == (1200, 6, 2)
+    assert line['line_demand'] == pytest.approx(2 * 540 / 3)
+    assert line['demand'] == pytest.approx(2 * 540)
+
+
+def test_missing_capacity_and_partial_lines():
+    frame = predictions({'T1': 100, 'T9': 500}, days=1)
+    frame = frame[(frame['train_id'] == 'T1') | (frame['ville_arrivee'] == 'Fes')]
+    plan = capacity_plan(frame, CAPACITY)
+    t9 = plan.set_index('train_id').loc['T9']
+    assert t9['capacity_missing'] and not t9['over_capacity'] and t9['extra_cars'] == 0
+
+    by_day, by_line = aggregate_plan(plan, frame)
+    assert by_day.iloc[0][['places', 'covered_demand', 'capacity_missing']].tolist() == [200, 100, 1]
+    lines = by_line.set_index('ville_arrivee')
+    assert lines.loc['Rabat', 'trains'] == 1 and lines.loc['Fes', 'trains'] == 2
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import model_registry
+from compiled_models import compile_model
+from modeling import make_model, update_model
+
+FEATURES = ['Train_ID_encoded', 'Ville_Arrivée_encoded', 'day_of_year', 'month', 'day_of_week',
+            'Evenement_Present', 'Vacance']
+
+
+def feature_frame(n, seed):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'Train_ID_encoded': rng.integers(0, 12, n),
+        'Ville_Arrivée_encoded': rng.integers(0, 5, n),
+        'day_of_year': rng.integers(1, 366, n),
+        'month': rng.integers(1, 13, n),
+        'day_of_week': rng.integers(0, 7, n),
+        'Evenement_Present': rng.integers(0, 2, n),
+        'Vacance': rng.integers(0, 2, n),
+    })[FEATURES]
+    y = 100 + 10 * X['Train_ID_encoded'] + 40 * X['Evenement_Present'] + rng.normal(0, 5, n)
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def data():
+    return feature_frame(1500, 0), feature_frame(300, 1), feature_frame(500, 2)
+
+
+@pytest.mark.parametrize('model_type', ['Random Forest', 'XGBoost'])
+def test_compiled_trees_match_predict_exactly(model_type, data):
+    (X, y), _, (X_new, _) = data
+    model = make_model(model_type)
+    model.fit(X, y)
+
+    compiled = compile_model(model, model_type)
+    assert np.array_equal(compiled.predict(X_new.to_numpy(dtype=float)), model.predict(X_new))
+    # Une seule ligne (chemin faible latence)
+    assert np.array_equal(compiled.predict(X_new.to_numpy(dtype=float)[0]), model.predict(X_new.iloc[[0]]))
+
+
+@pytest.mark.parametrize('model_type', ['Random Forest', 'XGBoost'])
+def test_compiled_trees_match_after_incremental_update(model_type, data):
+    (X, y), (X_recent, y_recent), (X_new, _) = data
+    model = make_model(model_type)
+    model.fit(X, y)
+    before = model.predict(X_new)
+
+    updated, _ = update_model(model, model_type, X_recent, y_recent)
+    compiled = compile_model(updated, model_type)
+    assert np.array_equal(compiled.predict(X_new.to_numpy(dtype=float)), updated.predict(X_new))
+    # Le modèle d'origine n'est pas modifié par la mise à jour
+    assert np.array_equal(model.predict(X_new), before)
+
+
+@pytest.mark.parametrize('model_type', ['Random Forest', 'XGBoost', 'Linear Regression'])
+def test_registry_round_trip(model_type, data, tmp_path, monkeypatch):
+    (X, y), _, (X_new, _) = data
+    monkeypatch.setattr(model_registry, 'REGISTRY_DIR', str(tmp_path))
+    model = make_model(model_type)
+    model.fit(X, y)
+    compiled = compile_model(model, model_type)
+
+    path = model_registry.save_model(model_type, compiled, {'version': 3, 'train_classes': ['T1', 'T2']})
+    assert path.endswith('.npz')
+    loaded, metadata = model_registry.load_model(model_type)
+
+    assert metadata['version'] == 3 and metadata['kind'] == compiled.kind
+    assert metadata['train_classes'] == ['T1', 'T2']
+    assert np.array_equal(loaded.predict(X_new.to_numpy(dtype=float)),
+                          compiled.predict(X_new.to_numpy(dtype=float)))
+    assert [m['model_type'] for m in model_registry.list_models()] == [model_type]
+
+
+def test_registry_missing_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(model_registry, 'REGISTRY_DIR', str(tmp_path))
+    assert model_registry.load_model('XGBoost') is None
@@ -0,0 +1,82 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from data_quality import DataQualityError, PassengerValidator, check_mode
+
+
+def passengers():
+    # Lignes 1, 2, 3, 6 et 7 en erreur; 4 (décimale) et 5 (variante de ville) réparables
+    return pd.DataFrame({
+        'Date': pd.to_datetime(['2024-01-01', None, '2024-01-01', '2024-01-01', '2024-01-02',
+                                '2024-01-02', '2024-01-03', '2024-01-03', '2024-01-03']),
+        'Train_ID': ['T1', 'T1', 'T2', 'T1', 'T1', 'T2', 'T1', '', 'T2'],
+        'Ville_Arrivee': ['Casablanca', 'Casablanca', 'Fès', 'Casablanca', 'Casablanca',
+                          'casablanca', 'Casablanca', 'Fès', 'Casablanca'],
+        'Nombre_Passagers': [100, 80, -5, 100, 120.6, 90, 20000, 70, 95],
+    })
+
+
+def counts(report):
+    return {name: check['count'] for name, check in report['checks'].items() if check['count']}
+
+
+def test_reject_mode_refuses_upload():
+    validator = PassengerValidator('reject')
+    out = validator.validate(passengers())
+    assert len(out) == 9
+    with pytest.raises(DataQualityError) as excinfo:
+        validator.finish()
+
+    report = excinfo.value.report
+    assert counts(report) == {
+        'invalid_date': 1, 'missing_key': 1, 'negative_passengers': 1, 'absurd_passengers': 1,
+        'duplicate': 1, 'non_integer_passengers': 1, 'city_variant': 1,
+    }
+    assert [s['row'] for s in report['checks']['duplicate']['samples']] == [3]
+    # Remonte intacte depuis un worker du pool d'ingestion
+    assert pickle.loads(pickle.dumps(excinfo.value)).report == report
+
+
+def test_quarantine_mode_sets_error_rows_aside():
+    validator = PassengerValidator('quarantine')
+    out = validator.validate(passengers())
+    report = validator.finish()
+
+    assert out['Nombre_Passagers'].tolist() == [100, 120.6, 90, 95]
+    assert out['Ville_Arrivee'].tolist() == ['Casablanca', 'Casablanca', 'casablanca', 'Casablanca']
+    quarantined = validator.quarantined
+    assert quarantined['row'].tolist() == [1, 2, 3, 6, 7]
+    assert quarantined['reasons'].tolist() == [
+        'invalid_date', 'negative_passengers', 'duplicate', 'absurd_passengers', 'missing_key',
+    ]
+    assert (report['rows_in'], report['rows_out'], report['rows_quarantined'], report['rows_fixed']) == (9, 4, 5, 0)
+
+
+def test_fix_mode_repairs_rows():
+    validator = PassengerValidator('fix')
+    out = validator.validate(passengers())
+    report = validator.finish()
+
+    assert out['Nombre_Passagers'].tolist() == [100, 121, 90, 95]
+    assert out['Nombre_Passagers'].dtype == 'int64'
+    assert out['Ville_Arrivee'].tolist() == ['Casablanca', 'Casablanca', 'Casablanca', 'Casablanca']
+    # Les doublons sont supprimés sans passer par la quarantaine
+    assert validator.quarantined['row'].tolist() == [1, 2, 6, 7]
+    assert (report['rows_out'], report['rows_quarantined'], report['rows_fixed']) == (4, 4, 2)
+
+
+def test_duplicates_detected_across_chunks():
+    validator = PassengerValidator('quarantine')
+    frame = passengers().iloc[[0, 8]]
+    validator.validate(frame)
+    out = validator.validate(frame)
+    assert out.empty
+    assert validator.finish()['checks']['duplicate']['count'] == 2
+
+
+def test_unknown_mode():
+    assert check_mode(None) in ('reject', 'quarantine', 'fix')
+    with pytest.raises(ValueError):
+        PassengerValidator('drop')
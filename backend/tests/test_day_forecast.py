@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+import main
+from synthetic_data import generate_merged_dataset
+
+ROWS = [
+    {'date': '2024-01-01', 'train_id': 'T1', 'ville_arrivee': 'Rabat', 'predicted_passengers': 100},
+    {'date': '2024-01-01', 'train_id': 'T1', 'ville_arrivee': 'Fes', 'predicted_passengers': 50},
+    {'date': '2024-01-01', 'train_id': 'T2', 'ville_arrivee': 'Rabat', 'predicted_passengers': 30},
+    {'date': '2024-01-02', 'train_id': 'T1', 'ville_arrivee': 'Rabat', 'predicted_passengers': 80},
+    {'date': '2024-01-02', 'train_id': 'T2', 'ville_arrivee': 'Rabat', 'predicted_passengers': 40},
+]
+
+
+def test_summarize_forecast_days():
+    days = main.summarize_forecast_days(ROWS)
+    first = days['2024-01-01']
+    assert (first['total_passengers'], first['average_passengers'], first['rows']) == (180, 60, 3)
+    assert first['by_train'] == {'T1': 150, 'T2': 30}
+    assert first['by_city'] == {'Rabat': 130, 'Fes': 50}
+    assert main.summarize_forecast_days([]) == {}
+
+
+def test_average_covers_served_routes_only():
+    # T1 -> Fes ne circule pas : ni dans la moyenne, ni dans served_rows; le total le garde
+    routes = pd.MultiIndex.from_tuples([('T1', 'Rabat'), ('T2', 'Rabat')])
+    days = main.summarize_forecast_days(ROWS, routes)
+    assert days['2024-01-01']['average_passengers'] == 65
+    assert (days['2024-01-01']['served_rows'], days['2024-01-01']['total_passengers']) == (2, 180)
+    assert days['2024-01-02']['average_passengers'] == 60
+    unserved = main.summarize_forecast_days(ROWS, pd.MultiIndex.from_tuples([('T9', 'Oujda')]))
+    assert unserved['2024-01-01']['average_passengers'] is None
+
+
+@pytest.fixture
+def served(monkeypatch):
+    merged = generate_merged_dataset(2000, n_trains=3, n_cities=3)
+    entry = main.fit_model(merged, 'Linear Regression')
+    train, ville = str(entry['train_ids'][0]), str(entry['villes'][0])
+    history = merged[(merged['Train_ID'] != train) | (merged['Ville_Arrivee'] != ville)]
+    monkeypatch.setattr(main, 'merged_data', history)
+    monkeypatch.setattr(main, 'trained_models', {'Linear Regression': entry})
+    monkeypatch.setattr(main, 'published_forecasts', {})
+    monkeypatch.setattr(main, '_today_forecasts', {})
+    monkeypatch.setattr(main, 'evenements_df', None)
+    monkeypatch.setattr(main, 'vacances_df', None)
+    main.bump_data_version()
+    main.bump_calendar_version()
+    return entry, (train, ville)
+
+
+def test_day_forecast_from_model_matches_point_forecast(served):
+    entry, unserved = served
+    day = entry['last_date'] + pd.Timedelta(days=1)
+    forecast = main.day_forecast('Linear Regression', day.date())
+    assert forecast['source'] == 'model'
+
+    rows = main.generate_forecast(entry, 1)
+    # Grille 3 x 3 du modèle; chaque train ne dessert qu'une ville dans l'historique, moins le couple retiré
+    routes = set(zip(main.merged_data['Train_ID'], main.merged_data['Ville_Arrivee']))
+    assert unserved not in routes
+    served_values = [row['predicted_passengers'] for row in rows if (row['train_id'], row['ville_arrivee']) in routes]
+    assert forecast['rows'] == len(rows) == 9 and forecast['served_rows'] == len(served_values) == len(routes)
+    assert forecast['total_passengers'] == sum(row['predicted_passengers'] for row in rows)
+    assert forecast['average_passengers'] == round(sum(served_values) / len(served_values))
+    # Même jour, mêmes données : résumé repris du cache
+    assert main.day_forecast('Linear Regression', day.date()) is forecast
+
+
+def test_day_forecast_from_store(served, monkeypatch):
+    entry, _ = served
+    monkeypatch.setattr(main, 'published_forecasts', {'Linear Regression': {
+        'model_type': 'Linear Regression', 'model_version': 7, 'data_version': main.data_version,
+        'calendar_version': main.calendar_version, 'generated_at': '2024-01-01T02:00:00',
+        'daily': main.summarize_forecast_days(ROWS, main.observed_routes()),
+    }})
+    forecast = main.day_forecast('Linear Regression', pd.Timestamp('2024-01-01').date())
+    assert (forecast['source'], forecast['model_version'], forecast['stale']) == ('store', 7, False)
+    assert forecast['total_passengers'] == 180
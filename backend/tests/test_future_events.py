@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, 'merged_data', pd.DataFrame({
+        'Date': ['2024-01-01', '2024-01-02'], 'Train_ID': ['T1', 'T1'], 'Ville_Arrivee': ['Rabat', 'Rabat'],
+        'Nombre_Passagers': [100, 120], 'Evenement_Present': [0, 0], 'Vacance': [0, 0],
+    }))
+    monkeypatch.setattr(main, 'evenements_df', pd.DataFrame({
+        'Date': ['2024-01-10'], 'Evenement_Present': [1], 'Description_Evenement': ['Match'],
+    }))
+    monkeypatch.setattr(main, 'vacances_df', None)
+    main.bump_data_version()
+    return TestClient(main.app)
+
+
+def test_calendar_upload_invalidates_future_events_etag(client):
+    first = client.get('/future-events')
+    assert [event['description'] for event in first.json()['future_events']] == ['Match']
+    etag = first.headers['etag']
+    assert client.get('/future-events', headers={'If-None-Match': etag}).status_code == 304
+
+    # Nouveau fichier d'événements (upload-events) : même data_version, calendrier modifié
+    main.evenements_df = pd.DataFrame({
+        'Date': ['2024-01-10', '2024-01-12'], 'Evenement_Present': [1, 1], 'Description_Evenement': ['Match', 'Finale'],
+    })
+    main.bump_calendar_version()
+    second = client.get('/future-events', headers={'If-None-Match': etag})
+    assert second.status_code == 200 and second.headers['etag'] != etag
+    assert [event['description'] for event in second.json()['future_events']] == ['Match', 'Finale']
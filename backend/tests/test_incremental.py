@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+from modeling import INCREMENTAL_ROUNDS, INCREMENTAL_TREES, linear_sufficient_stats, update_model
+from synthetic_data import generate_merged_dataset
+
+MERGED = generate_merged_dataset(2000, n_trains=4, n_cities=3)
+SPLIT_DATE = '2023-03-01'
+PROBE = pd.DataFrame(np.ones((3, len(main.FEATURE_COLUMNS))), columns=main.FEATURE_COLUMNS)
+
+
+@pytest.fixture(scope='module', params=['Linear Regression', 'Random Forest', 'XGBoost'])
+def trained(request):
+    old = MERGED[MERGED['Date'] < SPLIT_DATE]
+    return request.param, main.fit_model(old, request.param, interval_level=0.8)
+
+
+def test_update_learns_new_days_on_a_copy(trained):
+    model_type, entry = trained
+    model = entry['model']
+    before = model.predict(PROBE)
+
+    updated = main.update_trained_model(entry, MERGED, model_type)
+
+    assert updated['model'] is not model and updated['updates'] == 1
+    assert updated['last_date'] == pd.Timestamp(MERGED['Date'].max())
+    assert updated['compiled'] is None
+    # Intervalles : résidus du modèle sur les nouveaux jours, pas ceux de l'évaluation initiale
+    assert not np.array_equal(updated['residual_quantiles'], entry['residual_quantiles'])
+    assert updated['mse'] != entry['mse']
+    assert np.array_equal(model.predict(PROBE), before)
+
+    if model_type == 'Random Forest':
+        assert len(updated['model'].estimators_) == len(model.estimators_) + INCREMENTAL_TREES
+    elif model_type == 'XGBoost':
+        rounds = updated['model'].get_booster().num_boosted_rounds()
+        assert rounds == model.get_booster().num_boosted_rounds() + INCREMENTAL_ROUNDS
+        assert updated['quantile_model'] is not entry['quantile_model']
+    else:
+        assert updated['sufficient_stats']['n'] == entry['sufficient_stats']['n'] + (MERGED['Date'] >= SPLIT_DATE).sum()
+
+
+def test_no_new_day_forces_full_retrain(trained):
+    model_type, entry = trained
+    # Lignes anciennes modifiées (edit-row, delete-row, nouvel upload) sans jour postérieur
+    edited = MERGED[MERGED['Date'] < SPLIT_DATE].assign(Nombre_Passagers=lambda d: d['Nombre_Passagers'] + 50)
+    assert main.update_trained_model(entry, edited, model_type) is None
+
+
+def test_unseen_train_forces_full_retrain(trained):
+    model_type, entry = trained
+    new_rows = MERGED[MERGED['Date'] >= SPLIT_DATE].assign(Train_ID='T999')
+    assert main.update_trained_model(entry, pd.concat([MERGED, new_rows]), model_type) is None
+
+
+def test_linear_update_matches_full_fit():
+    from sklearn.linear_model import LinearRegression
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 5))
+    y = X @ np.array([1.0, -2.0, 0.5, 3.0, 0.0]) + 4 + rng.normal(0, 0.1, 400)
+    model = LinearRegression().fit(X[:300], y[:300])
+
+    updated, stats = update_model(model, 'Linear Regression', X[300:], y[300:], linear_sufficient_stats(X[:300], y[:300]))
+    full = LinearRegression().fit(X, y)
+    assert np.allclose(updated.coef_, full.coef_) and np.isclose(updated.intercept_, full.intercept_)
+    assert stats['n'] == 400
+    with pytest.raises(ValueError):
+        update_model(model, 'Linear Regression', X, y)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingestion import IngestionPipeline, parse_dates
+from upload_cache import UploadCache
+
+
+def test_parse_dates_mixed_formats():
+    values = ['2024-01-15', '15/01/2024', '2024/01/15', '15-01-2024', '2024-01-15 08:00',
+              '15/01/2024T08:00', ' 2024-1-15 ', 'du 15/01/2024 au 18/01/2024']
+    assert (parse_dates(values) == pd.Timestamp('2024-01-15')).all()
+
+
+def test_parse_dates_day_first():
+    parsed = parse_dates(['03/04/2024', '13/04/2024', '04/13/2024', '1/2/2024'])
+    assert parsed.tolist() == [pd.Timestamp('2024-04-03'), pd.Timestamp('2024-04-13'),
+                               pd.Timestamp('2024-04-13'), pd.Timestamp('2024-02-01')]
+
+
+def test_parse_dates_invalid_values_give_nat():
+    parsed = parse_dates(['bad', '2024-02-30', None, np.nan, '', '2024-01-15', '9999-01-01'])
+    assert parsed.isna().tolist() == [True, True, True, True, True, False, True]
+    assert parsed.dtype == 'datetime64[ns]'
+
+
+def test_parse_dates_keeps_index_and_datetime_input():
+    series = pd.Series(['15/01/2024', '15/01/2024', '16/01/2024'], index=[10, 11, 12])
+    parsed = parse_dates(series)
+    assert parsed.index.tolist() == [10, 11, 12]
+    assert parsed.dt.day.tolist() == [15, 15, 16]
+    dates = pd.Series(pd.date_range('2024-01-01', periods=3))
+    assert parse_dates(dates).equals(dates.astype('datetime64[ns]'))
+
+
+HEADER = b'Date,Train_ID,Ville_Arrivee,Nombre_Passagers\n'
+
+
+@pytest.mark.parametrize('chunk_rows', [None, 2])
+def test_header_only_upload_gives_empty_frame(tmp_path, chunk_rows):
+    pipeline = IngestionPipeline(chunk_rows=chunk_rows, cache=UploadCache(str(tmp_path)))
+    for status in ('miss', 'hit'):
+        passengers, report, _ = pipeline.load_passengers(HEADER, 'header-only')
+        assert pipeline.cache_status['passengers'] == status
+        assert passengers.empty and list(passengers.columns) == ['Date', 'Train_ID', 'Ville_Arrivee', 'Nombre_Passagers']
+        assert report['rows_in'] == 0
+    events, _ = pipeline.load_side_table(b'Date,Evenement_Present\n', 'events', 'events-header-only')
+    assert events.empty and 'Evenement_Present' in events.columns
+
+
+def test_empty_upload_raises_value_error(tmp_path):
+    pipeline = IngestionPipeline(chunk_rows=2, cache=UploadCache(str(tmp_path)))
+    with pytest.raises(ValueError, match='Fichier vide'):
+        pipeline.load_passengers(b'', 'empty')
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modeling import quantile_bounds, residual_interval, residual_quantiles
+from synthetic_data import generate_merged_dataset
+
+
+def test_quantile_bounds():
+    assert quantile_bounds(0.8) == pytest.approx((0.1, 0.9))
+    with pytest.raises(ValueError):
+        quantile_bounds(1.0)
+
+
+def test_residual_interval_coverage():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 10, 4000)
+    y = 3 * x + rng.normal(0, 2, len(x))
+    point = 3 * x
+    quantiles = residual_quantiles(y[:2000], point[:2000])
+
+    lower, upper = residual_interval(point[2000:], quantiles, 0.8)
+    covered = ((y[2000:] >= lower) & (y[2000:] <= upper)).mean()
+    assert 0.75 <= covered <= 0.85
+    assert (lower <= point[2000:]).all() and (point[2000:] <= upper).all()
+
+
+@pytest.mark.parametrize('model_type', ['Linear Regression', 'Random Forest', 'XGBoost'])
+def test_forecast_interval_contains_point(model_type):
+    import main
+
+    merged = generate_merged_dataset(3000, n_trains=5, n_cities=3)
+    entry = main.fit_model(merged, model_type, interval_level=0.8)
+    predictions = main.generate_forecast(entry, 14, interval_level=0.8)
+
+    assert len(predictions) == 14 * len(entry['train_ids']) * len(entry['villes'])
+    for prediction in predictions:
+        assert 0 <= prediction['predicted_lower'] <= prediction['predicted_passengers'] <= prediction['predicted_upper']
+
+
+def test_forecast_interval_coverage_on_holdout():
+    import main
+
+    merged = generate_merged_dataset(6000, n_trains=5, n_cities=3)
+    merged['Date'] = pd.to_datetime(merged['Date'])
+    cutoff = merged['Date'].sort_values().iloc[int(len(merged) * 0.8)]
+    entry = main.fit_model(merged[merged['Date'] < cutoff], 'Linear Regression')
+    holdout = merged[merged['Date'] >= cutoff]
+
+    grid = holdout.assign(
+        Train_ID_encoded=entry['le_train'].transform(holdout['Train_ID']),
+        **{'Ville_Arrivée_encoded': entry['le_ville'].transform(holdout['Ville_Arrivee'])},
+        day_of_year=holdout['Date'].dt.dayofyear, month=holdout['Date'].dt.month,
+        day_of_week=holdout['Date'].dt.dayofweek,
+    )[main.FEATURE_COLUMNS]
+    point = entry['model'].predict(grid)
+    lower, upper = main.forecast_interval(entry, grid, point, 0.8)
+
+    actual = holdout['Nombre_Passagers'].to_numpy()
+    covered = ((actual >= lower) & (actual <= upper)).mean()
+    assert covered >= 0.65
@@ -0,0 +1,82 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import modeling
+from modeling import fit_partitioned, make_model, partition_keys
+
+COLUMNS = ['Train_ID_encoded', 'Ville_Arrivée_encoded', 'day_of_year', 'month', 'day_of_week',
+           'Evenement_Present', 'Vacance']
+
+
+def features(rows, trains=3, cities=4, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'Train_ID_encoded': rng.integers(0, trains, rows),
+        'Ville_Arrivée_encoded': rng.integers(0, cities, rows),
+        'day_of_year': rng.integers(1, 366, rows),
+        'month': rng.integers(1, 13, rows),
+        'day_of_week': rng.integers(0, 7, rows),
+        'Evenement_Present': rng.integers(0, 2, rows),
+        'Vacance': rng.integers(0, 2, rows),
+    })[COLUMNS]
+    # Chaque ville a sa propre pente : un modèle par ville la retrouve exactement
+    y = pd.Series(100 + 10 * X['Ville_Arrivée_encoded'] * X['day_of_week'] + 5 * X['Evenement_Present'], dtype=float)
+    return X, y
+
+
+def test_rows_are_routed_to_their_partition():
+    X, y = features(600)
+    model = fit_partitioned(X, y, 'Linear Regression', 'city', min_partition_rows=50)
+    assert model.n_partitions == 4
+
+    predicted = model.predict(X)
+    for city, city_model in model.models.items():
+        rows = (X['Ville_Arrivée_encoded'] == city).to_numpy()
+        assert np.allclose(predicted[rows], city_model.predict(X[rows]))
+    assert np.allclose(predicted, y)
+
+
+def test_route_keys():
+    X, _ = features(10)
+    keys = partition_keys(X, 'route')
+    assert (keys == X['Train_ID_encoded'] * 1_000_000 + X['Ville_Arrivée_encoded']).all()
+    assert (partition_keys(X, 'city') == X['Ville_Arrivée_encoded']).all()
+
+
+def test_small_and_unseen_partitions_use_fallback():
+    X, y = features(400, cities=3)
+    # Ville 3 : 20 lignes seulement, sous min_partition_rows
+    small_X, small_y = features(20, cities=1, seed=1)
+    small_X['Ville_Arrivée_encoded'] = 3
+    X, y = pd.concat([X, small_X], ignore_index=True), pd.concat([y, small_y], ignore_index=True)
+    model = fit_partitioned(X, y, 'Linear Regression', 'city', min_partition_rows=50)
+    assert sorted(model.models) == [0, 1, 2]
+
+    fallback = make_model('Linear Regression').fit(X, y)
+    probe, _ = features(30, cities=1, seed=2)
+    for city in (3, 7):  # trop petite, jamais vue
+        probe['Ville_Arrivée_encoded'] = city
+        assert np.allclose(model.predict(probe), fallback.predict(probe))
+
+
+@pytest.mark.parametrize('model_type', ['Linear Regression', 'Random Forest'])
+def test_parallel_matches_serial(model_type, monkeypatch):
+    monkeypatch.setattr(modeling, 'PARALLEL_MIN_ROWS', 100)
+    X, y = features(800)
+    serial = fit_partitioned(X, y, model_type, 'route', min_partition_rows=40)
+    with ProcessPoolExecutor(max_workers=2, mp_context=get_context('spawn')) as executor:
+        parallel = fit_partitioned(X, y, model_type, 'route', min_partition_rows=40, executor=executor)
+
+    assert sorted(parallel.models) == sorted(serial.models)
+    probe, _ = features(200, seed=3)
+    assert np.array_equal(parallel.predict(probe), serial.predict(probe))
+
+
+def test_invalid_partition_mode():
+    X, y = features(50)
+    with pytest.raises(ValueError):
+        fit_partitioned(X, y, 'Linear Regression', 'train')
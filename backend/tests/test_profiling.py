@@ -0,0 +1,40 @@
+import io
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from profiling import get_profile
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for name in ('merged_data', 'passengers_df', 'evenements_df', 'vacances_df', 'quarantined_rows'):
+        monkeypatch.setattr(main, name, None)
+    monkeypatch.setattr(main, 'data_quality_reports', {})
+    return TestClient(main.app)
+
+
+def csv_file(frame):
+    return io.BytesIO(frame.to_csv(index=False).encode())
+
+
+def test_synthetic_load_disabled_by_default(client, monkeypatch):
+    assert client.post('/debug/synthetic-load?rows=100').status_code == 404
+    monkeypatch.setattr(main, 'DEBUG_ENDPOINTS', True)
+    response = client.post('/debug/synthetic-load?rows=200&model_type=Linear Regression&days_to_predict=2')
+    assert response.status_code == 200 and response.json()['profile_id']
+
+
+def test_profiled_upload_includes_ingestion_thread(client):
+    passengers = pd.DataFrame({'Date': ['2024-01-01', '2024-01-02'], 'Train_ID': ['T1', 'T1'],
+                               'Ville_Arrivee': ['Rabat', 'Rabat'], 'Nombre_Passagers': [100, 120]})
+    response = client.post('/upload-passengers?profile=1',
+                           files={'passengers_file': ('passengers.csv', csv_file(passengers), 'text/csv')})
+    assert response.status_code == 200
+    assert response.json()['passengers_count'] == 2
+
+    # Les étapes exécutées dans le pool de threads figurent dans le profil de la requête
+    functions = {name for _, _, name in get_profile(response.json()['profile_id']).stats_data}
+    assert {'load_passengers', 'parse_dates'} <= functions
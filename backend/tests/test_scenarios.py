@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from synthetic_data import generate_merged_dataset
+
+DAYS = 7
+
+
+@pytest.fixture(scope='module')
+def entry():
+    return main.fit_model(generate_merged_dataset(2000, n_trains=4, n_cities=3), 'Random Forest')
+
+
+@pytest.fixture
+def client(entry, monkeypatch):
+    monkeypatch.setattr(main, 'trained_models', {'Random Forest': entry})
+    monkeypatch.setattr(main, 'evenements_df', None)
+    monkeypatch.setattr(main, 'vacances_df', None)
+    # Sans `with` : le lifespan (données d'exemple, planificateur) n'est pas lancé
+    return TestClient(main.app)
+
+
+def scenario_request(*scenarios, model_type='Random Forest'):
+    return {'model_type': model_type, 'days_to_predict': DAYS, 'scenarios': list(scenarios)}
+
+
+def test_scenarios_against_base_forecast(client, entry):
+    first_day = (entry['last_date'] + timedelta(days=1)).strftime('%Y-%m-%d')
+    third_day = (entry['last_date'] + timedelta(days=3)).strftime('%Y-%m-%d')
+    train = str(entry['train_ids'][0])
+    response = client.post('/scenarios', json=scenario_request(
+        {'name': 'match', 'overrides': [{'date': first_day, 'end_date': third_day, 'train_id': train,
+                                         'event_present': 1, 'vacance_present': 1}]},
+        {'name': 'rien', 'overrides': []},
+    ))
+    assert response.status_code == 200
+    body = response.json()
+
+    base = main.generate_forecast(entry, DAYS)
+    assert body['base_total_passengers'] == sum(row['predicted_passengers'] for row in base)
+    assert body['model_version'] == entry.get('version')
+
+    match, nothing = body['scenarios']
+    # 3 jours x toutes les villes du seul train ciblé
+    assert match['affected_rows'] == 3 * len(entry['villes'])
+    assert {change['train_id'] for change in match['changes']} == {train}
+    assert all(change['event_present'] == 1 and change['vacance_present'] == 1 for change in match['changes'])
+    assert match['delta_total'] == sum(day['delta'] for day in match['by_day'])
+    assert match['delta_total'] == sum(change['delta'] for change in match['changes'])
+    assert match['total_passengers'] == body['base_total_passengers'] + match['delta_total']
+    assert len(match['by_day']) == DAYS and {route['train_id'] for route in match['by_route']} == {train}
+    assert (nothing['affected_rows'], nothing['delta_total'], nothing['changes']) == (0, 0, [])
+
+
+@pytest.mark.parametrize('payload, detail', [
+    (scenario_request({'name': 'x', 'overrides': []}, model_type='XGBoost'), 'not trained'),
+    (scenario_request(), 'scenarios expected'),
+    (scenario_request({'name': 'x', 'overrides': [{'date': '15/05/2023', 'event_present': 1}]}), 'Invalid date'),
+])
+def test_scenarios_rejects_invalid_requests(client, payload, detail):
+    response = client.post('/scenarios', json=payload)
+    assert response.status_code == 400
+    assert detail in response.json()['detail']
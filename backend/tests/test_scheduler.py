@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+
+from scheduler import CronSchedule
+
+# Vendredi 15 mars 2024, 23:59:30
+NOW = datetime(2024, 3, 15, 23, 59, 30)
+
+
+def next_runs(expression, moment=NOW, count=3):
+    schedule, runs = CronSchedule(expression), []
+    for _ in range(count):
+        moment = schedule.next_after(moment)
+        runs.append(moment)
+    return runs
+
+
+def test_daily_job_rolls_over_to_next_day():
+    assert next_runs('0 2 * * *', count=2) == [datetime(2024, 3, 16, 2, 0), datetime(2024, 3, 17, 2, 0)]
+    # Échéance exacte : la suivante, jamais la même minute
+    assert CronSchedule('0 2 * * *').next_after(datetime(2024, 3, 16, 2, 0)) == datetime(2024, 3, 17, 2, 0)
+
+
+def test_month_and_year_rollover():
+    assert CronSchedule('30 1 1 * *').next_after(NOW) == datetime(2024, 4, 1, 1, 30)
+    assert CronSchedule('0 0 1 1 *').next_after(NOW) == datetime(2025, 1, 1, 0, 0)
+    assert CronSchedule('0 12 29 2 *').next_after(NOW) == datetime(2028, 2, 29, 12, 0)
+
+
+def test_step_fields():
+    assert next_runs('*/15 * * * *') == [datetime(2024, 3, 16, 0, 0), datetime(2024, 3, 16, 0, 15),
+                                         datetime(2024, 3, 16, 0, 30)]
+    assert next_runs('0 8-18/5 * * *') == [datetime(2024, 3, 16, 8, 0), datetime(2024, 3, 16, 13, 0),
+                                           datetime(2024, 3, 16, 18, 0)]
+
+
+def test_range_and_list_fields():
+    # Jours ouvrés (lundi-vendredi) : le samedi et le dimanche sont sautés
+    assert next_runs('0 6 * * 1-5', count=2) == [datetime(2024, 3, 18, 6, 0), datetime(2024, 3, 19, 6, 0)]
+    assert next_runs('10,40 9 * * *', count=3) == [datetime(2024, 3, 16, 9, 10), datetime(2024, 3, 16, 9, 40),
+                                                  datetime(2024, 3, 17, 9, 10)]
+    # Dimanche = 0
+    assert CronSchedule('0 0 * * 0').next_after(NOW) == datetime(2024, 3, 17, 0, 0)
+
+
+def test_day_of_month_or_day_of_week():
+    # Comme cron : le 20 du mois OU le lundi
+    assert next_runs('0 0 20 * 1', count=3) == [datetime(2024, 3, 18, 0, 0), datetime(2024, 3, 20, 0, 0),
+                                              datetime(2024, 3, 25, 0, 0)]
+
+
+@pytest.mark.parametrize('expression', [
+    '0 2 * *', '0 2 * * * *', '60 * * * *', '0 24 * * *', '0 0 0 * *', '0 0 * 13 *', '0 0 * * 7',
+    '5-1 * * * *', '*/0 * * * *', 'a * * * *', '1- * * * *', ',5 * * * *', '',
+])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_impossible_date_has_no_next_run():
+    with pytest.raises(ValueError, match='Aucune échéance'):
+        CronSchedule('0 0 31 2 *').next_after(NOW)
@@ -0,0 +1,93 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+EVENTS = pd.DataFrame({'Date': ['2024-01-02'], 'Evenement_Present': [1], 'Description_Evenement': ['Match']})
+HOLIDAYS = pd.DataFrame({'Date': ['2024-01-04'], 'Vacance': [1], 'Titre_Vacances': ['Pont']})
+
+# Lignes du fichier : date, train, ville, surcharge événement, surcharge vacance ('' = pas de surcharge)
+ROWS = [
+    ('2024-01-02', 'T0', 'Paris', '', ''),    # calendrier : événement
+    ('2024-01-02', 'T0', 'Paris', '0', ''),   # événement du calendrier annulé
+    ('2024-01-03', 'T1', 'Paris', '1', '1'),  # jour sans rien : les deux forcés
+    ('2024-01-04', 'T1', 'Lyon', '', '0'),    # vacance du calendrier annulée
+    ('2024-01-04', 'T1', 'Lyon', '', ''),     # calendrier : vacance
+    ('pas une date', 'T0', 'Paris', '1', ''),
+]
+
+
+@pytest.fixture
+def scorer(monkeypatch):
+    monkeypatch.setattr(main, 'evenements_df', EVENTS)
+    monkeypatch.setattr(main, 'vacances_df', HOLIDAYS)
+    monkeypatch.setattr(main, 'calendar_version', main.calendar_version + 1)
+    # Calendrier en cache remis à son état d'origine après le test
+    monkeypatch.setattr(main, '_calendar_table', (None, None))
+    scorer = {
+        'key': ('test', 1),
+        'version': 7,
+        # Prédiction lisible : 1000 x événement + 100 x vacance + train
+        'predict': lambda X: 1000 * X[:, 5] + 100 * X[:, 6] + X[:, 0],
+        'train_codes': {'T0': 0, 'T1': 1},
+        'ville_codes': {'Paris': 0, 'Lyon': 1},
+    }
+    monkeypatch.setattr(main, 'point_scorer', lambda model_type: scorer if model_type == 'Random Forest' else None)
+    return scorer
+
+
+def rows_csv(rows):
+    lines = ['Date,Train_ID,Ville_Arrivee,Evenement_Present,Vacance'] + [','.join(row) for row in rows]
+    return '\n'.join(lines) + '\n'
+
+
+def test_score_chunk_applies_overrides_over_calendar(scorer):
+    chunk = pd.read_csv(io.StringIO(rows_csv(ROWS)), dtype={'Train_ID': str, 'Ville_Arrivee': str})
+    scored = main.score_chunk(scorer, chunk)
+
+    assert scored['event_present'].tolist()[:5] == [1, 0, 1, 0, 0]
+    assert scored['vacance_present'].tolist()[:5] == [0, 0, 1, 0, 1]
+    assert scored['predicted_passengers'].tolist()[:5] == [1000, 0, 1101, 1, 101]
+    # Date invalide : prédiction vide, la date d'origine est conservée
+    assert pd.isna(scored['predicted_passengers'].iloc[5])
+    assert scored['date'].iloc[5] == 'pas une date'
+
+
+def test_score_chunk_without_override_columns_reads_calendar(scorer):
+    chunk = pd.DataFrame({'Date': ['2024-01-02', '2024-01-04'], 'Train_ID': ['T0', 'T9'], 'Ville_Arrivee': 'Paris'})
+    scored = main.score_chunk(scorer, chunk)
+
+    assert (scored['event_present'].tolist(), scored['vacance_present'].tolist()) == ([1, 0], [0, 1])
+    # Train inconnu : moyenne sur T0 et T1
+    assert scored['predicted_passengers'].tolist() == [1000, 100]
+    assert scored['fallback'].tolist() == [False, True]
+
+
+def test_score_batch_streams_overrides(scorer):
+    client = TestClient(main.app)
+    response = client.post('/score-batch', params={'model_type': 'Random Forest'},
+                           files={'file': ('rows.csv', rows_csv(ROWS), 'text/csv')})
+    assert response.status_code == 200
+    assert response.headers['X-Model-Version'] == '7'
+
+    scored = pd.read_csv(io.StringIO(response.text))
+    assert len(scored) == len(ROWS)
+    assert scored['event_present'].tolist()[:5] == [1, 0, 1, 0, 0]
+    assert scored['vacance_present'].tolist()[:5] == [0, 0, 1, 0, 1]
+    assert scored['predicted_passengers'].iloc[:5].astype(np.int64).tolist() == [1000, 0, 1101, 1, 101]
+    assert np.isnan(scored['predicted_passengers'].iloc[5])
+
+
+@pytest.mark.parametrize('model_type, content, status', [
+    ('XGBoost', rows_csv(ROWS), 404),
+    ('Random Forest', 'Date,Train_ID\n2024-01-02,T0\n', 400),
+])
+def test_score_batch_rejects_invalid_requests(scorer, model_type, content, status):
+    client = TestClient(main.app)
+    response = client.post('/score-batch', params={'model_type': model_type},
+                           files={'file': ('rows.csv', content, 'text/csv')})
+    assert response.status_code == status
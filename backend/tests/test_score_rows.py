@@ -0,0 +1,43 @@
+import numpy as np
+
+import main
+
+
+def fake_scorer():
+    # Prédiction lisible : 100 x train + 10 x ville + jour de l'année
+    return {
+        'predict': lambda X: 100 * X[:, 0] + 10 * X[:, 1] + X[:, 2],
+        'train_codes': {'T0': 0, 'T1': 1, 'T2': 2},
+        'ville_codes': {'Paris': 0, 'Lyon': 1},
+    }
+
+
+def score(scorer, train_codes, ville_codes, day_of_year):
+    n = len(train_codes)
+    zeros = np.zeros(n, dtype=np.int64)
+    return main.score_rows(scorer, train_codes, ville_codes, day_of_year, zeros + 1, zeros, zeros, zeros)
+
+
+def test_score_rows_known_codes_one_prediction_per_row():
+    values = score(fake_scorer(), [0, 2, 1], [1, 0, 1], [5, 6, 7])
+    assert values.tolist() == [15, 206, 117]
+
+
+def test_score_rows_averages_unseen_categories():
+    scorer = fake_scorer()
+    values = score(scorer, [1, -1, 2, -1, 0], [0, 1, -1, -1, 1], [3, 4, 5, 6, 7])
+    assert values.tolist() == [
+        103,                                # connus
+        (14 + 114 + 214) / 3,               # train inconnu : moyenne sur T0..T2, ville Lyon
+        (205 + 215) / 2,                    # ville inconnue : moyenne sur Paris et Lyon, train T2
+        np.mean([6, 16, 106, 116, 206, 216]),  # deux inconnus : moyenne sur toute la grille
+        17,                                 # connus, après les blocs développés
+    ]
+
+
+def test_score_rows_fallback_matches_known_predictions():
+    scorer = fake_scorer()
+    days = np.array([40, 41])
+    # Chaque ligne inconnue vaut la moyenne des mêmes lignes scorées avec chaque code connu
+    expected = np.mean([score(scorer, [train] * 2, [1, 0], days) for train in range(3)], axis=0)
+    assert np.allclose(score(scorer, [-1, -1], [1, 0], days), expected)
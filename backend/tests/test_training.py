@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from synthetic_data import generate_merged_dataset
+
+
+@pytest.fixture
+def main(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, 'merged_data', generate_merged_dataset(2000, n_trains=4, n_cities=3))
+    monkeypatch.setattr(main, 'trained_models', {})
+    monkeypatch.setattr(main, 'prediction_history', [])
+    monkeypatch.setattr(main, '_forecast_cache', {})
+    main.bump_data_version()
+    return main
+
+
+def test_stream_publishes_model_after_training(main, monkeypatch):
+    fit_model = main.fit_model
+
+    def checked_fit(*args, **kwargs):
+        assert main.training_lock.locked()
+        assert 'Linear Regression' not in main.trained_models
+        return fit_model(*args, **kwargs)
+
+    monkeypatch.setattr(main, 'fit_model', checked_fit)
+    events = []
+    main.stream_training(main.PredictionRequest(model_type='Linear Regression', days_to_predict=2),
+                         lambda event, data: events.append((event, data)))
+
+    entry = main.trained_models['Linear Regression']
+    assert entry['data_version'] == main.data_version
+    assert not main.training_lock.locked()
+    names = [event for event, _ in events]
+    assert 'queued' not in [data.get('stage') for _, data in events]
+    assert names.index('model') > names.index('stage') and names[-1] == 'done'
+
+
+def test_stream_waits_for_running_training(main):
+    events, started = [], threading.Event()
+
+    def emit(event, data):
+        events.append((event, data))
+        started.set()
+
+    request = main.PredictionRequest(model_type='Linear Regression', days_to_predict=2)
+    with main.training_lock:
+        worker = threading.Thread(target=main.stream_training, args=(request, emit))
+        worker.start()
+        assert started.wait(5)
+        assert events == [('stage', {'stage': 'queued', 'status': 'started'})]
+        assert 'Linear Regression' not in main.trained_models
+    worker.join(60)
+
+    assert not worker.is_alive()
+    assert events[-1][0] == 'done'
+    assert 'Linear Regression' in main.trained_models
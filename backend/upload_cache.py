@@ -0,0 +1,104 @@
+"""
+Cache des fichiers uploadés, adressé par contenu.
+
+Chaque fichier est haché (SHA-256) pendant sa lecture; le résultat des étapes
+decode → parse → normalize du pipeline d'ingestion est conservé en Parquet
+sous `<version>-<empreinte>.parquet`. Un fichier déjà vu (même contenu, quel que
+soit son nom) n'est plus ni décodé ni parsé : seul le hachage est payé. Les
+entrées les moins récemment utilisées sont supprimées au-delà de
+`UPLOAD_CACHE_MAX_BYTES`.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+
+import pandas as pd
+
+from metrics import record_cache, stage_timer
+
+logger = logging.getLogger("oncf")
+
+UPLOAD_CACHE_DIR = os.getenv(
+    'UPLOAD_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'upload_cache'),
+)
+UPLOAD_CACHE_MAX_BYTES = int(os.getenv('UPLOAD_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# À incrémenter quand le parsing ou la normalisation change : les anciennes entrées sont ignorées
+CACHE_VERSION = 'v1'
+READ_CHUNK_BYTES = 1 << 20
+# Colonne qui conserve les dates brutes (avant parsing) pour les rapports de qualité
+RAW_DATE_COLUMN = '__raw_date'
+
+
+async def read_upload(upload_file, chunk_size=READ_CHUNK_BYTES):
+    """Lit un UploadFile par blocs en calculant son empreinte : (contenu, empreinte hexadécimale)"""
+    digest = hashlib.sha256()
+    parts = []
+    while True:
+        block = await upload_file.read(chunk_size)
+        if not block:
+            break
+        with stage_timer('hash'):
+            digest.update(block)
+        parts.append(block)
+    return b''.join(parts), digest.hexdigest()
+
+
+class UploadCache:
+    """Frames parsées et normalisées, indexées par l'empreinte du fichier d'origine"""
+
+    def __init__(self, directory=UPLOAD_CACHE_DIR, max_bytes=UPLOAD_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, digest):
+        return os.path.join(self.directory, f'{CACHE_VERSION}-{digest}.parquet')
+
+    def get(self, digest):
+        """Renvoie (frame normalisée, dates brutes) ou None"""
+        path = self.path(digest)
+        try:
+            frame = pd.read_parquet(path)
+            os.utime(path)  # Dernière utilisation, pour l'éviction LRU
+        except (OSError, ValueError) as e:
+            if os.path.exists(path):
+                logger.warning("⚠️ Entrée de cache illisible path=%s error=%s", path, e)
+            record_cache('upload', False)
+            return None
+        record_cache('upload', True)
+        raw_dates = frame.pop(RAW_DATE_COLUMN)
+        return frame, raw_dates
+
+    def put(self, digest, frame, raw_dates):
+        """Écrit atomiquement l'entrée; un échec d'écriture n'interrompt pas l'upload"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.parquet.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    frame.assign(**{RAW_DATE_COLUMN: raw_dates.to_numpy()}).to_parquet(f, index=False)
+                os.replace(tmp_path, self.path(digest))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self.evict()
+        except (OSError, ValueError, TypeError) as e:
+            # Colonnes non sérialisables en Parquet (types mélangés) ou disque plein
+            logger.warning("⚠️ Cache d'upload non écrit digest=%s error=%s", digest[:12], e)
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.parquet'):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.unlink(path)
+            total -= size
@@ -274,7 +274,10 @@ function DashboardPage({ predictionHistory }) {
                 flexShrink: 0
               }}></div>
               <span style={{ fontSize: '1.1rem', fontWeight: '500' }}>
-                Prédiction passagers (moyenne): {currentDateInfo.average_prediction}
+                Prédiction passagers (moyenne): {currentDateInfo.average_prediction ?? '—'}
+                {currentDateInfo.forecast && (
+                  <> · total {currentDateInfo.forecast.total_passengers} ({currentDateInfo.forecast.model_type})</>
+                )}
               </span>
             </div>
 
@@ -38,12 +38,21 @@ const PredictPage = () => {
   const [daysToPredict, setDaysToPredict] = useState(30);
   const [predictionResult, setPredictionResult] = useState(null);
   const [predicting, setPredicting] = useState(false);
+  const [predictionProgress, setPredictionProgress] = useState('');
   const [predictionError, setPredictionError] = useState(null);
   const [predictionHistory, setPredictionHistory] = useState([]);
   const [loading, setLoading] = useState(true);
   const [chartType, setChartType] = useState('line');
   const [isFullscreen, setIsFullscreen] = useState(false);
 
+  const stageLabels = {
+    queued: 'En attente d\'un autre entraînement',
+    feature_build: 'Préparation des données',
+    fit: 'Entraînement du modèle',
+    evaluate: 'Évaluation du modèle',
+    forecast: 'Génération des prévisions',
+  };
+
   const modelOptions = [
     { value: 'Linear Regression', label: 'Régression Linéaire' },
     { value: 'Random Forest', label: 'Random Forest' },
@@ -82,8 +91,20 @@ const PredictPage = () => {
       setPredicting(true);
       setPredictionError(null);
       
-      const result = await apiService.trainAndPredict(selectedModel, daysToPredict);
-      setPredictionResult(result);
+      setPredictionResult(null);
+
+      // Résultats affichés au fil de l'eau : étapes, performances, puis prévisions jour par jour
+      const result = await apiService.trainAndPredictStream(selectedModel, daysToPredict, (type, data) => {
+        if (type === 'stage' && data.status === 'started') {
+          setPredictionProgress(stageLabels[data.stage] || data.stage);
+        } else if (type === 'model') {
+          setPredictionResult({ model_performance: data.model_performance, predictions: [] });
+        } else if (type === 'forecast') {
+          setPredictionProgress(`Prévisions : jour ${data.day} / ${daysToPredict}`);
+          setPredictionResult(prev => ({ ...prev, predictions: [...(prev?.predictions || []), ...data.predictions] }));
+        }
+      });
+      setPredictionResult(prev => ({ ...prev, ...result }));
       setPredictionError(null);
       
       // Recharger l'historique
@@ -92,6 +113,7 @@ const PredictPage = () => {
       setPredictionError(handleApiError(err));
     } finally {
       setPredicting(false);
+      setPredictionProgress('');
     }
   };
 
@@ -359,7 +381,7 @@ const PredictPage = () => {
                 {predicting ? (
                   <>
                     <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-white mr-2"></div>
-                    Prédiction en cours...
+                    {predictionProgress || 'Prédiction en cours...'}
                   </>
                 ) : (
                   <>
@@ -101,6 +101,43 @@ export const apiService = {
     return response.data;
   },
 
+  // Entraînement et prédiction en flux (Server-Sent Events), sans délai d'expiration :
+  // onEvent(type, data) reçoit 'stage', 'model', 'forecast' (un jour) puis 'done'
+  trainAndPredictStream: async (modelType, daysToPredict, onEvent) => {
+    const response = await fetch(`${API_BASE_URL}/train-and-predict/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify({ model_type: modelType, days_to_predict: daysToPredict }),
+    });
+    if (!response.ok) {
+      const data = await response.json().catch(() => ({}));
+      throw { response: { status: response.status, data } };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const messages = buffer.split('\n\n');
+      buffer = messages.pop();
+      for (const message of messages) {
+        if (!message || message.startsWith(':')) continue; // keep-alive
+        const type = message.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(message.match(/^data: (.*)$/m)?.[1] || 'null');
+        if (type === 'error') {
+          throw { response: { status: data.status, data } };
+        }
+        if (type === 'done') result = data;
+        onEvent?.(type, data);
+      }
+    }
+    return result;
+  },
+
   // Récupération de l'historique des prédictions
   getPredictionHistory: async () => {
     const response = await api.get('/prediction-history');